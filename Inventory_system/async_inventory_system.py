@@ -0,0 +1,146 @@
+from typing import Callable, Dict, List, Optional, TypeVar
+from sqlalchemy.engine import URL, make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
+from .models.database import DATABASE_URL_ENV, DEFAULT_DATABASE_URL, Base, apply_sqlite_pragmas
+from .models.product import Product
+from .models.unit import Unit
+from .models.location import Location
+from .models.order import Order
+from .managers.product_cache import ProductCache
+from .managers.location_manager import LocationStrategy, NearestEntranceStrategy
+from .managers.location_index import FreeLocationIndex
+from .inventory_system import InventorySystem
+import asyncio
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar('T')
+
+# Async driver used for each backend when a URL names a blocking one
+ASYNC_DRIVERS = {
+    'sqlite': 'aiosqlite',
+    'postgresql': 'asyncpg',
+    'mysql': 'aiomysql',
+}
+
+def async_database_url(url: Optional[str] = None) -> URL:
+    """The database URL with an async driver.
+
+    Defaults to INVENTORY_DATABASE_URL or the local SQLite file, so the async
+    facade opens the same database as InventorySystem.
+    """
+    url = make_url(url or os.environ.get(DATABASE_URL_ENV, DEFAULT_DATABASE_URL))
+    backend = url.get_backend_name()
+    if backend in ASYNC_DRIVERS and url.get_driver_name() not in ASYNC_DRIVERS.values():
+        url = url.set(drivername=f"{backend}+{ASYNC_DRIVERS[backend]}")
+    return url
+
+def create_async_session_factory(url: Optional[str] = None,
+                                 sqlite_pragmas: Optional[Dict[str, object]] = None,
+                                 **kwargs) -> async_sessionmaker:
+    """Create an AsyncSession factory for the given or configured database URL.
+
+    SQLite connections get the same pragmas as create_db_engine sets.
+    """
+    url = async_database_url(url)
+    engine = create_async_engine(url, **kwargs)
+    if url.get_backend_name() == 'sqlite':
+        apply_sqlite_pragmas(engine.sync_engine, sqlite_pragmas)
+    return async_sessionmaker(engine, expire_on_commit=False)
+
+async def create_tables(engine: AsyncEngine):
+    """Create all tables on an async engine"""
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+class AsyncInventorySystem:
+    """Asynchronous counterpart of InventorySystem.
+
+    Every operation opens its own AsyncSession, so many operations can be in
+    flight on one event loop. The synchronous managers run on that session
+    through AsyncSession.run_sync, which keeps behaviour identical to
+    InventorySystem while database I/O is awaited on the async driver.
+    """
+
+    def __init__(self, session_factory: async_sessionmaker,
+                 product_cache: Optional[ProductCache] = None):
+        self.session_factory = session_factory
+        self.product_cache = product_cache
+        self.location_index = FreeLocationIndex()
+        self.strategy: LocationStrategy = NearestEntranceStrategy()
+        # Putaway picks from the shared index before committing, so concurrent
+        # placements in this process are serialized to avoid double-booking a bin
+        self._putaway_lock = asyncio.Lock()
+
+    def set_location_strategy(self, strategy: LocationStrategy):
+        """Set location finding strategy"""
+        self.strategy = strategy
+
+    async def run(self, operation: Callable[[InventorySystem], T]) -> T:
+        """Run a synchronous InventorySystem operation on a fresh async session"""
+        async with self.session_factory() as session:
+            return await session.run_sync(self._call, operation)
+
+    def _call(self, db, operation: Callable[[InventorySystem], T]) -> T:
+        """Build an InventorySystem on the sync view of the session and run operation"""
+        system = InventorySystem(db, self.product_cache, self.location_index)
+        system.set_location_strategy(self.strategy)
+        return operation(system)
+
+    # Product Operations
+    async def add_product(self, product: Product) -> bool:
+        """Add a new product"""
+        return await self.run(lambda system: system.add_product(product))
+
+    async def update_product(self, product: Product) -> bool:
+        """Update existing product"""
+        return await self.run(lambda system: system.update_product(product))
+
+    # Unit Operations
+    async def add_unit(self, unit: Unit) -> bool:
+        """Add a new unit to inventory"""
+        async with self._putaway_lock:
+            return await self.run(lambda system: system.add_unit(unit))
+
+    async def add_units_bulk(self, units: List[Unit]) -> Dict[str, Optional[str]]:
+        """Add many units in one transaction"""
+        async with self._putaway_lock:
+            return await self.run(lambda system: system.add_units_bulk(units))
+
+    async def remove_unit(self, unit_id: str) -> bool:
+        """Remove a unit from inventory"""
+        async with self._putaway_lock:
+            return await self.run(lambda system: system.remove_unit(unit_id))
+
+    # Order Operations
+    async def place_order(self, order: Order) -> bool:
+        """Place a new order"""
+        return await self.run(lambda system: system.place_order(order))
+
+    async def place_orders(self, orders: List[Order]) -> List[Dict]:
+        """Place a batch of orders, skipping retried idempotency keys"""
+        return await self.run(lambda system: system.place_orders(orders))
+
+    async def process_order(self, order_id: str) -> bool:
+        """Process an existing order"""
+        return await self.run(lambda system: system.process_order(order_id))
+
+    async def cancel_order(self, order_id: str) -> bool:
+        """Cancel an order"""
+        return await self.run(lambda system: system.cancel_order(order_id))
+
+    async def deliver_order(self, order_id: str) -> bool:
+        """Mark a shipped order as delivered"""
+        return await self.run(lambda system: system.deliver_order(order_id))
+
+    # Location Operations
+    async def add_location(self, location: Location) -> bool:
+        """Add a new location"""
+        return await self.run(lambda system: system.add_location(location))
+
+    # Reporting
+    async def generate_report(self) -> Dict:
+        """Generate inventory report"""
+        return await self.run(lambda system: system.generate_report())
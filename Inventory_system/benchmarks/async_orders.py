@@ -0,0 +1,112 @@
+"""Compare order throughput of InventorySystem and AsyncInventorySystem.
+
+Run from the repository root:
+    python -m Inventory_system.benchmarks.async_orders [orders] [concurrency]
+"""
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from ..models.database import Base
+from ..models.product import Product
+from ..models.location import Location, LocationType
+from ..models.unit import Unit, UnitStatus
+from ..models.order import Order
+from ..inventory_system import InventorySystem
+from ..async_inventory_system import AsyncInventorySystem, create_async_session_factory
+from ..managers.stock_manager import StockManager
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+PRODUCTS = 50
+
+def seed(url: str, units: int):
+    """Create a database with products, locations and available units"""
+    engine = create_engine(url)
+    Base.metadata.create_all(engine)
+    with sessionmaker(bind=engine)() as db:
+        db.bulk_insert_mappings(Product, [
+            {
+                'product_id': f"P{i}", 'name': f"Product {i}", 'price': 10.0, 'weight': 1.0,
+                'length': 10, 'width': 10, 'height': 10
+            }
+            for i in range(PRODUCTS)
+        ])
+        db.bulk_insert_mappings(Location, [
+            {
+                'location_id': f"L{i}", 'type': LocationType.SMALL, 'is_occupied': True,
+                'length': 20, 'width': 20, 'height': 20
+            }
+            for i in range(units)
+        ])
+        db.bulk_insert_mappings(Unit, [
+            {
+                'unit_id': f"U{i}", 'product_id': f"P{i % PRODUCTS}",
+                'location_id': f"L{i}", 'status': UnitStatus.AVAILABLE
+            }
+            for i in range(units)
+        ])
+        db.commit()
+        StockManager(db).rebuild()
+    engine.dispose()
+
+def make_orders(count: int, prefix: str) -> list:
+    """Build single-line orders spread across products"""
+    return [
+        Order(order_id=f"{prefix}{i}", customer_id=f"C{i % 100}",
+              products={f"P{i % PRODUCTS}": 1})
+        for i in range(count)
+    ]
+
+def run_sync(url: str, orders: list) -> float:
+    """Place and process orders one after another on a blocking session"""
+    engine = create_engine(url)
+    with sessionmaker(bind=engine)() as db:
+        system = InventorySystem(db)
+        start = time.perf_counter()
+        for order in orders:
+            if system.place_order(order):
+                system.process_order(order.order_id)
+        elapsed = time.perf_counter() - start
+    engine.dispose()
+    return elapsed
+
+async def run_async(url: str, orders: list, concurrency: int) -> float:
+    """Place and process orders with bounded concurrency on the event loop"""
+    factory = create_async_session_factory(url)
+    system = AsyncInventorySystem(factory)
+    limit = asyncio.Semaphore(concurrency)
+
+    async def handle(order):
+        async with limit:
+            if await system.place_order(order):
+                await system.process_order(order.order_id)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(handle(order) for order in orders))
+    elapsed = time.perf_counter() - start
+    await factory.kw['bind'].dispose()
+    return elapsed
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    concurrency = int(sys.argv[2]) if len(sys.argv) > 2 else 16
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.db")
+        seed(f"sqlite:///{path}", count * 3)
+
+        sync_seconds = run_sync(f"sqlite:///{path}", make_orders(count, "S"))
+        async_seconds = asyncio.run(
+            run_async(f"sqlite+aiosqlite:///{path}", make_orders(count, "A"), concurrency)
+        )
+
+    print({
+        'orders': count,
+        'concurrency': concurrency,
+        'sync_orders_per_sec': round(count / sync_seconds, 1),
+        'async_orders_per_sec': round(count / async_seconds, 1)
+    })
+
+if __name__ == "__main__":
+    main()
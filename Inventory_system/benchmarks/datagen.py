@@ -0,0 +1,74 @@
+"""Seeded synthetic inventory data for benchmarks.
+
+The same seed and scale always produce the same products, locations, units
+and orders, so runs on different code versions are comparable.
+"""
+from ..models.location import Location, LocationType
+from ..models.product import Product
+from ..models.unit import Unit
+from ..models.order import Order
+from typing import Dict, List
+import random
+
+# Bin dimension ranges per location type, as (low, high) for every axis
+LOCATION_SIZES = {
+    LocationType.SMALL: (20, 40),
+    LocationType.MEDIUM: (40, 80),
+    LocationType.LARGE: (80, 160),
+}
+
+def scaled_counts(scale: float) -> Dict[str, int]:
+    """Row counts for a scale factor, at least one of each"""
+    return {
+        'products': max(1, int(100 * scale)),
+        'locations': max(1, int(1000 * scale)),
+        'units': max(1, int(2000 * scale)),
+    }
+
+def make_products(rng: random.Random, count: int) -> List[Product]:
+    """Products from pocket-sized to bulky"""
+    return [
+        Product(
+            product_id=f"P{i:06d}",
+            name=f"Product {i}",
+            description=f"Synthetic product {i}",
+            price=round(rng.uniform(1, 500), 2),
+            weight=round(rng.uniform(0.1, 20), 2),
+            dimensions={k: rng.randint(1, 30) for k in ('length', 'width', 'height')}
+        )
+        for i in range(count)
+    ]
+
+def make_locations(rng: random.Random, count: int) -> List[Location]:
+    """Locations cycling through every LocationType, laid out in aisles"""
+    types = list(LocationType)
+    locations = []
+    for i in range(count):
+        location_type = types[i % len(types)]
+        low, high = LOCATION_SIZES[location_type]
+        locations.append(Location(
+            location_id=f"L{i:07d}",
+            type=location_type,
+            dimensions={k: rng.randint(low, high) for k in ('length', 'width', 'height')},
+            aisle=f"A{i // 100:03d}",
+            x=float(i // 100), y=float(i % 100), z=float(rng.randint(0, 3))
+        ))
+    return locations
+
+def make_units(rng: random.Random, product_ids: List[str], count: int,
+               prefix: str = "U") -> List[Unit]:
+    """Units of uniformly chosen products"""
+    return [
+        Unit(unit_id=f"{prefix}{i:07d}", product_id=rng.choice(product_ids))
+        for i in range(count)
+    ]
+
+def make_order(rng: random.Random, product_ids: List[str], order_id: str,
+               max_lines: int = 3) -> Order:
+    """An order for one to max_lines distinct products, one unit each"""
+    lines = rng.sample(product_ids, min(len(product_ids), rng.randint(1, max_lines)))
+    return Order(
+        order_id=order_id,
+        customer_id=f"C{rng.randrange(1000):04d}",
+        products={product_id: 1 for product_id in lines}
+    )
@@ -0,0 +1,91 @@
+"""Compare putaway lookups for OptimalSpaceStrategy implementations.
+
+Run from the repository root:
+    python -m Inventory_system.benchmarks.location_strategies [bins ...]
+"""
+from ..managers.location_index import FreeLocationIndex, dimensions_fit, shape_of
+from ..managers.location_manager import OptimalSpaceStrategy
+from ..managers.vectorized_strategy import VectorizedOptimalSpaceStrategy
+import random
+import sys
+import time
+
+LOOKUPS = 50
+
+class Bin:
+    """Lightweight stand-in for Location, so the scan baseline measures the strategy only"""
+
+    def __init__(self, location_id: str, dimensions: dict):
+        self.location_id = location_id
+        self.dimensions = dimensions
+
+    def is_available(self) -> bool:
+        return True
+
+    def remaining_volume(self) -> float:
+        return self.dimensions['length'] * self.dimensions['width'] * self.dimensions['height']
+
+    def can_hold(self, product) -> bool:
+        return dimensions_fit(product.dimensions, self.dimensions)
+
+class Item:
+    """Lightweight stand-in for Product"""
+
+    def __init__(self, dimensions: dict):
+        self.dimensions = dimensions
+        self.weight = 1.0
+        self.volume = dimensions['length'] * dimensions['width'] * dimensions['height']
+
+    def shape(self) -> tuple:
+        return shape_of(self.dimensions)
+
+def make_bins(count: int, rng: random.Random) -> list:
+    """Bins with many distinct shapes"""
+    return [
+        Bin(f"L{i}", {'length': rng.randint(10, 200), 'width': rng.randint(10, 200),
+                      'height': rng.randint(10, 200)})
+        for i in range(count)
+    ]
+
+def timed(lookup, items) -> float:
+    """Average milliseconds per lookup"""
+    start = time.perf_counter()
+    for item in items:
+        lookup(item)
+    return round((time.perf_counter() - start) * 1000 / len(items), 3)
+
+def run(count: int) -> dict:
+    rng = random.Random(count)
+    bins = make_bins(count, rng)
+    items = [
+        Item({'length': rng.randint(5, 150), 'width': rng.randint(5, 150),
+              'height': rng.randint(5, 150)})
+        for _ in range(LOOKUPS)
+    ]
+
+    index = FreeLocationIndex()
+    index.load((b.location_id, b.dimensions) for b in bins)
+    vectorized = VectorizedOptimalSpaceStrategy()
+    vectorized.find_location_id(items[0], index)
+
+    scan = OptimalSpaceStrategy()
+    start = time.perf_counter()
+    batch = vectorized.find_location_ids(items * 20, index)
+    batch_ms = round((time.perf_counter() - start) * 1000, 3)
+
+    return {
+        'bins': count,
+        'scan_ms': timed(lambda item: scan.find_location(item, bins), items[:5]),
+        'sorted_index_ms': timed(lambda item: scan.find_location_id(item, index), items),
+        'vectorized_ms': timed(lambda item: vectorized.find_location_id(item, index), items),
+        'vectorized_batch_ms': batch_ms,
+        'batch_placed': sum(1 for location_id in batch if location_id)
+    }
+
+def main():
+    sizes = [int(arg) for arg in sys.argv[1:]] or [10000, 100000, 1000000]
+    for count in sizes:
+        print(run(count))
+
+if __name__ == "__main__":
+    main()
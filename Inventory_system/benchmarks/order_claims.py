@@ -0,0 +1,96 @@
+"""Stress concurrent order processing and check for oversells.
+
+Run from the repository root:
+    python -m Inventory_system.benchmarks.order_claims [orders] [max_workers]
+"""
+from sqlalchemy import func
+from sqlalchemy.orm import sessionmaker
+from ..models.database import Base, create_db_engine
+from ..models.product import Product
+from ..models.location import Location  # registers the table referenced by units
+from ..models.unit import Unit, UnitStatus
+from ..models.order import Order, OrderStatus
+from ..models.reservation import Reservation
+from ..managers.stock_manager import StockManager
+from ..order_processor import OrderProcessor
+import logging
+import os
+import random
+import sys
+import tempfile
+import time
+
+PRODUCTS = 20
+
+def seed(db, orders: int, seed_value: int = 7):
+    """Create pending orders whose demand exceeds stock for every product"""
+    rng = random.Random(seed_value)
+    db.bulk_insert_mappings(Product, [
+        {
+            'product_id': f"P{i}", 'name': f"Product {i}", 'price': 5.0, 'weight': 1.0,
+            'length': 10, 'width': 10, 'height': 10
+        }
+        for i in range(PRODUCTS)
+    ])
+    db.bulk_insert_mappings(Unit, [
+        {'unit_id': f"U{i}", 'product_id': f"P{i % PRODUCTS}", 'status': UnitStatus.AVAILABLE}
+        for i in range(orders)
+    ])
+    db.bulk_insert_mappings(Order, [
+        {
+            'order_id': f"O{i:06d}", 'customer_id': f"C{i % 50}",
+            'products': {f"P{rng.randrange(PRODUCTS)}": rng.randint(1, 3)},
+            'status': OrderStatus.PENDING, 'total_amount': 0.0, 'sequence': i + 1
+        }
+        for i in range(orders)
+    ])
+    db.commit()
+    StockManager(db).rebuild()
+
+def check(db) -> dict:
+    """Verify no unit is claimed twice and shipped demand matches in-transit stock"""
+    shipped = db.query(Order).filter(Order.status == OrderStatus.SHIPPED).all()
+    demand = sum(sum(order.products.values()) for order in shipped)
+    in_transit = db.query(Unit).filter(Unit.status == UnitStatus.IN_TRANSIT).count()
+    ledger = db.query(Reservation).count()
+    distinct_units = db.query(func.count(func.distinct(Reservation.unit_id))).scalar()
+    drift = StockManager(db).verify()
+    return {
+        'oversold': ledger != distinct_units or demand != in_transit,
+        'stock_drift': bool(drift),
+        'shipped_orders': len(shipped)
+    }
+
+def run(workers: int, orders: int) -> dict:
+    """Process all orders with a given worker count on a fresh database"""
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_db_engine(f"sqlite:///{os.path.join(tmp, 'claims.db')}")
+        Base.metadata.create_all(engine)
+        Session = sessionmaker(bind=engine, autoflush=False)
+        with Session() as db:
+            seed(db, orders)
+
+        start = time.perf_counter()
+        totals = OrderProcessor(Session, workers=workers, batch_size=200).drain()
+        elapsed = time.perf_counter() - start
+
+        with Session() as db:
+            result = check(db)
+        engine.dispose()
+
+    result.update(totals)
+    result.update({'workers': workers, 'orders_per_sec': round(orders / elapsed, 1)})
+    return result
+
+def main():
+    orders = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    max_workers = int(sys.argv[2]) if len(sys.argv) > 2 else 8
+    # Orders that run out of stock are expected; keep their errors out of the output
+    logging.disable(logging.ERROR)
+    workers = 1
+    while workers <= max_workers:
+        print(run(workers, orders))
+        workers *= 2
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""Measure putaway with the default strategy on large warehouses.
+
+Run from the repository root:
+    python -m Inventory_system.benchmarks.putaway [bins ...]
+
+For each warehouse size, times index lookups of NearestEntranceStrategy
+(the default) and OptimalSpaceStrategy, then steady-state add_unit calls,
+first on one system and then with many systems sharing the index.
+"""
+from sqlalchemy import insert
+from sqlalchemy.orm import sessionmaker
+from ..models.database import Base, create_db_engine
+from ..models.location import Location
+from ..models.unit import Unit
+from ..inventory_system import InventorySystem
+from ..managers.location_index import FreeLocationIndex
+from ..managers.location_manager import NearestEntranceStrategy, OptimalSpaceStrategy
+from .datagen import make_locations, make_products
+import os
+import random
+import sys
+import tempfile
+import time
+
+PRODUCTS = 100
+LOOKUPS = 200
+PUTAWAYS = 200
+SHARING_SYSTEMS = 30
+
+def timed(call, args) -> float:
+    """Average milliseconds per call"""
+    start = time.perf_counter()
+    for arg in args:
+        call(arg)
+    return round((time.perf_counter() - start) * 1000 / len(args), 3)
+
+def seed(db, rng: random.Random, bins: int) -> list:
+    """Insert products and empty bins, returning the products"""
+    products = make_products(rng, PRODUCTS)
+    db.add_all(products)
+    db.execute(insert(Location.__table__), [
+        {'location_id': location.location_id, 'type': location.type, **location.dimensions,
+         'aisle': location.aisle, 'x': location.x, 'y': location.y, 'z': location.z}
+        for location in make_locations(rng, bins)
+    ])
+    db.commit()
+    return products
+
+def run(bins: int) -> dict:
+    rng = random.Random(bins)
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_db_engine(f"sqlite:///{os.path.join(tmp, 'putaway.db')}")
+        Base.metadata.create_all(engine)
+        sessions = sessionmaker(bind=engine, autoflush=False)
+        db = sessions()
+        products = seed(db, rng, bins)
+        sample = [rng.choice(products) for _ in range(LOOKUPS)]
+
+        index = FreeLocationIndex()
+        system = InventorySystem(db, location_index=index)
+        system.location_manager.load_index()
+        nearest, optimal = NearestEntranceStrategy(), OptimalSpaceStrategy()
+        nearest.find_location_id(sample[0], index)
+
+        units = iter(range(10 * PUTAWAYS))
+        def putaway(product):
+            return system.add_unit(Unit(unit_id=f"U{next(units):07d}", product_id=product.product_id))
+
+        # Warm up so bins are partly filled, as in steady state
+        timed(putaway, [rng.choice(products) for _ in range(PUTAWAYS)])
+        result = {
+            'bins': bins,
+            'nearest_ms': timed(lambda product: nearest.find_location_id(product, index), sample),
+            'best_fit_ms': timed(lambda product: optimal.find_location_id(product, index), sample),
+            'add_unit_ms': timed(putaway, [rng.choice(products) for _ in range(PUTAWAYS)]),
+        }
+
+        others = [InventorySystem(sessions(), location_index=index) for _ in range(SHARING_SYSTEMS)]
+        for other in others:
+            other.location_manager.find_suitable_location(sample[0])
+            other.db.close()
+        result['shared_add_unit_ms'] = timed(putaway, [rng.choice(products) for _ in range(PUTAWAYS)])
+        db.close()
+        engine.dispose()
+    return result
+
+def main():
+    sizes = [int(arg) for arg in sys.argv[1:]] or [20000, 100000, 200000]
+    for bins in sizes:
+        print(run(bins))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""Compare concurrent write throughput under WAL and the rollback journal.
+
+Run from the repository root:
+    python -m Inventory_system.benchmarks.sqlite_journal [writers] [writes_per_writer]
+"""
+from concurrent.futures import ThreadPoolExecutor
+from sqlalchemy.orm import sessionmaker
+from ..models.database import Base, create_db_engine
+from ..models.location import Location, LocationType
+from ..inventory_system import InventorySystem
+import os
+import sys
+import tempfile
+import threading
+import time
+
+MODES = {
+    'rollback_journal': {'journal_mode': 'DELETE', 'synchronous': 'FULL'},
+    'wal': {},
+}
+
+def run(mode: str, writers: int, writes: int) -> dict:
+    """Time concurrent add_location calls while a reader keeps reporting"""
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_db_engine(f"sqlite:///{os.path.join(tmp, 'journal.db')}",
+                                  sqlite_pragmas=MODES[mode])
+        Base.metadata.create_all(engine)
+        Session = sessionmaker(bind=engine, autoflush=False)
+        done = threading.Event()
+        reports = [0]
+
+        def write(worker: int):
+            with Session() as db:
+                system = InventorySystem(db)
+                for i in range(writes):
+                    system.add_location(Location(
+                        location_id=f"W{worker}-{i}", type=LocationType.SMALL,
+                        dimensions={'length': 10, 'width': 10, 'height': 10}
+                    ))
+
+        def read():
+            with Session() as db:
+                system = InventorySystem(db)
+                while not done.is_set():
+                    system.generate_report()
+                    db.rollback()
+                    reports[0] += 1
+
+        reader = threading.Thread(target=read)
+        reader.start()
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=writers) as pool:
+            list(pool.map(write, range(writers)))
+        elapsed = time.perf_counter() - start
+        done.set()
+        reader.join()
+        engine.dispose()
+
+    return {
+        'mode': mode,
+        'writes_per_sec': round(writers * writes / elapsed, 1),
+        'reports_per_sec': round(reports[0] / elapsed, 1)
+    }
+
+def main():
+    writers = int(sys.argv[1]) if len(sys.argv) > 1 else 4
+    writes = int(sys.argv[2]) if len(sys.argv) > 2 else 250
+    for mode in MODES:
+        print(run(mode, writers, writes))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,213 @@
+"""Benchmark InventorySystem hot paths on seeded synthetic data.
+
+Run from the repository root:
+    python -m Inventory_system.benchmarks.suite run [--scale S] [--ops N] [--seed N] [--output FILE]
+    python -m Inventory_system.benchmarks.suite compare BASELINE.json CANDIDATE.json [--threshold T]
+
+`run` prints JSON with ops/sec, p50/p99 latency, queries per operation and
+peak traced memory for each operation. `compare` reports metrics that got
+worse by more than the threshold and exits with status 1 if any did.
+"""
+from sqlalchemy import event
+from sqlalchemy.orm import sessionmaker
+from ..models.database import Base, create_db_engine
+from ..inventory_system import InventorySystem
+from ..managers.location_manager import NearestEntranceStrategy, OptimalSpaceStrategy
+from .datagen import make_locations, make_order, make_products, make_units, scaled_counts
+from typing import Callable, Dict, List
+import argparse
+import json
+import logging
+import os
+import platform
+import random
+import sqlalchemy
+import sys
+import tempfile
+import time
+import tracemalloc
+
+class QueryCounter:
+    """Counts statements sent to an engine"""
+
+    def __init__(self, engine):
+        self.count = 0
+        event.listen(engine, "before_cursor_execute", self._count)
+
+    def _count(self, *args):
+        self.count += 1
+
+def percentile(samples: List[float], fraction: float) -> float:
+    """Nearest-rank percentile of a list of samples"""
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+def measure(call: Callable, args: List, memory_args: List, queries: QueryCounter) -> Dict:
+    """Time call over args, then trace peak memory over memory_args.
+
+    Calls returning False or None count as failures but are still timed.
+    """
+    latencies = []
+    failures = 0
+    queries.count = 0
+    start = time.perf_counter()
+    for arg in args:
+        began = time.perf_counter()
+        result = call(arg)
+        latencies.append(time.perf_counter() - began)
+        failures += result is False or result is None
+    elapsed = time.perf_counter() - start
+    query_count = queries.count
+
+    # Traced separately, tracemalloc slows every allocation down
+    tracemalloc.start()
+    for arg in memory_args:
+        call(arg)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    return {
+        'ops': len(args),
+        'failures': failures,
+        'ops_per_sec': round(len(args) / elapsed, 1),
+        'p50_ms': round(percentile(latencies, 0.50) * 1000, 3),
+        'p99_ms': round(percentile(latencies, 0.99) * 1000, 3),
+        'queries_per_op': round(query_count / len(args), 2),
+        'peak_memory_kb': round(peak / 1024, 1)
+    }
+
+def seed(system: InventorySystem, rng: random.Random, scale: float) -> List[str]:
+    """Load products, locations and units, returning the product IDs"""
+    counts = scaled_counts(scale)
+    products = make_products(rng, counts['products'])
+    with system.transaction():
+        for product in products:
+            system.add_product(product)
+        for location in make_locations(rng, counts['locations']):
+            system.add_location(location)
+    product_ids = [product.product_id for product in products]
+    system.add_units_bulk(make_units(rng, product_ids, counts['units']))
+    system.db.expunge_all()
+    return product_ids
+
+def run_suite(scale: float = 1.0, ops: int = 200, seed_value: int = 42) -> Dict:
+    """Run every benchmark on a fresh database"""
+    rng = random.Random(seed_value)
+    warmup = memory_ops = max(1, ops // 10)
+    total = warmup + ops + memory_ops
+    results = {}
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_db_engine(f"sqlite:///{os.path.join(tmp, 'suite.db')}")
+        Base.metadata.create_all(engine)
+        queries = QueryCounter(engine)
+        db = sessionmaker(bind=engine, autoflush=False)()
+        system = InventorySystem(db)
+        product_ids = seed(system, rng, scale)
+
+        def bench(name: str, call: Callable, args: List):
+            for arg in args[:warmup]:
+                call(arg)
+            results[name] = measure(call, args[warmup:warmup + ops], args[warmup + ops:], queries)
+
+        for strategy in (NearestEntranceStrategy(), OptimalSpaceStrategy()):
+            system.set_location_strategy(strategy)
+            system.location_manager.load_index()
+            bench(f"find_suitable_location[{type(strategy).__name__}]",
+                  system.location_manager.find_suitable_location,
+                  [system.product_manager.get_product(rng.choice(product_ids))
+                   for _ in range(total)])
+
+        system.set_location_strategy(NearestEntranceStrategy())
+        bench("add_unit", system.add_unit, make_units(rng, product_ids, total, prefix="N"))
+
+        orders = [make_order(rng, product_ids, f"O{i:07d}") for i in range(total)]
+        bench("place_order", system.place_order, orders)
+        bench("process_order", system.process_order, [order.order_id for order in orders])
+
+        cancellable = [make_order(rng, product_ids, f"X{i:07d}") for i in range(total)]
+        for order in cancellable:
+            system.place_order(order)
+        bench("cancel_order", system.cancel_order, [order.order_id for order in cancellable])
+
+        bench("generate_report", lambda _: system.generate_report(), [None] * total)
+
+        db.close()
+        engine.dispose()
+
+    return {
+        'meta': {
+            'scale': scale,
+            'ops': ops,
+            'seed': seed_value,
+            'python': platform.python_version(),
+            'sqlalchemy': sqlalchemy.__version__,
+            'platform': platform.platform(),
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S')
+        },
+        'results': results
+    }
+
+# Metric name -> True if higher is better
+METRICS = {
+    'ops_per_sec': True,
+    'p50_ms': False,
+    'p99_ms': False,
+    'queries_per_op': False,
+    'peak_memory_kb': False,
+}
+
+def compare(baseline: Dict, candidate: Dict, threshold: float = 0.1) -> List[Dict]:
+    """List metrics that got worse by more than threshold, as a fraction of the baseline"""
+    regressions = []
+    for name, before in baseline['results'].items():
+        after = candidate['results'].get(name)
+        if after is None:
+            continue
+        for metric, higher_is_better in METRICS.items():
+            old, new = before[metric], after[metric]
+            if not old:
+                continue
+            change = (new - old) / old
+            worse = -change if higher_is_better else change
+            if worse > threshold:
+                regressions.append({
+                    'benchmark': name, 'metric': metric,
+                    'baseline': old, 'candidate': new, 'change': round(change, 3)
+                })
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    commands = parser.add_subparsers(dest='command', required=True)
+    run_parser = commands.add_parser('run', help="run the suite and print JSON results")
+    run_parser.add_argument('--scale', type=float, default=1.0)
+    run_parser.add_argument('--ops', type=int, default=200)
+    run_parser.add_argument('--seed', type=int, default=42)
+    run_parser.add_argument('--output', help="also write results to this file")
+    compare_parser = commands.add_parser('compare', help="compare two result files")
+    compare_parser.add_argument('baseline')
+    compare_parser.add_argument('candidate')
+    compare_parser.add_argument('--threshold', type=float, default=0.1)
+    args = parser.parse_args()
+
+    if args.command == 'run':
+        # Failed operations are part of the workload; keep their errors out of the output
+        logging.disable(logging.ERROR)
+        results = json.dumps(run_suite(args.scale, args.ops, args.seed), indent=2)
+        if args.output:
+            with open(args.output, 'w') as f:
+                f.write(results + "\n")
+        print(results)
+        return
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.candidate) as f:
+        candidate = json.load(f)
+    regressions = compare(baseline, candidate, args.threshold)
+    print(json.dumps({'threshold': args.threshold, 'regressions': regressions}, indent=2))
+    sys.exit(1 if regressions else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""Compare unit loading strategies.
+
+Run from the repository root:
+    python -m Inventory_system.benchmarks.unit_loading [units]
+"""
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from ..models.database import Base
+from ..models.product import Product
+from ..models.location import Location, LocationType
+from ..models.unit import Unit, UnitStatus
+from ..managers.unit_manager import UnitManager, UnitLoad
+import sys
+import time
+
+def seed(db, units: int, products: int = 100):
+    """Insert products, one location per unit and available units"""
+    db.bulk_insert_mappings(Product, [
+        {
+            'product_id': f"P{i:05d}", 'name': f"Product {i}", 'description': "x" * 200,
+            'price': 10.0, 'weight': 1.0,
+            'length': 10, 'width': 10, 'height': 10
+        }
+        for i in range(products)
+    ])
+    db.bulk_insert_mappings(Location, [
+        {
+            'location_id': f"L{i:07d}", 'type': LocationType.MEDIUM, 'is_occupied': True,
+            'length': 50, 'width': 50, 'height': 50
+        }
+        for i in range(units)
+    ])
+    db.bulk_insert_mappings(Unit, [
+        {
+            'unit_id': f"U{i:07d}", 'product_id': f"P{i % products:05d}",
+            'location_id': f"L{i:07d}", 'status': UnitStatus.AVAILABLE
+        }
+        for i in range(units)
+    ])
+    db.commit()
+
+def run(engine, Session, load: UnitLoad, read_product: bool) -> dict:
+    """Time list_units with a loading strategy and count issued SQL"""
+    stats = {'statements': 0, 'columns': 0}
+
+    def count(conn, cursor, statement, parameters, context, executemany):
+        stats['statements'] += 1
+        stats['columns'] += len(cursor.description or ())
+
+    db = Session()
+    event.listen(engine, 'after_cursor_execute', count)
+    start = time.perf_counter()
+    units = UnitManager(db).list_units(load=load)
+    for unit in units:
+        unit.status
+        if read_product:
+            unit.product.name
+    elapsed = time.perf_counter() - start
+    event.remove(engine, 'after_cursor_execute', count)
+    db.close()
+
+    stats.update({'load': load.value, 'read_product': read_product,
+                  'rows': len(units), 'seconds': round(elapsed, 4)})
+    return stats
+
+def main():
+    units = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(engine)
+    Session = sessionmaker(bind=engine, autoflush=False)
+    with Session() as db:
+        seed(db, units)
+
+    for read_product in (False, True):
+        for load in UnitLoad:
+            if read_product and load == UnitLoad.STATUS_ONLY:
+                continue
+            print(run(engine, Session, load, read_product))
+
+if __name__ == "__main__":
+    main()
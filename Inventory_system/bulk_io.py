@@ -0,0 +1,422 @@
+"""Stream products, locations and units between the database and CSV or Parquet files.
+
+    python -m Inventory_system.bulk_io import products products.csv
+    python -m Inventory_system.bulk_io export units units.parquet
+
+Import order matters: products, then locations, then units. Location
+closures and contents are not part of a snapshot; contents are rebuilt from
+the imported units. Parquet files need pyarrow.
+"""
+from sqlalchemy import insert, select
+from sqlalchemy.orm import Session, sessionmaker
+from .models.database import create_db_engine
+from .models.location import Location, LocationType
+from .models.migrations import upgrade
+from .models.product import Product
+from .models.unit import Unit, UnitStatus
+from .managers.location_index import FreeLocationIndex
+from .managers.pagination import iter_keyset
+from .managers.transaction import commit, rollback
+from .managers.unit_manager import UnitManager, _chunks
+from typing import Dict, Iterator, List, Optional, Tuple
+import argparse
+import csv
+import json
+import logging
+import os
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - optional dependency
+    np = None
+
+try:
+    import pyarrow
+    import pyarrow.parquet as pq
+except ImportError:  # pragma: no cover - optional dependency
+    pyarrow = pq = None
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CHUNK_SIZE = 50000
+
+# Rejected rows reported individually per import
+MAX_REPORTED_ERRORS = 100
+
+class RecordSpec:
+    """Columns of one record type and the rules its rows must satisfy.
+
+    The rules match the model validators: required text must be non-empty,
+    positive numbers must be greater than zero, and enum columns take a
+    member's name or value.
+    """
+
+    def __init__(self, model, key: str, required: Tuple[str, ...] = (),
+                 optional: Tuple[str, ...] = (), positive: Tuple[str, ...] = (),
+                 optional_positive: Tuple[str, ...] = (), numbers: Tuple[str, ...] = (),
+                 integers: Tuple[str, ...] = (), enums: Optional[Dict[str, type]] = None,
+                 defaults: Optional[Dict[str, object]] = None):
+        self.model = model
+        self.key = key
+        self.required = required
+        self.optional = optional
+        self.positive = positive
+        self.optional_positive = optional_positive
+        self.numbers = numbers
+        self.integers = integers
+        self.enums = enums or {}
+        self.defaults = defaults or {}
+
+    @property
+    def columns(self) -> Tuple[str, ...]:
+        """File columns in export order"""
+        return self.required + self.optional + self.positive + self.optional_positive + self.numbers
+
+    @property
+    def mandatory(self) -> Tuple[str, ...]:
+        """Columns a file must have"""
+        return tuple(c for c in self.required + self.positive if c not in self.defaults)
+
+SPECS = {
+    'products': RecordSpec(
+        Product, 'product_id',
+        required=('product_id', 'name'),
+        optional=('description',),
+        positive=('price', 'weight', 'length', 'width', 'height')
+    ),
+    'locations': RecordSpec(
+        Location, 'location_id',
+        required=('location_id', 'type'),
+        optional=('aisle',),
+        positive=('length', 'width', 'height'),
+        optional_positive=('max_weight', 'max_units'),
+        numbers=('x', 'y', 'z'),
+        integers=('max_units',),
+        enums={'type': LocationType}
+    ),
+    'units': RecordSpec(
+        Unit, 'unit_id',
+        required=('unit_id', 'product_id', 'status'),
+        optional=('location_id',),
+        enums={'status': UnitStatus},
+        defaults={'status': UnitStatus.AVAILABLE.value}
+    ),
+}
+
+def file_format(path: str) -> str:
+    """'csv' or 'parquet', from the file extension"""
+    extension = os.path.splitext(path)[1].lower()
+    if extension == '.csv':
+        return 'csv'
+    if extension in ('.parquet', '.pq'):
+        return 'parquet'
+    raise ValueError(f"Unsupported file type: {path}")
+
+def _require_pyarrow():
+    if pq is None:
+        raise ImportError("Parquet files require pyarrow")
+
+def read_chunks(path: str, chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[Tuple[Dict[str, list], List[Tuple[int, str]]]]:
+    """Read a file as dictionaries of column lists, at most chunk_size rows each.
+
+    Each chunk comes with (position, reason) for its CSV records whose field
+    count differs from the header. Those records are padded with blanks or
+    cut to the header, so the columns stay aligned, and should be rejected.
+    Blank lines are skipped.
+    """
+    if file_format(path) == 'parquet':
+        _require_pyarrow()
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunk_size):
+            yield batch.to_pydict(), []
+        return
+
+    with open(path, newline='') as f:
+        reader = csv.reader(f)
+        header = next(reader, None)
+        if header is None:
+            return
+        width = len(header)
+        columns = [[] for _ in header]
+        malformed = []
+        for record in reader:
+            if not record:
+                continue
+            if len(record) != width:
+                malformed.append((len(columns[0]), f"wrong column count: expected {width}, found {len(record)}"))
+                record = (record + [''] * width)[:width]
+            for column, value in zip(columns, record):
+                column.append(value)
+            if len(columns[0]) >= chunk_size:
+                yield dict(zip(header, columns)), malformed
+                columns = [[] for _ in header]
+                malformed = []
+        if columns[0]:
+            yield dict(zip(header, columns)), malformed
+
+def _chunk_size(chunk: Dict[str, list]) -> int:
+    return len(next(iter(chunk.values()), []))
+
+def _parse_float(value) -> float:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return float('nan')
+
+def _numbers(values: list) -> Tuple["np.ndarray", "np.ndarray"]:
+    """Parse a column as floats, returning the values (NaN when invalid) and the blank mask"""
+    raw = np.array(values, dtype=object)
+    blank = (raw == None) | (raw == '')
+    parsed = np.full(len(raw), np.nan)
+    present = raw[~blank]
+    try:
+        parsed[~blank] = present.astype(float)
+    except (TypeError, ValueError):
+        parsed[~blank] = [_parse_float(value) for value in present]
+    return parsed, blank
+
+def validate_chunk(spec: RecordSpec, chunk: Dict[str, list],
+                   malformed: List[Tuple[int, str]] = ()) -> Tuple[List[Dict], List[int], List[Tuple[int, str]]]:
+    """Validate a chunk column by column.
+
+    Rows listed in malformed, as (position, reason), are rejected up front.
+    Returns the valid rows as column dictionaries ready for an executemany
+    insert, their positions in the chunk, and (position, reason) for each
+    rejected row.
+    """
+    if np is None:
+        raise ImportError("Bulk import requires numpy")
+    missing = [column for column in spec.mandatory if column not in chunk]
+    if missing:
+        raise ValueError(f"Missing columns: {', '.join(missing)}")
+    size = _chunk_size(chunk)
+    rejected = np.zeros(size, dtype=bool)
+    errors: List[Tuple[int, str]] = list(malformed)
+    for position, _ in malformed:
+        rejected[position] = True
+
+    def reject(mask, reason: str):
+        new = mask & ~rejected
+        errors.extend((int(position), reason) for position in np.flatnonzero(new))
+        rejected[:] |= mask
+
+    values: Dict[str, object] = {}
+    for column in spec.required + spec.optional:
+        if column not in chunk:
+            values[column] = np.full(size, spec.defaults.get(column), dtype=object)
+            continue
+        raw = np.array(chunk[column], dtype=object)
+        blank = (raw == None) | (raw == '')
+        if column in spec.defaults:
+            raw[blank] = spec.defaults[column]
+        elif column in spec.required:
+            reject(blank, f"{column} is required")
+        else:
+            raw[blank] = None
+        values[column] = raw
+
+    for column, enum in spec.enums.items():
+        lookup = {member.value: member for member in enum}
+        lookup.update({member.name: member for member in enum})
+        lookup.update({member: member for member in enum})
+        members = np.array([lookup.get(value) for value in values[column]], dtype=object)
+        reject(members == None, f"{column} must be one of {', '.join(member.value for member in enum)}")
+        values[column] = members
+
+    for column in spec.positive:
+        parsed, _ = _numbers(chunk[column])
+        reject(~(parsed > 0), f"{column} must be a positive number")
+        values[column] = parsed
+    for column in spec.optional_positive + spec.numbers:
+        if column not in chunk:
+            values[column] = np.full(size, np.nan)
+            continue
+        parsed, blank = _numbers(chunk[column])
+        invalid = ~blank & ~np.isfinite(parsed)
+        if column in spec.optional_positive:
+            invalid |= ~blank & ~(parsed > 0)
+        if column in spec.integers:
+            invalid |= ~blank & (parsed % 1 != 0)
+        reject(invalid, f"{column} must be a {'positive ' if column in spec.optional_positive else ''}number")
+        values[column] = parsed
+
+    keep = ~rejected
+    columns = {name: column[keep] for name, column in values.items()}
+    if spec.model in (Product, Location):
+        # Derived dimension columns, as the Dimensioned validators would set them
+        sides = np.sort(np.stack([columns['length'], columns['width'], columns['height']], axis=1), axis=1)
+        columns['shortest_side'], columns['middle_side'], columns['longest_side'] = sides.T
+        columns['volume'] = sides.prod(axis=1)
+    if spec.model is Location:
+        kept = int(keep.sum())
+        columns['is_occupied'] = np.zeros(kept, dtype=bool)
+        columns['used_volume'] = columns['used_weight'] = np.zeros(kept)
+        columns['unit_count'] = np.zeros(kept, dtype=int)
+
+    names = list(columns)
+    lists = []
+    for name in names:
+        column = columns[name]
+        if column.dtype.kind == 'f':
+            # NaN marks missing optional numbers
+            column = np.where(np.isnan(column), None, column).astype(object)
+            if name in spec.integers:
+                column = np.array([None if value is None else int(value) for value in column], dtype=object)
+        lists.append(column.tolist())
+    rows = [dict(zip(names, row)) for row in zip(*lists)]
+    return rows, np.flatnonzero(keep).tolist(), errors
+
+class BulkImporter:
+    """Load products, locations and units from files in chunked transactions.
+
+    Each chunk is validated column-wise and written with executemany in its
+    own transaction, so memory stays bounded by the chunk size and a failed
+    chunk leaves the ones before it in place. Invalid rows are skipped and
+    reported; rows that clash with the database, such as duplicate keys,
+    fail their whole chunk.
+    """
+
+    def __init__(self, db: Session, location_index: Optional[FreeLocationIndex] = None,
+                 chunk_size: int = DEFAULT_CHUNK_SIZE):
+        self.db = db
+        self.location_index = location_index
+        self.chunk_size = chunk_size
+        self.units = UnitManager(db, location_index)
+
+    def import_file(self, kind: str, path: str) -> Dict:
+        """Import a products, locations or units file.
+
+        Returns counts of rows read, imported and rejected, and up to
+        MAX_REPORTED_ERRORS messages naming the rejected rows.
+        """
+        spec = SPECS[kind]
+        result = {'read': 0, 'imported': 0, 'rejected': 0, 'errors': []}
+        for chunk, malformed in read_chunks(path, self.chunk_size):
+            rows, positions, errors = validate_chunk(spec, chunk, malformed)
+            if kind == 'units':
+                rows, missing = self._known_products(rows, positions)
+                errors.extend(missing)
+            offset, size = result['read'], _chunk_size(chunk)
+            try:
+                self._write(kind, rows)
+            except Exception as e:
+                raise ValueError(f"Import of {kind} rows {offset + 1}-{offset + size} failed: {str(e)}") from e
+            result['read'] += size
+            result['imported'] += len(rows)
+            result['rejected'] += len(errors)
+            room = MAX_REPORTED_ERRORS - len(result['errors'])
+            result['errors'].extend(f"row {offset + position + 1}: {reason}"
+                                    for position, reason in sorted(errors)[:max(room, 0)])
+
+        if kind == 'locations' and self.location_index is not None:
+            # Reloaded with the new locations on next use
+            self.location_index.clear()
+        if result['rejected']:
+            logger.warning(f"Rejected {result['rejected']} of {result['read']} {kind} rows from {path}")
+        return result
+
+    def _known_products(self, rows: List[Dict],
+                        positions: List[int]) -> Tuple[List[Dict], List[Tuple[int, str]]]:
+        """Keep unit rows whose product exists, with errors for the rest"""
+        product_ids = list({row['product_id'] for row in rows})
+        known = set()
+        for chunk in _chunks(product_ids):
+            known.update(self.db.scalars(select(Product.product_id).where(Product.product_id.in_(chunk))))
+        if len(known) == len(product_ids):
+            return rows, []
+        errors = [(position, f"product {row['product_id']} not found")
+                  for row, position in zip(rows, positions) if row['product_id'] not in known]
+        return [row for row in rows if row['product_id'] in known], errors
+
+    def _write(self, kind: str, rows: List[Dict]):
+        if not rows:
+            return
+        if kind == 'units':
+            self.units.create_unit_rows(rows)
+            return
+        try:
+            self.db.execute(insert(SPECS[kind].model.__table__), rows)
+            commit(self.db)
+        except Exception:
+            rollback(self.db)
+            raise
+
+class BulkExporter:
+    """Write products, locations or units to a file in key order with bounded memory"""
+
+    def __init__(self, db: Session, chunk_size: int = DEFAULT_CHUNK_SIZE):
+        self.db = db
+        self.chunk_size = chunk_size
+
+    def iter_chunks(self, kind: str) -> Iterator[Dict[str, list]]:
+        """Rows as dictionaries of column lists, one keyset batch at a time"""
+        spec = SPECS[kind]
+        columns = [getattr(spec.model, name) for name in spec.columns]
+        rows = iter_keyset(self.db.query(*columns), getattr(spec.model, spec.key), self.chunk_size)
+        batch = []
+        for row in rows:
+            batch.append(row)
+            if len(batch) == self.chunk_size:
+                yield self._columns(spec, batch)
+                batch = []
+        if batch:
+            yield self._columns(spec, batch)
+
+    @staticmethod
+    def _columns(spec: RecordSpec, rows: list) -> Dict[str, list]:
+        chunk = {name: list(values) for name, values in zip(spec.columns, zip(*rows))}
+        for name in spec.enums:
+            chunk[name] = [value.value for value in chunk[name]]
+        return chunk
+
+    def export_file(self, kind: str, path: str) -> int:
+        """Export all rows of a kind, returning the number written"""
+        spec = SPECS[kind]
+        written = 0
+        if file_format(path) == 'parquet':
+            _require_pyarrow()
+            schema = pyarrow.schema([
+                (name, pyarrow.int64() if name in spec.integers
+                 else pyarrow.float64() if name in spec.positive + spec.optional_positive + spec.numbers
+                 else pyarrow.string())
+                for name in spec.columns
+            ])
+            with pq.ParquetWriter(path, schema) as writer:
+                for chunk in self.iter_chunks(kind):
+                    writer.write_table(pyarrow.table(chunk, schema=schema))
+                    written += len(chunk[spec.key])
+            return written
+
+        with open(path, 'w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(spec.columns)
+            for chunk in self.iter_chunks(kind):
+                writer.writerows(['' if value is None else value for value in row]
+                                 for row in zip(*(chunk[name] for name in spec.columns)))
+                written += len(chunk[spec.key])
+        return written
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('command', choices=('import', 'export'))
+    parser.add_argument('kind', choices=tuple(SPECS))
+    parser.add_argument('path')
+    parser.add_argument('--database', help="database URL, defaults to INVENTORY_DATABASE_URL")
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    engine = create_db_engine(args.database)
+    upgrade(engine)
+    db = sessionmaker(bind=engine, autoflush=False)()
+    try:
+        if args.command == 'import':
+            print(json.dumps(BulkImporter(db, chunk_size=args.chunk_size).import_file(args.kind, args.path), indent=2))
+        else:
+            count = BulkExporter(db, args.chunk_size).export_file(args.kind, args.path)
+            print(json.dumps({'exported': count}))
+    finally:
+        db.close()
+        engine.dispose()
+
+if __name__ == "__main__":
+    main()
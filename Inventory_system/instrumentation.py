@@ -0,0 +1,315 @@
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+from threading import Lock, Thread, local
+from typing import Callable, Dict, List, Optional, Sequence
+import functools
+import logging
+import os
+import tempfile
+import time
+
+logger = logging.getLogger(__name__)
+
+# Latency histogram bucket upper bounds, in seconds
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Slow queries kept for inspection
+SLOW_QUERY_HISTORY = 100
+
+class Histogram:
+    """Cumulative bucket counts, sum and count of observed values"""
+
+    def __init__(self, buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        self.counts = [0] * len(self.buckets)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+        self.count += 1
+        self.sum += value
+
+class OperationStats:
+    """Totals for one instrumented operation"""
+
+    def __init__(self, buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.calls = 0
+        self.failures = 0
+        self.queries = 0
+        self.rows = 0
+        self.db_seconds = 0.0
+        self.latency = Histogram(buckets)
+
+    @property
+    def python_seconds(self) -> float:
+        """Time spent outside the database"""
+        return max(0.0, self.latency.sum - self.db_seconds)
+
+    def to_dict(self) -> Dict:
+        calls = self.calls or 1
+        return {
+            'calls': self.calls,
+            'failures': self.failures,
+            'queries': self.queries,
+            'queries_per_call': self.queries / calls,
+            'rows': self.rows,
+            'seconds': self.latency.sum,
+            'db_seconds': self.db_seconds,
+            'python_seconds': self.python_seconds
+        }
+
+class _Call:
+    """Counters of one operation call in progress"""
+    __slots__ = ('queries', 'rows', 'db_seconds')
+
+    def __init__(self):
+        self.queries = 0
+        self.rows = 0
+        self.db_seconds = 0.0
+
+def _escape(value: str) -> str:
+    """Escape a Prometheus label value"""
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+class Instrumentation:
+    """Per-operation query counts, rows, DB versus Python time and latency.
+
+    Attach it to sessions, usually by passing it to InventorySystem, whose
+    public methods are then timed as operations. Queries are attributed to
+    every operation running on the same thread, so an operation's count
+    includes those of operations it calls. With slow_query_seconds set,
+    slower statements are logged with their plan from EXPLAIN.
+    """
+
+    def __init__(self, slow_query_seconds: Optional[float] = None, explain: bool = True,
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.slow_query_seconds = slow_query_seconds
+        self.explain = explain
+        self.buckets = tuple(buckets)
+        self.operations: Dict[str, OperationStats] = {}
+        self.queries = 0
+        self.db_seconds = 0.0
+        self.slow_queries = deque(maxlen=SLOW_QUERY_HISTORY)
+        self._engines: List[Engine] = []
+        self._lock = Lock()
+        self._local = local()
+
+    def _calls(self) -> List[_Call]:
+        calls = getattr(self._local, 'calls', None)
+        if calls is None:
+            calls = self._local.calls = []
+        return calls
+
+    def attach(self, db: Session):
+        """Record queries run on a session and rows its SELECTs return"""
+        engine = db.get_bind()
+        with self._lock:
+            if not any(attached is engine for attached in self._engines):
+                event.listen(engine, 'before_cursor_execute', self._before_cursor_execute)
+                event.listen(engine, 'after_cursor_execute', self._after_cursor_execute)
+                self._engines.append(engine)
+        if not event.contains(db, 'do_orm_execute', self._count_rows):
+            event.listen(db, 'do_orm_execute', self._count_rows)
+
+    def detach(self):
+        """Stop recording on every attached engine"""
+        with self._lock:
+            for engine in self._engines:
+                event.remove(engine, 'before_cursor_execute', self._before_cursor_execute)
+                event.remove(engine, 'after_cursor_execute', self._after_cursor_execute)
+            self._engines = []
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        # Kept on the execution context, which is discarded with a failed statement
+        context._instrumentation_start = time.perf_counter()
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        start = getattr(context, '_instrumentation_start', None)
+        if start is None:
+            # Started before the listener was attached
+            return
+        elapsed = time.perf_counter() - start
+        calls = self._calls()
+        for call in calls:
+            call.queries += 1
+            call.db_seconds += elapsed
+        with self._lock:
+            self.queries += 1
+            self.db_seconds += elapsed
+
+        if self.slow_query_seconds is not None and elapsed >= self.slow_query_seconds:
+            plan = None
+            if self.explain and not executemany:
+                plan = self._explain(conn, statement, parameters)
+            self.slow_queries.append({
+                'statement': statement,
+                'parameters': parameters,
+                'seconds': elapsed,
+                'plan': plan
+            })
+            logger.warning(f"Slow query ({elapsed * 1000:.1f} ms): {statement}"
+                           + (f"\nPlan:\n{plan}" if plan else ""))
+
+    @staticmethod
+    def _explain(conn, statement: str, parameters) -> Optional[str]:
+        """Plan of a SELECT statement, fetched on a raw cursor so it is not recorded"""
+        if not statement.lstrip().upper().startswith(('SELECT', 'WITH')):
+            return None
+        prefix = "EXPLAIN QUERY PLAN " if conn.dialect.name == 'sqlite' else "EXPLAIN "
+        cursor = conn.connection.cursor()
+        try:
+            cursor.execute(prefix + statement, parameters)
+            return "\n".join(" ".join(str(value) for value in row) for row in cursor.fetchall())
+        except Exception as e:
+            logger.error(f"Error explaining slow query: {str(e)}")
+            return None
+        finally:
+            cursor.close()
+
+    def _count_rows(self, orm_execute_state):
+        """Count rows returned by SELECTs run inside an operation.
+
+        Results are buffered to count them, except for streamed results.
+        """
+        calls = self._calls()
+        if not calls or not orm_execute_state.is_select:
+            return None
+        options = orm_execute_state.execution_options
+        if options.get('yield_per') or options.get('stream_results'):
+            return None
+        frozen = orm_execute_state.invoke_statement().freeze()
+        for call in calls:
+            call.rows += len(frozen.data)
+        return frozen()
+
+    def start_operation(self) -> _Call:
+        """Begin counting an operation on the current thread"""
+        call = _Call()
+        self._calls().append(call)
+        return call
+
+    def finish_operation(self, name: str, call: _Call, seconds: float, failed: bool = False):
+        """Record a finished operation started with start_operation"""
+        calls = self._calls()
+        if call in calls:
+            calls.remove(call)
+        with self._lock:
+            stats = self.operations.get(name)
+            if stats is None:
+                stats = self.operations[name] = OperationStats(self.buckets)
+            stats.calls += 1
+            stats.failures += failed
+            stats.queries += call.queries
+            stats.rows += call.rows
+            stats.db_seconds += call.db_seconds
+            stats.latency.observe(seconds)
+
+    def snapshot(self) -> Dict[str, Dict]:
+        """Totals per operation"""
+        with self._lock:
+            return {name: stats.to_dict() for name, stats in self.operations.items()}
+
+    def reset(self):
+        """Forget everything recorded so far"""
+        with self._lock:
+            self.operations = {}
+            self.queries = 0
+            self.db_seconds = 0.0
+            self.slow_queries.clear()
+
+    def render(self) -> str:
+        """Metrics in the Prometheus text exposition format"""
+        with self._lock:
+            operations = sorted(self.operations.items())
+            lines = [
+                "# HELP inventory_queries_total Statements executed on instrumented engines",
+                "# TYPE inventory_queries_total counter",
+                f"inventory_queries_total {self.queries}",
+                "# HELP inventory_query_seconds_total Time spent executing statements",
+                "# TYPE inventory_query_seconds_total counter",
+                f"inventory_query_seconds_total {self.db_seconds}",
+            ]
+            counters = (
+                ('calls', "Operation calls", lambda stats: stats.calls),
+                ('failures', "Operation calls that returned False or raised", lambda stats: stats.failures),
+                ('queries', "Statements executed by operations", lambda stats: stats.queries),
+                ('rows', "Rows returned by SELECTs run in operations", lambda stats: stats.rows),
+                ('db_seconds', "Operation time spent executing statements", lambda stats: stats.db_seconds),
+                ('python_seconds', "Operation time spent outside the database",
+                 lambda stats: stats.python_seconds),
+            )
+            for suffix, description, value in counters:
+                metric = f"inventory_operation_{suffix}_total"
+                lines.append(f"# HELP {metric} {description}")
+                lines.append(f"# TYPE {metric} counter")
+                for name, stats in operations:
+                    lines.append(f'{metric}{{operation="{_escape(name)}"}} {value(stats)}')
+
+            lines.append("# HELP inventory_operation_seconds Operation latency")
+            lines.append("# TYPE inventory_operation_seconds histogram")
+            for name, stats in operations:
+                label = f'operation="{_escape(name)}"'
+                for bound, count in zip(stats.latency.buckets, stats.latency.counts):
+                    lines.append(f'inventory_operation_seconds_bucket{{{label},le="{bound}"}} {count}')
+                lines.append(f'inventory_operation_seconds_bucket{{{label},le="+Inf"}} {stats.latency.count}')
+                lines.append(f'inventory_operation_seconds_sum{{{label}}} {stats.latency.sum}')
+                lines.append(f'inventory_operation_seconds_count{{{label}}} {stats.latency.count}')
+        return "\n".join(lines) + "\n"
+
+    def write(self, path: str):
+        """Write metrics to a file atomically, e.g. for a node exporter textfile collector"""
+        directory = os.path.dirname(os.path.abspath(path))
+        fd, tmp = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w') as f:
+                f.write(self.render())
+            os.replace(tmp, path)
+        except Exception:
+            os.unlink(tmp)
+            raise
+
+    def serve(self, port: int = 9464, host: str = '127.0.0.1') -> ThreadingHTTPServer:
+        """Serve metrics over HTTP from a daemon thread; call shutdown() on the result to stop"""
+        instrumentation = self
+
+        class MetricsHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                body = instrumentation.render().encode()
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        server = ThreadingHTTPServer((host, port), MetricsHandler)
+        Thread(target=server.serve_forever, name="metrics-server", daemon=True).start()
+        return server
+
+def instrumented(method: Callable) -> Callable:
+    """Time a method as an operation of its object's `instrumentation`, if set"""
+    name = method.__name__
+
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        instrumentation = self.instrumentation
+        if instrumentation is None:
+            return method(self, *args, **kwargs)
+        call = instrumentation.start_operation()
+        started = time.perf_counter()
+        failed = True
+        try:
+            result = method(self, *args, **kwargs)
+            failed = result is False
+            return result
+        finally:
+            instrumentation.finish_operation(name, call, time.perf_counter() - started, failed)
+    return wrapper
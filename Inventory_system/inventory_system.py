@@ -1,31 +1,71 @@
-from typing import Dict, List, Optional
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional
 from sqlalchemy.orm import Session
 from .models.product import Product
 from .models.unit import Unit, UnitStatus
 from .models.location import Location, LocationType
 from .models.order import Order, OrderStatus
 from .managers.product_manager import ProductManager
+from .managers.product_cache import ProductCache
 from .managers.location_manager import LocationManager, LocationStrategy
-from .managers.order_manager import OrderManager
+from .managers.location_index import FreeLocationIndex
+from .managers.order_manager import IntakeResult, OrderManager
+from .managers.wave_planner import WavePlanner
 from .managers.unit_manager import UnitManager
+from .managers.stock_manager import StockManager
+from .managers.transaction import retry_on_conflict, rollback, unit_of_work
+from .instrumentation import Instrumentation, instrumented
 import logging
 
 logger = logging.getLogger(__name__)
 
 class InventorySystem:
-    def __init__(self, db: Session):
-        """Initialize managers with database session"""
+    def __init__(self, db: Session,
+                 product_cache: Optional[ProductCache] = None,
+                 location_index: Optional[FreeLocationIndex] = None,
+                 instrumentation: Optional[Instrumentation] = None):
+        """Initialize managers with database session.
+
+        Pass a ProductCache to serve product and price lookups from memory,
+        and a FreeLocationIndex to share putaway state; both may be shared by
+        systems on different sessions. Pass an Instrumentation to record
+        queries, rows and latency of every operation.
+        """
         self.db = db
-        self.product_manager = ProductManager(db)
-        self.location_manager = LocationManager(db)
+        self.instrumentation = instrumentation
+        if instrumentation is not None:
+            instrumentation.attach(db)
+        self.location_index = location_index if location_index is not None else FreeLocationIndex()
+        self.product_cache = product_cache
+        self.product_manager = ProductManager(db, product_cache)
+        self.location_manager = LocationManager(db, self.location_index)
         self.order_manager = OrderManager(db)
-        self.unit_manager = UnitManager(db)
+        self.unit_manager = UnitManager(db, self.location_index)
+        self.stock_manager = StockManager(db)
+        self.wave_planner = WavePlanner(db)
+
+    @contextmanager
+    def transaction(self, refresh: bool = False) -> Iterator["InventorySystem"]:
+        """Group operations into one database transaction.
+
+        Inside the block managers flush instead of committing and skip
+        refreshing new rows unless refresh=True. One commit covers the block;
+        any failure rolls back everything done in it.
+        """
+        try:
+            with unit_of_work(self.db, refresh):
+                yield self
+        except Exception:
+            # Index updates made inside the block may describe rolled back rows
+            self.location_index.clear()
+            raise
 
     def set_location_strategy(self, strategy: LocationStrategy):
         """Set location finding strategy"""
         self.location_manager.set_strategy(strategy)
 
     # Product Operations
+    @instrumented
     def add_product(self, product: Product) -> bool:
         """Add a new product"""
         try:
@@ -35,6 +75,7 @@ class InventorySystem:
             logger.error(f"Error adding product: {str(e)}")
             return False
 
+    @instrumented
     def update_product(self, product: Product) -> bool:
         """Update existing product"""
         try:
@@ -45,45 +86,126 @@ class InventorySystem:
             return False
 
     # Unit Operations
+    @instrumented
     def add_unit(self, unit: Unit) -> bool:
         """Add a new unit to inventory"""
         try:
-            # Find suitable location
-            location = self.location_manager.find_suitable_location(
-                self.product_manager.get_product(unit.product_id)
-            )
-            if not location:
+            product = self.product_manager.get_product(unit.product_id)
+            if not product:
+                logger.error(f"Error adding unit: product {unit.product_id} not found")
                 return False
 
-            self.unit_manager.create_unit(unit, location)
-            return True
+            # Another session may fill the chosen location first; choose again then
+            return retry_on_conflict(self.db, lambda: self._store_unit(unit, product),
+                                     self.unit_manager.max_attempts, self.unit_manager.backoff)
         except Exception as e:
             logger.error(f"Error adding unit: {str(e)}")
             return False
 
+    def _store_unit(self, unit: Unit, product: Product) -> bool:
+        """Find a location for a unit and store it there"""
+        location = self.location_manager.find_suitable_location(product)
+        if not location:
+            return False
+
+        self.unit_manager.create_unit(unit, location, product=product)
+        return True
+
+    @instrumented
+    def add_units_bulk(self, units: List[Unit]) -> Dict[str, Optional[str]]:
+        """Add many units in one transaction.
+
+        Returns the assigned location ID per unit ID, or None for units that
+        could not be placed or whose product does not exist.
+        """
+        results: Dict[str, Optional[str]] = {unit.unit_id: None for unit in units}
+        try:
+            products = self.product_manager.get_products(unit.product_id for unit in units)
+            placeable = [unit for unit in units if unit.product_id in products]
+            location_ids = self.location_manager.assign_locations(
+                [products[unit.product_id] for unit in placeable]
+            )
+
+            placed = []
+            for unit, location_id in zip(placeable, location_ids):
+                if location_id is not None:
+                    unit.location_id = location_id
+                    placed.append(unit)
+
+            self.unit_manager.create_units_bulk(placed)
+            for unit in placed:
+                results[unit.unit_id] = unit.location_id
+        except Exception as e:
+            logger.error(f"Error adding units in bulk: {str(e)}")
+            self.location_index.clear()
+            return {unit.unit_id: None for unit in units}
+        return results
+
+    @instrumented
     def remove_unit(self, unit_id: str) -> bool:
         """Remove a unit from inventory"""
         return self.unit_manager.remove_unit(unit_id)
 
     # Order Operations
+    @instrumented
     def place_order(self, order: Order) -> bool:
         """Place a new order"""
         try:
+            order.calculate_total(self.product_manager.get_prices(order.products))
             self.order_manager.create_order(order)
             return True
         except Exception as e:
             logger.error(f"Error placing order: {str(e)}")
             return False
 
+    @instrumented
+    def place_orders(self, orders: List[Order]) -> List[Dict]:
+        """Place a batch of orders, skipping retried idempotency keys.
+
+        Returns one outcome per order; see OrderManager.create_orders. If the
+        batch fails, for instance on a conflict that outlasts the retries,
+        it is rolled back and every order is reported as rejected.
+        """
+        try:
+            prices = self.product_manager.get_prices(
+                {product_id for order in orders for product_id in order.products}
+            )
+            return self.order_manager.create_orders(orders, prices)
+        except Exception as e:
+            rollback(self.db)
+            logger.error(f"Error placing orders: {str(e)}")
+            return [
+                {'order_id': order.order_id, 'result': IntakeResult.REJECTED, 'reason': str(e)}
+                for order in orders
+            ]
+
+    @instrumented
     def process_order(self, order_id: str) -> bool:
         """Process an existing order"""
         return self.order_manager.process_order(order_id)
 
+    @instrumented
     def cancel_order(self, order_id: str) -> bool:
         """Cancel an order"""
         return self.order_manager.cancel_order(order_id)
 
+    @instrumented
+    def deliver_order(self, order_id: str) -> bool:
+        """Mark a shipped order as delivered"""
+        return self.order_manager.deliver_order(order_id)
+
+    @instrumented
+    def release_wave(self, limit: int = 1000) -> Dict:
+        """Reserve units for a wave of pending orders and get its pick list"""
+        return self.wave_planner.release_wave(limit)
+
+    @instrumented
+    def ship_orders(self, order_ids: List[str]) -> List[str]:
+        """Ship picked wave orders"""
+        return self.order_manager.ship_orders(order_ids)
+
     # Location Operations
+    @instrumented
     def add_location(self, location: Location) -> bool:
         """Add a new location"""
         try:
@@ -93,21 +215,38 @@ class InventorySystem:
             logger.error(f"Error adding location: {str(e)}")
             return False
 
+    # Stock Counters
+    @instrumented
+    def verify_stock(self, repair: bool = False) -> Dict:
+        """Check stock counters against units, optionally rebuilding them on drift"""
+        try:
+            drift = self.stock_manager.verify()
+            if drift and repair:
+                logger.warning(f"Rebuilding stock levels, {len(drift)} products drifted")
+                self.stock_manager.rebuild()
+            return drift
+        except Exception as e:
+            logger.error(f"Error verifying stock levels: {str(e)}")
+            return {}
+
     # Reporting
+    @instrumented
     def generate_report(self) -> Dict:
-        """Generate inventory report"""
+        """Generate inventory report from SQL aggregates"""
         try:
-            total_products = len(self.product_manager.list_products())
-            total_units = len(self.unit_manager.list_units())
-            available_locations = len(self.location_manager.list_available_locations())
-            pending_orders = len(self.order_manager.list_orders(OrderStatus.PENDING))
+            units_by_status = self.stock_manager.totals()
+            locations_by_type = self.location_manager.count_by_type()
+            orders_by_status = self.order_manager.count_by_status()
 
             return {
-                'total_products': total_products,
-                'total_units': total_units,
-                'available_locations': available_locations,
-                'pending_orders': pending_orders
+                'total_products': self.product_manager.count_products(),
+                'total_units': sum(units_by_status.values()),
+                'available_locations': sum(c['free'] for c in locations_by_type.values()),
+                'pending_orders': orders_by_status[OrderStatus.PENDING.value],
+                'units_by_status': units_by_status,
+                'locations_by_type': locations_by_type,
+                'orders_by_status': orders_by_status
             }
         except Exception as e:
             logger.error(f"Error generating report: {str(e)}")
-            return {} 
\ No newline at end of file
+            return {}
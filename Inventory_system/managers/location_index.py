@@ -0,0 +1,336 @@
+from bisect import bisect_left, bisect_right, insort
+from threading import RLock
+from typing import Callable, Dict, Hashable, Iterable, List, Optional, Tuple, Union
+
+Shape = Tuple[float, float, float]
+Position = Tuple[float, float, float]
+Capacity = Tuple[float, float, float]  # Remaining (volume, weight, units)
+
+DIMENSION_KEYS = ('length', 'width', 'height')
+
+# Allowance for floating point drift in summed volumes and weights
+TOLERANCE = 1e-9
+
+
+def shape_of(dimensions: Union[Dict[str, float], Shape]) -> Shape:
+    """Convert a dimensions dictionary to an orientation-independent shape.
+
+    The dimensions are sorted, so a product fits a bin whenever it fits in
+    some axis-aligned rotation. Shapes, such as those from Product.shape(),
+    are returned as they are.
+    """
+    if isinstance(dimensions, tuple):
+        return dimensions
+    return tuple(sorted(dimensions[k] for k in DIMENSION_KEYS))
+
+
+def shape_fits(product_shape: Shape, location_shape: Shape) -> bool:
+    """Check if a product shape fits inside a location shape"""
+    return all(p <= l for p, l in zip(product_shape, location_shape))
+
+
+def dimensions_fit(product_dimensions: Dict[str, float],
+                   location_dimensions: Dict[str, float]) -> bool:
+    """Check if a product fits a location in some orientation"""
+    return shape_fits(shape_of(product_dimensions), shape_of(location_dimensions))
+
+
+def entrance_distance(entrance: Position, position: Optional[Position]) -> float:
+    """Euclidean distance from an entrance, infinite for bins without coordinates"""
+    if position is None:
+        return float('inf')
+    return sum((p - e) ** 2 for p, e in zip(position, entrance)) ** 0.5
+
+
+def capacity_fits(capacity: Capacity, volume: float, weight: float) -> bool:
+    """Check if one unit of the given volume and weight fits a remaining capacity"""
+    return (volume <= capacity[0] + TOLERANCE
+            and weight <= capacity[1] + TOLERANCE
+            and capacity[2] >= 1)
+
+
+def capacity_exhausted(capacity: Capacity) -> bool:
+    """Check if any capacity limit is used up"""
+    return capacity[0] <= TOLERANCE or capacity[1] <= TOLERANCE or capacity[2] < 1
+
+
+class SortedBins:
+    """Bins with free capacity kept sorted by a key, in blocks.
+
+    Each block of consecutive bins records the largest sorted sides and
+    remaining capacity among its bins. A lookup walks the blocks in key
+    order and only looks inside blocks whose maxima could take the unit, so
+    its cost depends on the number of blocks and the bins that almost fit,
+    not on how many distinct shapes or fill levels there are.
+    """
+
+    BLOCK_SIZE = 128
+
+    def __init__(self):
+        self._blocks: List[List[Tuple]] = []   # (key, location_id, shape, capacity), sorted
+        self._firsts: List[Tuple] = []         # (key, location_id) of each block's first bin
+        self._maxima: List[Tuple] = []         # Largest (*shape, *capacity) of each block
+
+    @staticmethod
+    def _block_maxima(block: List[Tuple]) -> Tuple:
+        return tuple(map(max, zip(*(entry[2] + entry[3] for entry in block))))
+
+    def add(self, key: float, location_id: str, shape: Shape, capacity: Capacity):
+        """Insert a bin, which must not be present"""
+        entry = (key, location_id, shape, capacity)
+        if not self._blocks:
+            self._blocks.append([entry])
+            self._firsts.append(entry[:2])
+            self._maxima.append(shape + capacity)
+            return
+        i = max(0, bisect_right(self._firsts, entry[:2]) - 1)
+        block = self._blocks[i]
+        insort(block, entry)
+        self._firsts[i] = block[0][:2]
+        self._maxima[i] = tuple(map(max, self._maxima[i], shape + capacity))
+        if len(block) > 2 * self.BLOCK_SIZE:
+            half = len(block) // 2
+            tail = block[half:]
+            del block[half:]
+            self._maxima[i] = self._block_maxima(block)
+            self._blocks.insert(i + 1, tail)
+            self._firsts.insert(i + 1, tail[0][:2])
+            self._maxima.insert(i + 1, self._block_maxima(tail))
+
+    def remove(self, key: float, location_id: str):
+        """Remove a bin added with this key"""
+        i = bisect_right(self._firsts, (key, location_id)) - 1
+        if i < 0:
+            return
+        block = self._blocks[i]
+        j = bisect_left(block, (key, location_id))
+        if j == len(block) or block[j][:2] != (key, location_id):
+            return
+        entry = block.pop(j)
+        if not block:
+            del self._blocks[i], self._firsts[i], self._maxima[i]
+            return
+        self._firsts[i] = block[0][:2]
+        if any(value == top for value, top in zip(entry[2] + entry[3], self._maxima[i])):
+            self._maxima[i] = self._block_maxima(block)
+
+    def clear(self):
+        self._blocks.clear()
+        self._firsts.clear()
+        self._maxima.clear()
+
+    def first(self, product_shape: Shape, volume: float, weight: float) -> Optional[str]:
+        """Lowest-keyed bin that can take one unit of the given shape, volume and weight"""
+        for block, top in zip(self._blocks, self._maxima):
+            if (top[0] < product_shape[0] or top[1] < product_shape[1] or top[2] < product_shape[2]
+                    or not capacity_fits(top[3:], volume, weight)):
+                continue
+            for _, location_id, shape, capacity in block:
+                if shape_fits(product_shape, shape) and capacity_fits(capacity, volume, weight):
+                    return location_id
+        return None
+
+
+class FreeLocationIndex:
+    """In-memory index of locations with free capacity.
+
+    Locations are kept sorted by remaining volume in SortedBins, so the
+    first bin found that can take a unit is also the best fit. Remaining
+    capacity lives inside the blocks, so partially filled bins do not
+    multiply the structures a lookup has to visit.
+    """
+
+    def __init__(self):
+        self._lock = RLock()
+        self._bins = SortedBins()
+        self._shape_by_id: Dict[str, Shape] = {}
+        self._capacity_by_id: Dict[str, Capacity] = {}
+        self._position_by_id: Dict[str, Optional[Position]] = {}
+        self._listeners: List = []
+        self._mirrors: Dict[Hashable, object] = {}
+        self.is_loaded = False
+
+    def add_listener(self, listener):
+        """Mirror index changes to a listener.
+
+        The listener must implement
+        location_added(location_id, shape, position, capacity),
+        location_removed(location_id) and index_cleared(). It is called with
+        the index lock held, and immediately receives the current contents.
+        """
+        with self._lock:
+            if listener in self._listeners:
+                return
+            self._listeners.append(listener)
+            listener.index_cleared()
+            for location_id, shape in self._shape_by_id.items():
+                listener.location_added(location_id, shape, self._position_by_id[location_id],
+                                        self._capacity_by_id[location_id])
+
+    def mirror(self, key: Hashable, factory: Callable[[], object]):
+        """Get the listener shared under key, creating and adding it on first use.
+
+        Strategies use this for their derived indexes, so any number of
+        managers on one index keep a single copy of each up to date.
+        """
+        with self._lock:
+            listener = self._mirrors.get(key)
+            if listener is None:
+                listener = self._mirrors[key] = factory()
+                self.add_listener(listener)
+            return listener
+
+    def remove_listener(self, listener):
+        """Stop mirroring index changes to a listener"""
+        with self._lock:
+            if listener in self._listeners:
+                self._listeners.remove(listener)
+            for key, mirror in list(self._mirrors.items()):
+                if mirror is listener:
+                    del self._mirrors[key]
+
+    def load(self, locations: Iterable[Tuple]):
+        """Replace index contents with (location_id, dimensions or shape[, position[, capacity]]) tuples"""
+        with self._lock:
+            self.clear()
+            for location_id, dimensions, *rest in locations:
+                self.add(location_id, dimensions, *rest)
+            self.is_loaded = True
+
+    def clear(self):
+        """Remove all locations and mark the index as not loaded"""
+        with self._lock:
+            self._bins.clear()
+            self._shape_by_id.clear()
+            self._capacity_by_id.clear()
+            self._position_by_id.clear()
+            self.is_loaded = False
+            for listener in self._listeners:
+                listener.index_cleared()
+
+    def add(self, location_id: str, dimensions: Union[Dict[str, float], Shape],
+            position: Optional[Position] = None,
+            capacity: Optional[Capacity] = None):
+        """Record a location's free capacity, an empty bin when capacity is None"""
+        shape = shape_of(dimensions)
+        if capacity is None:
+            capacity = (shape[0] * shape[1] * shape[2], float('inf'), float('inf'))
+        with self._lock:
+            if capacity_exhausted(capacity):
+                self.discard(location_id)
+                return
+            if (self._capacity_by_id.get(location_id) == capacity
+                    and self._shape_by_id[location_id] == shape
+                    and self._position_by_id[location_id] == position):
+                return
+            self.discard(location_id)
+            self._bins.add(capacity[0], location_id, shape, capacity)
+            self._shape_by_id[location_id] = shape
+            self._capacity_by_id[location_id] = capacity
+            self._position_by_id[location_id] = position
+            for listener in self._listeners:
+                listener.location_added(location_id, shape, position, capacity)
+
+    def sync(self, location):
+        """Record a Location's current free capacity, or drop it if it is unavailable"""
+        if location.is_available():
+            self.add(location.location_id, location.shape(),
+                     location.position(), location.free_capacity())
+        else:
+            self.discard(location.location_id)
+
+    def reserve(self, location_id: str, dimensions: Union[Dict[str, float], Shape], weight: float):
+        """Take the space of one unit with the given dimensions and weight"""
+        shape = shape_of(dimensions)
+        with self._lock:
+            capacity = self._capacity_by_id.get(location_id)
+            if capacity is None:
+                return
+            volume, weight_left, units = capacity
+            self.add(location_id, self._shape_by_id[location_id], self._position_by_id[location_id],
+                     (volume - shape[0] * shape[1] * shape[2], weight_left - weight, units - 1))
+
+    def discard(self, location_id: str):
+        """Mark location as having no free capacity"""
+        with self._lock:
+            capacity = self._capacity_by_id.pop(location_id, None)
+            if capacity is None:
+                return
+            del self._shape_by_id[location_id]
+            del self._position_by_id[location_id]
+            self._bins.remove(capacity[0], location_id)
+            for listener in self._listeners:
+                listener.location_removed(location_id)
+
+    def find(self, dimensions: Union[Dict[str, float], Shape], weight: float = 0.0) -> Optional[str]:
+        """Find the location with the least remaining volume that can take one unit"""
+        product_shape = shape_of(dimensions)
+        volume = product_shape[0] * product_shape[1] * product_shape[2]
+        with self._lock:
+            return self._bins.first(product_shape, volume, weight)
+
+    def capacity(self, location_id: str) -> Optional[Capacity]:
+        """Remaining capacity of an indexed location"""
+        return self._capacity_by_id.get(location_id)
+
+    def __contains__(self, location_id: str) -> bool:
+        return location_id in self._shape_by_id
+
+    def __len__(self) -> int:
+        return len(self._shape_by_id)
+
+
+class EntranceDistanceIndex:
+    """Locations with free capacity ordered by distance from a fixed entrance point.
+
+    Bins are kept in SortedBins keyed by distance, so the nearest bin that
+    can take a unit is the first one that fits, and runs of bins that are
+    all too small or too full are skipped a block at a time. Bins without
+    coordinates rank after every located bin. Use
+    FreeLocationIndex.mirror to share one per index and entrance.
+    """
+
+    def __init__(self, entrance: Position = (0.0, 0.0, 0.0)):
+        self.entrance = tuple(entrance)
+        self._lock = RLock()
+        self._bins = SortedBins()
+        self._distance_by_id: Dict[str, float] = {}
+
+    def distance(self, position: Optional[Position]) -> float:
+        """Euclidean distance from the entrance, infinite when unknown"""
+        return entrance_distance(self.entrance, position)
+
+    # FreeLocationIndex listener interface
+    def location_added(self, location_id: str, shape: Shape,
+                       position: Optional[Position], capacity: Capacity):
+        """Track a bin with free capacity"""
+        distance = self.distance(position)
+        with self._lock:
+            previous = self._distance_by_id.get(location_id)
+            if previous is not None:
+                self._bins.remove(previous, location_id)
+            self._bins.add(distance, location_id, shape, capacity)
+            self._distance_by_id[location_id] = distance
+
+    def location_removed(self, location_id: str):
+        """Stop tracking a bin"""
+        with self._lock:
+            distance = self._distance_by_id.pop(location_id, None)
+            if distance is not None:
+                self._bins.remove(distance, location_id)
+
+    def index_cleared(self):
+        """Stop tracking all bins"""
+        with self._lock:
+            self._bins.clear()
+            self._distance_by_id.clear()
+
+    def nearest(self, dimensions: Union[Dict[str, float], Shape], weight: float = 0.0) -> Optional[str]:
+        """Find the bin nearest the entrance that can take one unit"""
+        product_shape = shape_of(dimensions)
+        volume = product_shape[0] * product_shape[1] * product_shape[2]
+        with self._lock:
+            return self._bins.first(product_shape, volume, weight)
+
+    def __len__(self) -> int:
+        return len(self._distance_by_id)
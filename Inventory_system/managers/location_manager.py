@@ -1,50 +1,108 @@
+from sqlalchemy import func, or_
 from sqlalchemy.orm import Session
 from ..models.location import Location, LocationType
 from ..models.product import Product
-from typing import List, Optional, Protocol, Dict
+from .location_index import (TOLERANCE, Capacity, EntranceDistanceIndex, FreeLocationIndex, Position,
+                             entrance_distance)
+from .pagination import DEFAULT_BATCH_SIZE, DEFAULT_PAGE_SIZE, iter_keyset, page_keyset
+from .transaction import commit, refresh, retry_on_conflict
+from typing import Iterator, List, Optional, Protocol, Dict, Tuple
 from abc import ABC, abstractmethod
 
+def _free_capacity(row) -> Capacity:
+    """Remaining (volume, weight, units) of a location row"""
+    return (
+        row.volume - row.used_volume,
+        float('inf') if row.max_weight is None else row.max_weight - row.used_weight,
+        float('inf') if row.max_units is None else row.max_units - row.unit_count
+    )
+
 class LocationStrategy(ABC):
+    # Strategies that implement find_location_id set this; the others are
+    # served by scanning the available locations
+    supports_index = False
+
     @abstractmethod
     def find_location(self, product: Product, locations: List[Location]) -> Optional[Location]:
         pass
 
+    def find_location_id(self, product: Product, index: FreeLocationIndex) -> Optional[str]:
+        """Find location ID using the free location index.
+
+        Strategies that set supports_index override this; the default finds
+        nothing, and LocationManager scans the available locations instead.
+        """
+        return None
+
+    def find_location_ids(self, products: List[Product], index: FreeLocationIndex) -> List[Optional[str]]:
+        """Find a location ID for each product, reserving its space in the index"""
+        assigned = []
+        for product in products:
+            location_id = self.find_location_id(product, index)
+            if location_id is not None:
+                index.reserve(location_id, product.shape(), product.weight)
+            assigned.append(location_id)
+        return assigned
+
 class NearestEntranceStrategy(LocationStrategy):
+    """Pick the fitting location closest to the entrance.
+
+    Locations without coordinates are only used when no located bin fits.
+    """
+    supports_index = True
+
+    def __init__(self, entrance: Position = (0.0, 0.0, 0.0)):
+        self.entrance = tuple(entrance)
+
     def find_location(self, product: Product, locations: List[Location]) -> Optional[Location]:
         """Find location nearest to entrance"""
-        # In a real system, locations would have coordinates
-        # For now, just return first available matching location
+        best_location = None
+        min_distance = None
+
         for location in locations:
-            if (location.is_available() and 
-                all(product.dimensions[k] <= location.dimensions[k] 
-                    for k in ['length', 'width', 'height'])):
-                return location
-        return None
+            if location.can_hold(product):
+                distance = entrance_distance(self.entrance, location.position())
+                if min_distance is None or distance < min_distance:
+                    min_distance = distance
+                    best_location = location
+
+        return best_location
+
+    def find_location_id(self, product: Product, index: FreeLocationIndex) -> Optional[str]:
+        """Find location ID nearest to entrance from the index"""
+        distances = index.mirror(('entrance', self.entrance),
+                                 lambda: EntranceDistanceIndex(self.entrance))
+        return distances.nearest(product.shape(), product.weight)
 
 class OptimalSpaceStrategy(LocationStrategy):
+    supports_index = True
+
     def find_location(self, product: Product, locations: List[Location]) -> Optional[Location]:
-        """Find location with least wasted space"""
+        """Find location with least remaining volume"""
         best_location = None
         min_waste = float('inf')
         
         for location in locations:
-            if not location.is_available():
-                continue
-                
-            if all(product.dimensions[k] <= location.dimensions[k] 
-                  for k in ['length', 'width', 'height']):
-                waste = sum(location.dimensions[k] - product.dimensions[k] 
-                          for k in ['length', 'width', 'height'])
+            if location.can_hold(product):
+                waste = location.remaining_volume() - product.volume
                 if waste < min_waste:
                     min_waste = waste
                     best_location = location
                     
         return best_location
 
+    def find_location_id(self, product: Product, index: FreeLocationIndex) -> Optional[str]:
+        """Find location ID with least remaining volume from the index"""
+        return index.find(product.shape(), product.weight)
+
 class LocationManager:
-    def __init__(self, db: Session):
+    def __init__(self, db: Session, index: Optional[FreeLocationIndex] = None,
+                 max_attempts: int = 5, backoff: float = 0.01):
         self.db = db
         self.strategy: LocationStrategy = NearestEntranceStrategy()
+        self.index = index if index is not None else FreeLocationIndex()
+        self.max_attempts = max_attempts
+        self.backoff = backoff
 
     def set_strategy(self, strategy: LocationStrategy):
         """Set location finding strategy"""
@@ -53,25 +111,103 @@ class LocationManager:
     def create_location(self, location: Location) -> Location:
         """Create a new location"""
         self.db.add(location)
-        self.db.commit()
-        self.db.refresh(location)
+        commit(self.db)
+        refresh(self.db, location)
+        self.index.sync(location)
         return location
 
     def get_location(self, location_id: str) -> Optional[Location]:
         """Get location by ID"""
         return self.db.query(Location).filter(Location.location_id == location_id).first()
 
-    def find_suitable_location(self, product: Product) -> Optional[Location]:
-        """Find suitable location using current strategy"""
-        available_locations = (
-            self.db.query(Location)
+    def load_index(self):
+        """Rebuild the free location index from the database"""
+        rows = (
+            self.db.query(Location.location_id,
+                          Location.shortest_side, Location.middle_side, Location.longest_side,
+                          Location.x, Location.y, Location.z,
+                          Location.volume, Location.used_volume,
+                          Location.max_weight, Location.used_weight,
+                          Location.max_units, Location.unit_count)
             .filter(Location.is_occupied == False)
-            .all()
         )
-        return self.strategy.find_location(product, available_locations)
+        self.index.load(
+            (row.location_id, (row.shortest_side, row.middle_side, row.longest_side),
+             None if None in (row.x, row.y, row.z) else (row.x, row.y, row.z),
+             _free_capacity(row))
+            for row in rows
+        )
+
+    def find_suitable_location(self, product: Product) -> Optional[Location]:
+        """Find suitable location using current strategy"""
+        if self.strategy.supports_index:
+            return self._find_indexed_location(product)
+
+        return self.strategy.find_location(product, self.list_available_locations(product))
+
+    def assign_locations(self, products: List[Product]) -> List[Optional[str]]:
+        """Pick a distinct location ID for each product in one pass.
+
+        A location may be assigned to several products while it has room.
+        Assigned space is reserved in the free location index, so the caller
+        must store the units or reload the index if the batch is dropped.
+        """
+        if self.strategy.supports_index:
+            return self._assign_indexed_locations(products)
+
+        free_locations = self.list_available_locations()
+        assigned = []
+        try:
+            for product in products:
+                location = self.strategy.find_location(product, free_locations)
+                if location:
+                    # Track planned space on the loaded rows, discarded below
+                    location.store(product)
+                    self.index.reserve(location.location_id, product.shape(), product.weight)
+                assigned.append(location.location_id if location else None)
+        finally:
+            for location in free_locations:
+                self.db.expire(location)
+        return assigned
+
+    def _assign_indexed_locations(self, products: List[Product]) -> List[Optional[str]]:
+        """Pick location IDs from the free location index"""
+        if not self.index.is_loaded:
+            self.load_index()
+
+        return self.strategy.find_location_ids(products, self.index)
+
+    def _find_indexed_location(self, product: Product) -> Optional[Location]:
+        """Find location through the free location index, refreshing stale entries"""
+        if not self.index.is_loaded:
+            self.load_index()
+
+        synced = set()
+        while True:
+            location_id = self.strategy.find_location_id(product, self.index)
+            if location_id is None:
+                return None
+            location = self.get_location(location_id)
+            if location and location.can_hold(product):
+                return location
+            if location is None or location_id in synced:
+                self.index.discard(location_id)
+            else:
+                # Another session changed it; keep whatever room is left for smaller units
+                self.index.sync(location)
+                synced.add(location_id)
 
     def update_location_status(self, location_id: str, is_occupied: bool) -> bool:
-        """Update location occupancy status"""
+        """Update location occupancy status.
+
+        Retried if the location changes in another session meanwhile; raises
+        StaleDataConflict once retries run out.
+        """
+        return retry_on_conflict(self.db, lambda: self._update_location_status(location_id, is_occupied),
+                                 self.max_attempts, self.backoff)
+
+    def _update_location_status(self, location_id: str, is_occupied: bool) -> bool:
+        """Open or close a location in one attempt"""
         location = self.get_location(location_id)
         if not location:
             return False
@@ -82,13 +218,67 @@ class LocationManager:
             success = location.vacate()
             
         if success:
-            self.db.commit()
+            commit(self.db)
+            self.index.sync(location)
         return success
 
-    def list_available_locations(self) -> List[Location]:
-        """List all available locations"""
-        return self.db.query(Location).filter(Location.is_occupied == False).all()
+    def _available_query(self, product: Optional[Product] = None):
+        """Query open locations, limited to those that can hold one unit of product.
+
+        The sorted side columns make the orientation-independent fit a set of
+        range predicates, so the whole check runs in SQL.
+        """
+        query = self.db.query(Location).filter(Location.is_occupied == False)
+        if product is not None:
+            query = (
+                query
+                .filter(*Location.fits_shape(product.shape()))
+                .filter(Location.volume - Location.used_volume >= product.volume - TOLERANCE)
+                .filter(or_(Location.max_weight == None,
+                            Location.max_weight - Location.used_weight >= product.weight - TOLERANCE))
+                .filter(or_(Location.max_units == None, Location.unit_count < Location.max_units))
+            )
+        return query
+
+    def list_available_locations(self, product: Optional[Product] = None) -> List[Location]:
+        """List open locations, or those with room for one unit of product"""
+        return self._available_query(product).all()
+
+    def iter_available_locations(self, batch_size: int = DEFAULT_BATCH_SIZE,
+                                 product: Optional[Product] = None) -> Iterator[Location]:
+        """Stream open locations, or those with room for one unit of product, in bounded batches"""
+        return iter_keyset(self._available_query(product), Location.location_id, batch_size)
+
+    def page_available_locations(self, limit: int = DEFAULT_PAGE_SIZE,
+                                 cursor: Optional[str] = None) -> Tuple[List[Location], Optional[str]]:
+        """Get one page of available locations and the cursor for the next page"""
+        query = self.db.query(Location).filter(Location.is_occupied == False)
+        return page_keyset(query, Location.location_id, limit, cursor)
 
     def get_locations_by_type(self, location_type: LocationType) -> List[Location]:
         """Get locations by type"""
-        return self.db.query(Location).filter(Location.type == location_type).all() 
\ No newline at end of file
+        return self.db.query(Location).filter(Location.type == location_type).all() 
+
+    def iter_locations_by_type(self, location_type: LocationType,
+                               batch_size: int = DEFAULT_BATCH_SIZE) -> Iterator[Location]:
+        """Stream locations of a type in bounded batches"""
+        query = self.db.query(Location).filter(Location.type == location_type)
+        return iter_keyset(query, Location.location_id, batch_size)
+
+    def page_locations_by_type(self, location_type: LocationType,
+                               limit: int = DEFAULT_PAGE_SIZE,
+                               cursor: Optional[str] = None) -> Tuple[List[Location], Optional[str]]:
+        """Get one page of locations of a type and the cursor for the next page"""
+        query = self.db.query(Location).filter(Location.type == location_type)
+        return page_keyset(query, Location.location_id, limit, cursor)
+
+    def count_by_type(self) -> Dict[str, Dict[str, int]]:
+        """Count free and occupied locations per location type"""
+        counts = {t.value: {'free': 0, 'occupied': 0} for t in LocationType}
+        rows = (
+            self.db.query(Location.type, Location.is_occupied, func.count(Location.location_id))
+            .group_by(Location.type, Location.is_occupied)
+        )
+        for location_type, is_occupied, count in rows:
+            counts[location_type.value]['occupied' if is_occupied else 'free'] += count
+        return counts
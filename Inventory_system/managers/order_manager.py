@@ -1,115 +1,529 @@
+from sqlalchemy import func, insert, literal, select
+from sqlalchemy.exc import IntegrityError, OperationalError
 from sqlalchemy.orm import Session
 from ..models.order import Order, OrderStatus
 from ..models.unit import Unit, UnitStatus
-from typing import List, Optional, Dict
+from ..models.reservation import Reservation
+from .stock_manager import StockManager
+from .outbox import record_bulk_status_changes, record_selected_status_changes, record_status_change
+from .pagination import DEFAULT_BATCH_SIZE, DEFAULT_PAGE_SIZE, iter_keyset, page_keyset
+from .transaction import StaleDataConflict, back_off, commit, in_unit_of_work, refresh, retry_on_conflict, rollback
+from typing import Iterator, List, Optional, Dict, Tuple
+from enum import Enum
 import logging
 from datetime import datetime
 
 logger = logging.getLogger(__name__)
 
+# Keep IN lists below SQLite's bound parameter limit
+SHIP_CHUNK_SIZE = 500
+
+class ReservationConflict(ValueError):
+    """Raised when units picked for an order were claimed by another worker"""
+
+class IntakeResult(str, Enum):
+    ACCEPTED = "accepted"
+    DUPLICATE = "duplicate"
+    REJECTED = "rejected"
+
+def allocate(orders: List[Tuple[str, Dict[str, int]]],
+             supply: Dict[str, int]) -> Tuple[List[str], List[str]]:
+    """Choose which orders the supply can fill completely.
+
+    Orders are served first come, first served in the given order. An order
+    that cannot be filled in full is skipped rather than blocking the orders
+    behind it, and takes no stock. Returns the allocated and the backordered
+    order IDs.
+    """
+    remaining = dict(supply)
+    allocated, backordered = [], []
+    for order_id, products in orders:
+        if all(remaining.get(product_id, 0) >= quantity
+               for product_id, quantity in products.items()):
+            for product_id, quantity in products.items():
+                remaining[product_id] -= quantity
+            allocated.append(order_id)
+        else:
+            backordered.append(order_id)
+    return allocated, backordered
+
 class OrderManager:
-    def __init__(self, db: Session):
+    def __init__(self, db: Session, max_attempts: int = 5, backoff: float = 0.01):
+        """Initialize with database session.
+
+        Contended reservations are retried up to max_attempts times with
+        jittered exponential backoff starting at backoff seconds.
+        """
         self.db = db
+        self.stock = StockManager(db)
+        self.max_attempts = max_attempts
+        self.backoff = backoff
 
     def create_order(self, order: Order) -> Order:
-        """Create a new order"""
+        """Create a new order, or return the order already placed under its idempotency key"""
+        if order.idempotency_key is not None:
+            placed = (
+                self.db.query(Order)
+                .filter(Order.idempotency_key == order.idempotency_key)
+                .first()
+            )
+            if placed is not None:
+                return placed
+
         # Verify product availability
+        available = self.stock.available(order.products)
         for product_id, quantity in order.products.items():
-            available_units = (
-                self.db.query(Unit)
-                .filter(Unit.product_id == product_id)
-                .filter(Unit.status == UnitStatus.AVAILABLE)
-                .count()
-            )
-            if available_units < quantity:
+            if available[product_id] < quantity:
                 raise ValueError(f"Insufficient units available for product {product_id}")
 
+        order.sequence = self._next_sequence()
         self.db.add(order)
-        self.db.commit()
-        self.db.refresh(order)
+        commit(self.db)
+        refresh(self.db, order)
         return order
 
+    def _next_sequence(self) -> int:
+        """Sequence number for the next placed order, one past the highest so far"""
+        return (self.db.execute(self._last_sequence_query()).scalar() or 0) + 1
+
+    @staticmethod
+    def _last_sequence_query():
+        """Select the highest order sequence number"""
+        return select(func.max(Order.sequence))
+
+    def create_orders(self, orders: List[Order],
+                      prices: Dict[str, float]) -> List[Dict]:
+        """Create a batch of orders in one transaction.
+
+        Orders whose idempotency_key was already placed, earlier or in the
+        same batch, are reported as duplicates of the first order instead of
+        being placed again. Stock for the batch is read in one query and the
+        remaining orders are accepted first come, first served while it lasts,
+        as in a wave. Accepted orders are inserted with one executemany.
+        Returns one outcome per order, in batch order, with `order_id`,
+        `result` and `reason`; the `order_id` of a duplicate is the original.
+        A concurrent batch placing the same keys is retried with backoff.
+        """
+        attempts = 1 if in_unit_of_work(self.db) else self.max_attempts
+        for attempt in range(1, attempts + 1):
+            try:
+                return self._create_orders_once(orders, prices)
+
+            except (IntegrityError, OperationalError) as e:
+                rollback(self.db)
+                if attempt == attempts:
+                    raise
+                logger.info(f"Retrying order batch after conflict: {str(e)}")
+                back_off(self.backoff, attempt)
+
+    def _create_orders_once(self, orders: List[Order],
+                            prices: Dict[str, float]) -> List[Dict]:
+        """Deduplicate, allocate and insert a batch of orders in the current transaction"""
+        placed_keys, existing_ids = self._existing_orders(orders)
+
+        outcomes: List[Optional[Dict]] = [None] * len(orders)
+        first_by_key: Dict[str, int] = {}
+        batch_ids = set()
+        candidates = []
+        for position, order in enumerate(orders):
+            key = order.idempotency_key
+            if key is not None and key in placed_keys:
+                outcomes[position] = self._outcome(placed_keys[key], IntakeResult.DUPLICATE)
+            elif key is not None and key in first_by_key:
+                continue  # Resolved below, once the first order's outcome is known
+            elif order.order_id in existing_ids or order.order_id in batch_ids:
+                outcomes[position] = self._outcome(order.order_id, IntakeResult.REJECTED,
+                                                   "Order ID already exists")
+            else:
+                unknown = sorted(set(order.products) - prices.keys())
+                if unknown:
+                    outcomes[position] = self._outcome(order.order_id, IntakeResult.REJECTED,
+                                                       f"Unknown products {', '.join(unknown)}")
+                else:
+                    candidates.append(position)
+            if key is not None:
+                first_by_key.setdefault(key, position)
+            batch_ids.add(order.order_id)
+
+        # One stock read covers the whole batch
+        supply = self.stock.available(
+            product_id for position in candidates for product_id in orders[position].products
+        )
+        allocated, backordered = allocate(
+            [(position, orders[position].products) for position in candidates], supply
+        )
+        for position in backordered:
+            outcomes[position] = self._outcome(orders[position].order_id, IntakeResult.REJECTED,
+                                               "Insufficient units available")
+
+        rows = []
+        sequence = self._next_sequence() if allocated else None
+        for position in allocated:
+            order = orders[position]
+            order.calculate_total(prices)
+            rows.append({
+                'order_id': order.order_id,
+                'customer_id': order.customer_id,
+                'products': order.products,
+                'status': OrderStatus.PENDING,
+                'total_amount': order.total_amount,
+                'idempotency_key': order.idempotency_key,
+                'sequence': sequence + len(rows)
+            })
+            outcomes[position] = self._outcome(order.order_id, IntakeResult.ACCEPTED)
+        if rows:
+            self.db.execute(insert(Order.__table__), rows)
+            record_bulk_status_changes(self.db, 'order', [row['order_id'] for row in rows],
+                                  None, OrderStatus.PENDING)
+        commit(self.db)
+
+        # Later submissions of a key share the outcome of the first one
+        for position, order in enumerate(orders):
+            if outcomes[position] is None:
+                first = outcomes[first_by_key[order.idempotency_key]]
+                if first['result'] == IntakeResult.ACCEPTED:
+                    outcomes[position] = self._outcome(first['order_id'], IntakeResult.DUPLICATE)
+                else:
+                    outcomes[position] = self._outcome(order.order_id, first['result'], first['reason'])
+        return outcomes
+
+    def _existing_orders(self, orders: List[Order]) -> Tuple[Dict[str, str], set]:
+        """Order IDs already placed under the batch's idempotency keys, and batch order IDs that exist"""
+        keys = list({order.idempotency_key for order in orders if order.idempotency_key is not None})
+        order_ids = list({order.order_id for order in orders})
+        placed_keys = {}
+        for start in range(0, len(keys), SHIP_CHUNK_SIZE):
+            rows = self.db.execute(self._placed_keys_query(keys[start:start + SHIP_CHUNK_SIZE]))
+            placed_keys.update((key, order_id) for key, order_id in rows)
+        existing_ids = set()
+        for start in range(0, len(order_ids), SHIP_CHUNK_SIZE):
+            existing_ids.update(self.db.execute(
+                select(Order.order_id)
+                .where(Order.order_id.in_(order_ids[start:start + SHIP_CHUNK_SIZE]))
+            ).scalars())
+        return placed_keys, existing_ids
+
+    @staticmethod
+    def _placed_keys_query(keys: List[str]):
+        """Select (idempotency_key, order_id) of orders placed under any of keys"""
+        return (
+            select(Order.idempotency_key, Order.order_id)
+            .where(Order.idempotency_key.in_(keys))
+        )
+
+    @staticmethod
+    def _outcome(order_id: str, result: IntakeResult, reason: Optional[str] = None) -> Dict:
+        return {'order_id': order_id, 'result': result, 'reason': reason}
+
     def get_order(self, order_id: str) -> Optional[Order]:
         """Get order by ID"""
         return self.db.query(Order).filter(Order.order_id == order_id).first()
 
     def process_order(self, order_id: str) -> bool:
-        """Process an order"""
+        """Process an order.
+
+        The order and its units are claimed with conditional UPDATEs whose
+        rowcounts are checked, so concurrent workers can never process the
+        same order twice or reserve the same unit for two orders. Losing a
+        race on units is retried with backoff; running out of stock cancels
+        the order.
+        """
         order = self.get_order(order_id)
         if not order or order.status != OrderStatus.PENDING:
             return False
+        products = dict(order.products)
 
-        try:
-            # Start transaction
-            order.status = OrderStatus.PROCESSING
-            
-            # Reserve units
-            for product_id, quantity in order.products.items():
-                units = (
-                    self.db.query(Unit)
-                    .filter(Unit.product_id == product_id)
-                    .filter(Unit.status == UnitStatus.AVAILABLE)
-                    .limit(quantity)
-                    .all()
-                )
-                
-                if len(units) < quantity:
-                    raise ValueError(f"Insufficient units for product {product_id}")
-                    
-                for unit in units:
-                    unit.status = UnitStatus.RESERVED
-
-            # Update order status
-            order.status = OrderStatus.SHIPPED
-            
-            self.db.commit()
-            return True
-            
-        except Exception as e:
-            self.db.rollback()
-            logger.error(f"Error processing order {order_id}: {str(e)}")
-            order.status = OrderStatus.CANCELLED
-            self.db.commit()
+        attempts = 1 if in_unit_of_work(self.db) else self.max_attempts
+        for attempt in range(1, attempts + 1):
+            try:
+                return self._process_once(order_id, products)
+
+            except (ReservationConflict, StaleDataConflict, OperationalError) as e:
+                rollback(self.db)
+                if attempt == attempts:
+                    logger.error(f"Gave up processing order {order_id} after {attempt} attempts: {str(e)}")
+                    return False
+                back_off(self.backoff, attempt)
+
+            except Exception as e:
+                rollback(self.db)
+                logger.error(f"Error processing order {order_id}: {str(e)}")
+                self._set_order_status(order_id, OrderStatus.PENDING, OrderStatus.CANCELLED)
+                commit(self.db)
+                return False
+        return False
+
+    def _process_once(self, order_id: str, products: Dict[str, int]) -> bool:
+        """Claim, reserve and ship an order in the current transaction"""
+        # Claim the order; another worker may already own it
+        if not self._set_order_status(order_id, OrderStatus.PENDING, OrderStatus.PROCESSING):
+            rollback(self.db)
             return False
 
+        # Record reservations, then claim the units in one statement
+        for product_id, quantity in products.items():
+            reserved = self._reserve_units(order_id, product_id, quantity)
+            if reserved < quantity:
+                raise ValueError(f"Insufficient units for product {product_id}")
+
+        claimed = self._transition_order_units(
+            order_id, UnitStatus.AVAILABLE, UnitStatus.RESERVED
+        )
+        if claimed != sum(products.values()):
+            raise ReservationConflict(f"Reserved units for order {order_id} are no longer available")
+
+        # Update order status
+        self._set_order_status(order_id, OrderStatus.PROCESSING, OrderStatus.SHIPPED)
+        self._transition_order_units(order_id, UnitStatus.RESERVED, UnitStatus.IN_TRANSIT)
+
+        commit(self.db)
+        return True
+
+    def _set_order_status(self, order_id: str,
+                          from_status: OrderStatus,
+                          to_status: OrderStatus) -> bool:
+        """Move an order between statuses only if it is still in from_status"""
+        updated = (
+            self.db.query(Order)
+            .filter(Order.order_id == order_id)
+            .filter(Order.status == from_status)
+            .update({Order.status: to_status, Order.version: Order.version + 1},
+                    synchronize_session=False)
+        )
+        order = self.db.identity_map.get(self.db.identity_key(Order, order_id))
+        if order is not None:
+            self.db.expire(order, ['status', 'version'])
+        if updated:
+            record_status_change(self.db, 'order', order_id, from_status, to_status)
+        return updated == 1
+
+    def _reserve_units(self, order_id: str, product_id: str, quantity: int) -> int:
+        """Record up to quantity available units in the reservation ledger.
+
+        Uses a single INSERT ... SELECT ... LIMIT and returns the number of
+        ledger rows written. Unit statuses are updated separately by
+        _transition_order_units.
+        """
+        result = self.db.execute(
+            insert(Reservation).from_select(
+                ['order_id', 'unit_id'], self._candidate_units(order_id, product_id, quantity)
+            )
+        )
+        return result.rowcount
+
+    @staticmethod
+    def _candidate_units(order_id: str, product_id: str, quantity: int):
+        """Select up to quantity available units of a product as (order_id, unit_id) rows"""
+        return (
+            select(literal(order_id), Unit.unit_id)
+            .where(Unit.product_id == product_id)
+            .where(Unit.status == UnitStatus.AVAILABLE)
+            .limit(quantity)
+        )
+
+    @staticmethod
+    def _order_units(order_id: str):
+        """Select the unit IDs reserved for an order"""
+        return select(Reservation.unit_id).where(Reservation.order_id == order_id)
+
+    def _transition_order_units(self, order_id: str,
+                                from_status: UnitStatus,
+                                to_status: UnitStatus) -> int:
+        """Move an order's reserved units between statuses with a single UPDATE.
+
+        Only units currently in from_status are matched, so the transitions
+        enforced by Unit.validate_status_transition still hold. Returns the
+        number of units updated.
+        """
+        return self._transition_units(self._order_units(order_id), from_status, to_status)
+
+    def _transition_units(self, order_units, from_status: UnitStatus,
+                          to_status: UnitStatus) -> int:
+        """Move the units selected by a unit_id subquery between statuses"""
+        counts = self._unit_counts_query(order_units, from_status).all()
+        record_selected_status_changes(
+            self.db, 'unit', Unit.unit_id, from_status, to_status,
+            Unit.unit_id.in_(order_units), Unit.status == from_status
+        )
+        updated = (
+            self.db.query(Unit)
+            .filter(Unit.unit_id.in_(order_units))
+            .filter(Unit.status == from_status)
+            .update({Unit.status: to_status, Unit.version: Unit.version + 1},
+                    synchronize_session=False)
+        )
+        for product_id, count in counts:
+            self.stock.adjust(product_id, from_status, to_status, count)
+        return updated
+
+    def _unit_counts_query(self, order_units, status: UnitStatus):
+        """Count the units selected by a unit_id subquery that are in status, per product"""
+        return (
+            self.db.query(Unit.product_id, func.count(Unit.unit_id))
+            .filter(Unit.unit_id.in_(order_units))
+            .filter(Unit.status == status)
+            .group_by(Unit.product_id)
+        )
+
     def cancel_order(self, order_id: str) -> bool:
-        """Cancel an order"""
+        """Cancel an order, raising StaleDataConflict if it keeps changing concurrently"""
+        return retry_on_conflict(self.db, lambda: self._cancel_once(order_id),
+                                 self.max_attempts, self.backoff)
+
+    def _cancel_once(self, order_id: str) -> bool:
+        """Cancel an order and release its units in one attempt"""
         order = self.get_order(order_id)
         if not order or order.status not in {OrderStatus.PENDING, OrderStatus.PROCESSING}:
             return False
 
         try:
-            # Release any reserved units
-            reserved_units = (
-                self.db.query(Unit)
-                .filter(Unit.status == UnitStatus.RESERVED)
-                .all()
+            # Release units reserved for this order
+            self._transition_order_units(order_id, UnitStatus.RESERVED, UnitStatus.AVAILABLE)
+            self.db.query(Reservation).filter(Reservation.order_id == order_id).delete(
+                synchronize_session=False
             )
-            
-            for unit in reserved_units:
-                unit.status = UnitStatus.AVAILABLE
 
             order.status = OrderStatus.CANCELLED
-            self.db.commit()
+            commit(self.db)
             return True
             
+        except StaleDataConflict:
+            raise
         except Exception as e:
-            self.db.rollback()
+            rollback(self.db)
             logger.error(f"Error cancelling order {order_id}: {str(e)}")
             return False
 
-    def list_orders(self, status: Optional[OrderStatus] = None) -> List[Order]:
-        """List orders, optionally filtered by status"""
+    def ship_orders(self, order_ids: List[str]) -> List[str]:
+        """Ship processing orders and move their reserved units in transit.
+
+        Orders and units are updated with set-based statements per chunk of
+        orders. Returns the IDs of the orders that were shipped.
+        """
+        shipped = []
+        try:
+            for start in range(0, len(order_ids), SHIP_CHUNK_SIZE):
+                chunk = order_ids[start:start + SHIP_CHUNK_SIZE]
+                claimed = [
+                    row.order_id for row in
+                    self.db.query(Order.order_id)
+                    .filter(Order.order_id.in_(chunk))
+                    .filter(Order.status == OrderStatus.PROCESSING)
+                ]
+                if not claimed:
+                    continue
+                updated = (
+                    self.db.query(Order)
+                    .filter(Order.order_id.in_(claimed))
+                    .filter(Order.status == OrderStatus.PROCESSING)
+                    .update({Order.status: OrderStatus.SHIPPED, Order.version: Order.version + 1},
+                            synchronize_session=False)
+                )
+                if updated != len(claimed):
+                    raise ReservationConflict("Orders changed status while shipping")
+                record_bulk_status_changes(self.db, 'order', claimed,
+                                      OrderStatus.PROCESSING, OrderStatus.SHIPPED)
+                self._transition_units(
+                    select(Reservation.unit_id).where(Reservation.order_id.in_(claimed)),
+                    UnitStatus.RESERVED, UnitStatus.IN_TRANSIT
+                )
+                shipped.extend(claimed)
+            for order_id in shipped:
+                order = self.db.identity_map.get(self.db.identity_key(Order, order_id))
+                if order is not None:
+                    self.db.expire(order, ['status', 'version'])
+            commit(self.db)
+            return shipped
+
+        except Exception as e:
+            rollback(self.db)
+            logger.error(f"Error shipping orders: {str(e)}")
+            return []
+
+    def deliver_order(self, order_id: str) -> bool:
+        """Mark a shipped order and its units as delivered, retrying on version conflicts"""
+        return retry_on_conflict(self.db, lambda: self._deliver_once(order_id),
+                                 self.max_attempts, self.backoff)
+
+    def _deliver_once(self, order_id: str) -> bool:
+        """Deliver an order and its units in one attempt"""
+        order = self.get_order(order_id)
+        if not order or order.status != OrderStatus.SHIPPED:
+            return False
+
+        try:
+            self._transition_order_units(order_id, UnitStatus.IN_TRANSIT, UnitStatus.DELIVERED)
+            order.status = OrderStatus.DELIVERED
+            commit(self.db)
+            return True
+
+        except StaleDataConflict:
+            raise
+        except Exception as e:
+            rollback(self.db)
+            logger.error(f"Error delivering order {order_id}: {str(e)}")
+            return False
+
+    def _orders_query(self, status: Optional[OrderStatus] = None):
+        """Build an order query, optionally filtered by status"""
         query = self.db.query(Order)
         if status:
             query = query.filter(Order.status == status)
-        return query.all()
+        return query
+
+    def list_orders(self, status: Optional[OrderStatus] = None) -> List[Order]:
+        """List orders, optionally filtered by status"""
+        return self._orders_query(status).all()
+
+    def pending_order_ids(self, limit: int = DEFAULT_BATCH_SIZE,
+                          after: Optional[str] = None) -> List[str]:
+        """Get IDs of pending orders in ID order, starting after a given ID"""
+        return [row.order_id for row in self._pending_ids_query(limit, after)]
+
+    def _pending_ids_query(self, limit: int, after: Optional[str] = None):
+        """Query up to limit pending order IDs in ID order, starting after a given ID"""
+        query = self.db.query(Order.order_id).filter(Order.status == OrderStatus.PENDING)
+        if after is not None:
+            query = query.filter(Order.order_id > after)
+        return query.order_by(Order.order_id).limit(limit)
+
+    def iter_orders(self, status: Optional[OrderStatus] = None,
+                    batch_size: int = DEFAULT_BATCH_SIZE) -> Iterator[Order]:
+        """Stream orders, optionally filtered by status, in bounded batches"""
+        return iter_keyset(self._orders_query(status), Order.order_id, batch_size)
+
+    def page_orders(self, status: Optional[OrderStatus] = None,
+                    limit: int = DEFAULT_PAGE_SIZE,
+                    cursor: Optional[str] = None) -> Tuple[List[Order], Optional[str]]:
+        """Get one page of orders and the cursor for the next page"""
+        return page_keyset(self._orders_query(status), Order.order_id, limit, cursor)
+
+    def count_by_status(self) -> Dict[str, int]:
+        """Count orders per status"""
+        counts = {status.value: 0 for status in OrderStatus}
+        rows = (
+            self.db.query(Order.status, func.count(Order.order_id))
+            .group_by(Order.status)
+        )
+        for status, count in rows:
+            counts[status.value] = count
+        return counts
 
     def get_order_history(self, customer_id: str) -> List[Order]:
         """Get order history for a customer"""
-        return (
-            self.db.query(Order)
-            .filter(Order.customer_id == customer_id)
-            .order_by(Order.order_id.desc())
-            .all()
-        ) 
\ No newline at end of file
+        return self._history_query(customer_id).order_by(Order.order_id.desc()).all()
+
+    def _history_query(self, customer_id: str):
+        """Query a customer's orders"""
+        return self.db.query(Order).filter(Order.customer_id == customer_id)
+
+    def iter_order_history(self, customer_id: str,
+                           batch_size: int = DEFAULT_BATCH_SIZE) -> Iterator[Order]:
+        """Stream order history for a customer in bounded batches"""
+        return iter_keyset(self._history_query(customer_id), Order.order_id, batch_size, descending=True)
+
+    def page_order_history(self, customer_id: str,
+                           limit: int = DEFAULT_PAGE_SIZE,
+                           cursor: Optional[str] = None) -> Tuple[List[Order], Optional[str]]:
+        """Get one page of a customer's order history and the cursor for the next page"""
+        return page_keyset(self._history_query(customer_id), Order.order_id, limit, cursor, descending=True)
@@ -0,0 +1,282 @@
+from concurrent.futures import ThreadPoolExecutor
+from sqlalchemy import delete, exists, func, insert, literal, or_, select
+from sqlalchemy.orm import Session
+from ..models.outbox import OutboxCheckpoint, OutboxEvent, OutboxGap
+from threading import Event, Lock, Thread
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+import asyncio
+import inspect
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_EVENT_BATCH_SIZE = 500
+
+# Seconds a gap in the event ids is rechecked before its transaction is
+# taken to have rolled back
+DEFAULT_GAP_TIMEOUT = 3600.0
+
+def _status_value(status) -> Optional[str]:
+    return status.value if status is not None else None
+
+def record_status_change(db: Session, entity_type: str, entity_id: str,
+                         from_status, to_status):
+    """Write one status change to the outbox in the current transaction"""
+    record_bulk_status_changes(db, entity_type, [entity_id], from_status, to_status)
+
+def record_bulk_status_changes(db: Session, entity_type: str, entity_ids: Iterable[str],
+                          from_status, to_status):
+    """Write the same status change for many entities with one executemany"""
+    rows = [
+        {'entity_type': entity_type, 'entity_id': entity_id,
+         'from_status': _status_value(from_status), 'to_status': _status_value(to_status)}
+        for entity_id in entity_ids
+    ]
+    if rows:
+        db.execute(insert(OutboxEvent.__table__), rows)
+
+def record_selected_status_changes(db: Session, entity_type: str, id_column,
+                                   from_status, to_status, *criteria):
+    """Write a status change for every row matching criteria with one INSERT ... SELECT.
+
+    Call it before the UPDATE that moves the same rows, while criteria still
+    match them.
+    """
+    rows = (
+        select(literal(entity_type), id_column,
+               literal(_status_value(from_status)), literal(_status_value(to_status)))
+        .where(*criteria)
+    )
+    db.execute(
+        insert(OutboxEvent).from_select(
+            ['entity_type', 'entity_id', 'from_status', 'to_status'], rows
+        )
+    )
+
+class OutboxDispatcher:
+    """Delivers outbox events to subscribers in batches on worker threads.
+
+    Each subscriber has a named checkpoint holding the last event it
+    acknowledged by returning normally. Delivery is at-least-once: a batch
+    whose handler raises, or whose checkpoint update is lost, is delivered
+    again, so handlers should be idempotent on the event id. Subscribers
+    progress independently, and a restarted dispatcher resumes each from its
+    checkpoint; a new one starts at the oldest stored event.
+
+    Event ids are allocated at insert but become visible at commit, so on
+    server databases a transaction can commit a lower id after a higher one
+    was delivered. Ids the checkpoint passes without seeing are kept as gaps
+    for the consumer and rechecked on every batch, so such late events are
+    still delivered, after later ones. A gap is given up after gap_timeout
+    seconds, when its transaction must have rolled back; None keeps it
+    until it fills.
+    """
+
+    def __init__(self, session_factory: Callable[[], Session],
+                 batch_size: int = DEFAULT_EVENT_BATCH_SIZE,
+                 workers: int = 4, poll_interval: float = 1.0,
+                 gap_timeout: Optional[float] = DEFAULT_GAP_TIMEOUT):
+        if workers <= 0:
+            raise ValueError("workers must be positive")
+        self.session_factory = session_factory
+        self.batch_size = batch_size
+        self.workers = workers
+        self.poll_interval = poll_interval
+        self.gap_timeout = gap_timeout
+        self._subscribers: Dict[str, Tuple[Callable, Optional[str]]] = {}
+        self._lock = Lock()
+        self._stopped = Event()
+        self._thread: Optional[Thread] = None
+
+    def subscribe(self, consumer: str, handler: Callable[[List[Dict]], None],
+                  entity_type: Optional[str] = None):
+        """Register a handler under a unique consumer name.
+
+        The handler receives lists of event dictionaries in id order,
+        optionally only those of one entity type. Coroutine functions are
+        run to completion on the worker thread.
+        """
+        with self._lock:
+            if consumer in self._subscribers:
+                raise ValueError(f"Consumer {consumer} is already subscribed")
+            self._subscribers[consumer] = (handler, entity_type)
+
+    def unsubscribe(self, consumer: str):
+        """Stop delivering to a consumer, keeping its checkpoint"""
+        with self._lock:
+            self._subscribers.pop(consumer, None)
+
+    @staticmethod
+    def _events_query(db: Session, after: int):
+        """Query events after an event id in id order"""
+        return db.query(OutboxEvent).filter(OutboxEvent.id > after).order_by(OutboxEvent.id)
+
+    @staticmethod
+    def _gap_events_query(db: Session, gaps: List[Tuple[int, int]]):
+        """Query events that appeared in (first_id, last_id) gaps, in id order"""
+        return (
+            db.query(OutboxEvent)
+            .filter(or_(*(OutboxEvent.id.between(first_id, last_id) for first_id, last_id in gaps)))
+            .order_by(OutboxEvent.id)
+        )
+
+    def _remaining_gaps(self, consumer: str, gaps: List[Tuple[int, int, float]],
+                        seen: List[int], now: float) -> List[Tuple[int, int, float]]:
+        """Split gaps around the event ids seen in them, dropping expired ones"""
+        seen = sorted(seen)
+        remaining = []
+        for first_id, last_id, found_at in gaps:
+            if self.gap_timeout is not None and now - found_at > self.gap_timeout:
+                logger.warning(f"Gave up waiting for events {first_id}-{last_id} for {consumer}")
+                continue
+            start = first_id
+            for event_id in seen:
+                if start <= event_id <= last_id:
+                    if event_id > start:
+                        remaining.append((start, event_id - 1, found_at))
+                    start = event_id + 1
+            if start <= last_id:
+                remaining.append((start, last_id, found_at))
+        return remaining
+
+    def _deliver(self, consumer: str, handler: Callable, entity_type: Optional[str]) -> int:
+        """Deliver the next batch to one consumer and advance its checkpoint.
+
+        Returns the number of events read, including those of other entity
+        types, which only move the checkpoint.
+        """
+        db = self.session_factory()
+        try:
+            checkpoint = db.get(OutboxCheckpoint, consumer)
+            if checkpoint is None:
+                oldest = db.query(func.min(OutboxEvent.id)).scalar()
+                checkpoint = OutboxCheckpoint(consumer=consumer, last_event_id=(oldest or 1) - 1)
+                db.add(checkpoint)
+            after = checkpoint.last_event_id
+            gaps = [
+                tuple(row) for row in db.execute(
+                    select(OutboxGap.first_id, OutboxGap.last_id, OutboxGap.found_at)
+                    .where(OutboxGap.consumer == consumer)
+                    .order_by(OutboxGap.first_id)
+                )
+            ]
+            late = []
+            if gaps:
+                late = self._gap_events_query(db, [gap[:2] for gap in gaps]).limit(self.batch_size).all()
+            fresh = self._events_query(db, after).limit(self.batch_size).all()
+
+            # Ids skipped by this batch are new gaps
+            now = time.time()
+            expected = after + 1
+            for event in fresh:
+                if event.id > expected:
+                    gaps.append((expected, event.id - 1, now))
+                expected = event.id + 1
+            remaining = self._remaining_gaps(consumer, gaps, [event.id for event in late], now)
+            if not late and not fresh and len(remaining) == len(gaps):
+                return 0
+
+            events = [
+                event.to_dict() for event in sorted(late + fresh, key=lambda event: event.id)
+                if entity_type is None or event.entity_type == entity_type
+            ]
+            if events:
+                if inspect.iscoroutinefunction(handler):
+                    asyncio.run(handler(events))
+                else:
+                    handler(events)
+
+            db.execute(delete(OutboxGap).where(OutboxGap.consumer == consumer))
+            if remaining:
+                db.execute(insert(OutboxGap), [
+                    {'consumer': consumer, 'first_id': first_id, 'last_id': last_id, 'found_at': found_at}
+                    for first_id, last_id, found_at in remaining
+                ])
+            if fresh:
+                checkpoint.last_event_id = fresh[-1].id
+            db.commit()
+            return len(late) + len(fresh)
+        except Exception as e:
+            db.rollback()
+            logger.error(f"Error delivering events to {consumer}: {str(e)}")
+            return 0
+        finally:
+            db.close()
+
+    def dispatch_once(self, pool: Optional[ThreadPoolExecutor] = None) -> int:
+        """Deliver one batch to every subscriber, returning the number of events read"""
+        with self._lock:
+            subscribers = list(self._subscribers.items())
+        if not subscribers:
+            return 0
+        if pool is None:
+            with ThreadPoolExecutor(max_workers=self.workers) as own_pool:
+                return self.dispatch_once(own_pool)
+        futures = [
+            pool.submit(self._deliver, consumer, handler, entity_type)
+            for consumer, (handler, entity_type) in subscribers
+        ]
+        return sum(future.result() for future in futures)
+
+    def _run(self):
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            while not self._stopped.is_set():
+                try:
+                    delivered = self.dispatch_once(pool)
+                except Exception as e:
+                    logger.error(f"Outbox dispatcher error: {str(e)}")
+                    delivered = 0
+                if not delivered:
+                    self._stopped.wait(self.poll_interval)
+
+    def start(self):
+        """Start delivering in a background thread"""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stopped.clear()
+        self._thread = Thread(target=self._run, name="outbox-dispatcher", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: Optional[float] = None):
+        """Stop the background thread after its current batch"""
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def purge(self) -> int:
+        """Delete events every subscribed consumer has acknowledged.
+
+        Late events inside a gap wait for delivery, and the newest event is
+        kept, so SQLite never hands its id out again below the checkpoints.
+        """
+        with self._lock:
+            consumers = list(self._subscribers)
+        if not consumers:
+            return 0
+        db = self.session_factory()
+        try:
+            checkpoints = (
+                db.query(func.count(OutboxCheckpoint.consumer), func.min(OutboxCheckpoint.last_event_id))
+                .filter(OutboxCheckpoint.consumer.in_(consumers))
+                .one()
+            )
+            if checkpoints[0] != len(consumers):
+                return 0
+            newest = db.query(func.max(OutboxEvent.id)).scalar_subquery()
+            awaited = exists().where(OutboxGap.first_id <= OutboxEvent.id,
+                                     OutboxGap.last_id >= OutboxEvent.id)
+            deleted = (
+                db.query(OutboxEvent)
+                .filter(OutboxEvent.id <= checkpoints[1], OutboxEvent.id < newest, ~awaited)
+                .delete(synchronize_session=False)
+            )
+            db.commit()
+            return deleted
+        except Exception as e:
+            db.rollback()
+            logger.error(f"Error purging outbox: {str(e)}")
+            return 0
+        finally:
+            db.close()
@@ -0,0 +1,56 @@
+from sqlalchemy.orm import Query
+from typing import Any, Iterator, List, Optional, Tuple
+import base64
+import binascii
+import json
+
+DEFAULT_BATCH_SIZE = 1000
+DEFAULT_PAGE_SIZE = 100
+
+def encode_cursor(key: Any) -> str:
+    """Encode the last seen key as an opaque cursor token"""
+    payload = json.dumps({'k': key}).encode()
+    return base64.urlsafe_b64encode(payload).decode()
+
+def decode_cursor(cursor: str) -> Any:
+    """Decode a cursor token back to the last seen key"""
+    try:
+        return json.loads(base64.urlsafe_b64decode(cursor.encode()))['k']
+    except (binascii.Error, ValueError, KeyError, TypeError):
+        raise ValueError("Invalid cursor")
+
+def _keyset_batch(query: Query, key, limit: int,
+                  after: Optional[Any], descending: bool) -> List:
+    """Fetch the next batch of rows ordered by key, starting after a key value"""
+    if after is not None:
+        query = query.filter(key < after if descending else key > after)
+    return query.order_by(key.desc() if descending else key).limit(limit).all()
+
+def iter_keyset(query: Query, key, batch_size: int = DEFAULT_BATCH_SIZE,
+                descending: bool = False) -> Iterator:
+    """Stream query results in key order, one bounded batch at a time.
+
+    Each batch is a separate indexed range query on the key column, so memory
+    stays proportional to batch_size regardless of table size.
+    """
+    after = None
+    while True:
+        batch = _keyset_batch(query, key, batch_size, after, descending)
+        yield from batch
+        if len(batch) < batch_size:
+            return
+        after = getattr(batch[-1], key.key)
+
+def page_keyset(query: Query, key, limit: int = DEFAULT_PAGE_SIZE,
+                cursor: Optional[str] = None,
+                descending: bool = False) -> Tuple[List, Optional[str]]:
+    """Fetch one page of results in key order.
+
+    Returns the page and the cursor for the next page, or None on the last page.
+    """
+    after = decode_cursor(cursor) if cursor else None
+    rows = _keyset_batch(query, key, limit + 1, after, descending)
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    return rows, encode_cursor(getattr(rows[-1], key.key))
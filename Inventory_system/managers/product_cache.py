@@ -0,0 +1,67 @@
+from collections import OrderedDict
+from threading import Lock
+from typing import Dict, Optional
+import copy
+import time
+
+class ProductCache:
+    """Bounded LRU cache of product data with a time-to-live.
+
+    Entries are plain dictionaries rather than ORM instances, so one cache can
+    be shared by every session in the process. Thread-safe.
+    """
+
+    def __init__(self, max_size: int = 10000, ttl: Optional[float] = 300.0):
+        if max_size <= 0:
+            raise ValueError("max_size must be positive")
+        self.max_size = max_size
+        self.ttl = ttl
+        self._lock = Lock()
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, product_id: str) -> Optional[Dict]:
+        """Get a copy of cached product data, or None on a miss"""
+        with self._lock:
+            entry = self._entries.get(product_id)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, data = entry
+            if expires_at is not None and expires_at < time.monotonic():
+                del self._entries[product_id]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(product_id)
+            self.hits += 1
+        return copy.deepcopy(data)
+
+    def put(self, product_id: str, data: Dict):
+        """Cache product data, evicting the least recently used entry when full"""
+        expires_at = time.monotonic() + self.ttl if self.ttl is not None else None
+        data = copy.deepcopy(data)
+        with self._lock:
+            self._entries[product_id] = (expires_at, data)
+            self._entries.move_to_end(product_id)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, product_id: str):
+        """Drop a product from the cache"""
+        with self._lock:
+            self._entries.pop(product_id, None)
+
+    def clear(self):
+        """Drop all cached products"""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, int]:
+        """Get cache size and hit/miss counters"""
+        with self._lock:
+            return {
+                'size': len(self._entries),
+                'hits': self.hits,
+                'misses': self.misses
+            }
@@ -1,49 +1,130 @@
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, make_transient_to_detached
 from ..models.product import Product
-from typing import List, Optional
+from ..models.stock_level import StockLevel
+from .pagination import DEFAULT_BATCH_SIZE, DEFAULT_PAGE_SIZE, iter_keyset, page_keyset
+from .product_cache import ProductCache
+from .transaction import after_transaction, commit, in_unit_of_work, refresh
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
 
 class ProductManager:
-    def __init__(self, db: Session):
+    def __init__(self, db: Session, cache: Optional[ProductCache] = None):
         self.db = db
+        self.cache = cache
 
     def create_product(self, product: Product) -> Product:
         """Create a new product"""
         self.db.add(product)
-        self.db.commit()
-        self.db.refresh(product)
+        commit(self.db)
+        refresh(self.db, product)
         return product
 
     def get_product(self, product_id: str) -> Optional[Product]:
-        """Get product by ID"""
+        """Get product by ID, served from the cache when one is configured"""
+        if self.cache is None:
+            return self._load_product(product_id)
+
+        data = self.cache.get(product_id)
+        if data is not None:
+            return self._from_cache(data)
+
+        product = self._load_product(product_id)
+        if product:
+            self.cache.put(product_id, product.to_dict())
+        return product
+
+    def _load_product(self, product_id: str) -> Optional[Product]:
+        """Get product by ID from the database"""
         return self.db.query(Product).filter(Product.product_id == product_id).first()
 
+    def _from_cache(self, data: Dict) -> Product:
+        """Attach cached product data to this session without querying"""
+        product = Product(**data)
+        make_transient_to_detached(product)
+        return self.db.merge(product, load=False)
+
+    def get_products(self, product_ids: Iterable[str]) -> Dict[str, Product]:
+        """Get products by ID in a single query, keyed by product ID"""
+        product_ids = set(product_ids)
+        found = {}
+        if self.cache is not None:
+            for product_id in product_ids:
+                data = self.cache.get(product_id)
+                if data is not None:
+                    found[product_id] = self._from_cache(data)
+            product_ids -= found.keys()
+        if not product_ids:
+            return found
+
+        products = self.db.query(Product).filter(Product.product_id.in_(product_ids)).all()
+        for product in products:
+            found[product.product_id] = product
+            if self.cache is not None:
+                self.cache.put(product.product_id, product.to_dict())
+        return found
+
+    def get_prices(self, product_ids: Iterable[str]) -> Dict[str, float]:
+        """Get product prices keyed by product ID"""
+        return {
+            product_id: product.price
+            for product_id, product in self.get_products(product_ids).items()
+        }
+
     def update_product(self, product: Product) -> Product:
         """Update existing product"""
-        existing = self.get_product(product.product_id)
+        existing = self._load_product(product.product_id)
         if not existing:
             raise ValueError("Product not found")
         
         for key, value in product.to_dict().items():
             setattr(existing, key, value)
         
-        self.db.commit()
-        self.db.refresh(existing)
+        commit(self.db)
+        refresh(self.db, existing)
+        self._invalidate(existing.product_id)
         return existing
 
     def delete_product(self, product_id: str) -> bool:
         """Delete product by ID"""
-        product = self.get_product(product_id)
+        product = self._load_product(product_id)
         if not product:
             return False
         
+        self.db.query(StockLevel).filter(StockLevel.product_id == product_id).delete(
+            synchronize_session=False
+        )
         self.db.delete(product)
-        self.db.commit()
+        commit(self.db)
+        self._invalidate(product_id)
         return True
 
+    def _invalidate(self, product_id: str):
+        """Drop a changed product from the cache now and again when its transaction ends.
+
+        Until a unit of work commits or rolls back, other sessions can re-cache
+        the old row and this one the uncommitted change.
+        """
+        if self.cache is not None:
+            self.cache.invalidate(product_id)
+            if in_unit_of_work(self.db):
+                after_transaction(self.db, lambda: self.cache.invalidate(product_id))
+
     def list_products(self) -> List[Product]:
         """List all products"""
         return self.db.query(Product).all()
 
+    def iter_products(self, batch_size: int = DEFAULT_BATCH_SIZE) -> Iterator[Product]:
+        """Stream all products in bounded batches"""
+        return iter_keyset(self.db.query(Product), Product.product_id, batch_size)
+
+    def page_products(self, limit: int = DEFAULT_PAGE_SIZE,
+                      cursor: Optional[str] = None) -> Tuple[List[Product], Optional[str]]:
+        """Get one page of products and the cursor for the next page"""
+        return page_keyset(self.db.query(Product), Product.product_id, limit, cursor)
+
+    def count_products(self) -> int:
+        """Count all products"""
+        return self.db.query(Product).count()
+
     def search_products(self, **filters) -> List[Product]:
         """Search products with filters"""
         query = self.db.query(Product)
@@ -0,0 +1,166 @@
+from sqlalchemy import bindparam, func, insert, select, update
+from sqlalchemy.orm import Session
+from ..models.stock_level import StockLevel
+from ..models.unit import Unit, UnitStatus
+from .transaction import commit, rollback
+from typing import Dict, Iterable, List, Optional, Tuple
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Keep IN lists below SQLite's bound parameter limit
+STOCK_CHUNK_SIZE = 500
+
+class StockManager:
+    """Maintains the stock_levels counter table.
+
+    Adjustments are written in the caller's transaction and never committed
+    here, so counters stay consistent with the unit rows they describe.
+    """
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def adjust(self, product_id: str,
+               from_status: Optional[UnitStatus],
+               to_status: Optional[UnitStatus],
+               count: int = 1):
+        """Move count units of a product between status counters.
+
+        A from_status of None adds new units, a to_status of None removes them.
+        """
+        if count == 0 or from_status == to_status:
+            return
+
+        changes = {}
+        if from_status is not None:
+            column = getattr(StockLevel, from_status.value)
+            changes[column] = column - count
+        if to_status is not None:
+            column = getattr(StockLevel, to_status.value)
+            changes[column] = column + count
+
+        updated = (
+            self.db.query(StockLevel)
+            .filter(StockLevel.product_id == product_id)
+            .update(changes, synchronize_session=False)
+        )
+        if not updated:
+            level = StockLevel(product_id=product_id, available=0, reserved=0,
+                               in_transit=0, delivered=0)
+            if from_status is not None:
+                setattr(level, from_status.value, -count)
+            if to_status is not None:
+                setattr(level, to_status.value, count)
+            self.db.add(level)
+            self.db.flush()
+
+    def add_units(self, counts: Dict[Tuple[str, UnitStatus], int]):
+        """Count new units per (product_id, status) with one executemany per status"""
+        if not counts:
+            return
+        product_ids = list({product_id for product_id, _ in counts})
+        existing = set()
+        for start in range(0, len(product_ids), STOCK_CHUNK_SIZE):
+            existing.update(self.db.scalars(
+                select(StockLevel.product_id)
+                .where(StockLevel.product_id.in_(product_ids[start:start + STOCK_CHUNK_SIZE]))
+            ))
+        missing = [product_id for product_id in product_ids if product_id not in existing]
+        if missing:
+            self.db.execute(insert(StockLevel.__table__), [
+                {'product_id': product_id, 'available': 0, 'reserved': 0, 'in_transit': 0, 'delivered': 0}
+                for product_id in missing
+            ])
+
+        by_status: Dict[UnitStatus, List[Dict]] = {}
+        for (product_id, status), count in counts.items():
+            by_status.setdefault(status, []).append({'b_product_id': product_id, 'b_count': count})
+        levels = StockLevel.__table__
+        for status, rows in by_status.items():
+            column = levels.c[status.value]
+            self.db.execute(
+                update(levels)
+                .where(levels.c.product_id == bindparam('b_product_id'))
+                .values({column: column + bindparam('b_count')}),
+                rows
+            )
+
+    def get_levels(self, product_ids: Iterable[str]) -> Dict[str, StockLevel]:
+        """Get stock levels for products in a single query"""
+        product_ids = set(product_ids)
+        if not product_ids:
+            return {}
+        return {level.product_id: level for level in self._levels_query(product_ids)}
+
+    def _levels_query(self, product_ids: Iterable[str]):
+        """Query the stock levels of products"""
+        return self.db.query(StockLevel).filter(StockLevel.product_id.in_(product_ids))
+
+    def available(self, product_ids: Iterable[str]) -> Dict[str, int]:
+        """Get available unit counts per product"""
+        product_ids = set(product_ids)
+        levels = self.get_levels(product_ids)
+        return {
+            product_id: levels[product_id].available if product_id in levels else 0
+            for product_id in product_ids
+        }
+
+    def totals(self) -> Dict[str, int]:
+        """Get unit counts per status across all products"""
+        row = self.db.query(
+            func.coalesce(func.sum(StockLevel.available), 0),
+            func.coalesce(func.sum(StockLevel.reserved), 0),
+            func.coalesce(func.sum(StockLevel.in_transit), 0),
+            func.coalesce(func.sum(StockLevel.delivered), 0)
+        ).one()
+        return dict(zip((status.value for status in UnitStatus), row))
+
+    def _count_units(self) -> Dict[str, Dict[str, int]]:
+        """Count units per product and status from the units table"""
+        counts: Dict[str, Dict[str, int]] = {}
+        rows = (
+            self.db.query(Unit.product_id, Unit.status, func.count(Unit.unit_id))
+            .group_by(Unit.product_id, Unit.status)
+        )
+        for product_id, status, count in rows:
+            counts.setdefault(product_id, {s.value: 0 for s in UnitStatus})[status.value] = count
+        return counts
+
+    def verify(self) -> Dict[str, Dict[str, Dict[str, int]]]:
+        """Compare counters against the units table.
+
+        Returns the drifted products with their 'expected' and 'actual' counts.
+        """
+        expected = self._count_units()
+        actual = {
+            level.product_id: {s.value: getattr(level, s.value) for s in UnitStatus}
+            for level in self.db.query(StockLevel)
+        }
+        empty = {s.value: 0 for s in UnitStatus}
+        drift = {}
+        for product_id in expected.keys() | actual.keys():
+            counted = expected.get(product_id, empty)
+            stored = actual.get(product_id, empty)
+            if counted != stored:
+                drift[product_id] = {'expected': counted, 'actual': stored}
+        return drift
+
+    def rebuild(self) -> int:
+        """Recompute all counters from the units table and commit.
+
+        Returns the number of products with stock.
+        """
+        try:
+            counts = self._count_units()
+            self.db.query(StockLevel).delete(synchronize_session=False)
+            self.db.add_all(
+                StockLevel(product_id=product_id, **by_status)
+                for product_id, by_status in counts.items()
+            )
+            commit(self.db)
+            return len(counts)
+        except Exception as e:
+            rollback(self.db)
+            logger.error(f"Error rebuilding stock levels: {str(e)}")
+            raise
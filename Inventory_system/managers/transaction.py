@@ -0,0 +1,124 @@
+from contextlib import contextmanager
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.exc import StaleDataError
+from sqlalchemy.util.concurrency import await_only, in_greenlet
+from typing import Callable, Iterator, TypeVar
+import asyncio
+import logging
+import random
+import time
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar('T')
+
+# Session.info key holding the state of an open unit of work
+UNIT_OF_WORK_KEY = 'inventory_unit_of_work'
+
+class StaleDataConflict(RuntimeError):
+    """Raised when a versioned row was changed by another session since it was read"""
+
+def in_unit_of_work(db: Session) -> bool:
+    """Check if the session is inside a deferred-commit block"""
+    return UNIT_OF_WORK_KEY in db.info
+
+def commit(db: Session):
+    """Commit, or only flush when a unit of work owns the commit.
+
+    Raises StaleDataConflict if a versioned row was changed concurrently.
+    """
+    try:
+        if in_unit_of_work(db):
+            db.flush()
+        else:
+            db.commit()
+    except StaleDataError as e:
+        raise StaleDataConflict(str(e)) from e
+
+def after_transaction(db: Session, callback: Callable[[], None]):
+    """Run callback once the current transaction has committed or rolled back.
+
+    Outside a unit of work the manager has already committed, so it runs at
+    once; inside one it runs when the unit ends.
+    """
+    state = db.info.get(UNIT_OF_WORK_KEY)
+    if state is None:
+        callback()
+    else:
+        state['after'].append(callback)
+
+def refresh(db: Session, instance):
+    """Refresh an instance, skipped inside a unit of work unless requested"""
+    state = db.info.get(UNIT_OF_WORK_KEY)
+    if state is None or state['refresh']:
+        db.refresh(instance)
+
+def rollback(db: Session):
+    """Roll back, marking an open unit of work as failed"""
+    state = db.info.get(UNIT_OF_WORK_KEY)
+    if state is not None:
+        state['failed'] = True
+    db.rollback()
+
+def back_off(backoff: float, attempt: int):
+    """Wait before retrying after a failed attempt, with jittered exponential backoff.
+
+    Managers running under AsyncSession.run_sync await the delay on the
+    event loop instead of blocking it, so other operations keep going.
+    """
+    delay = backoff * (2 ** (attempt - 1))
+    delay += random.uniform(0, delay)
+    if in_greenlet():
+        await_only(asyncio.sleep(delay))
+    else:
+        time.sleep(delay)
+
+def retry_on_conflict(db: Session, operation: Callable[[], T],
+                      max_attempts: int = 5, backoff: float = 0.01) -> T:
+    """Run an operation, retrying it after losing an optimistic concurrency race.
+
+    On StaleDataConflict the session is rolled back, which expires every
+    loaded row, and the operation runs again on fresh data after jittered
+    exponential backoff starting at backoff seconds. Gives up and raises
+    after max_attempts, or at once inside a unit of work, whose earlier
+    work is already lost.
+    """
+    attempts = 1 if in_unit_of_work(db) else max_attempts
+    for attempt in range(1, attempts + 1):
+        try:
+            return operation()
+        except StaleDataConflict as e:
+            rollback(db)
+            if attempt == attempts:
+                logger.warning(f"Gave up after {attempt} conflicting attempts: {str(e)}")
+                raise
+            back_off(backoff, attempt)
+
+@contextmanager
+def unit_of_work(db: Session, refresh: bool = False) -> Iterator[Session]:
+    """Run manager operations in one transaction with a single commit.
+
+    Manager mutators only flush inside the block. If the block raises, or any
+    manager rolled back along the way, everything in the block is rolled back
+    and the error is raised. Nested blocks join the outermost one.
+    """
+    if in_unit_of_work(db):
+        yield db
+        return
+
+    state = db.info[UNIT_OF_WORK_KEY] = {'refresh': refresh, 'failed': False, 'after': []}
+    try:
+        yield db
+        if state['failed']:
+            raise RuntimeError("Unit of work rolled back after a failed operation")
+        db.commit()
+    except StaleDataError as e:
+        db.rollback()
+        raise StaleDataConflict(str(e)) from e
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.info.pop(UNIT_OF_WORK_KEY, None)
+        for callback in state['after']:
+            callback()
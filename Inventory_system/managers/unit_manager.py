@@ -1,46 +1,223 @@
-from sqlalchemy.orm import Session
+from sqlalchemy import and_, bindparam, insert, or_, update
+from sqlalchemy.orm import Query, Session, joinedload, lazyload, load_only, selectinload
 from ..models.unit import Unit, UnitStatus
 from ..models.product import Product
 from ..models.location import Location
-from typing import List, Optional
+from .location_index import TOLERANCE, FreeLocationIndex
+from .stock_manager import StockManager
+from .outbox import record_bulk_status_changes
+from .pagination import DEFAULT_BATCH_SIZE, DEFAULT_PAGE_SIZE, iter_keyset, page_keyset
+from .transaction import StaleDataConflict, commit, refresh, retry_on_conflict, rollback
+from collections import Counter
+from enum import Enum
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Keep IN lists below SQLite's bound parameter limit
+BULK_CHUNK_SIZE = 500
+
+def _chunks(items: Sequence, size: int = BULK_CHUNK_SIZE) -> Iterator[Sequence]:
+    """Split a sequence into consecutive chunks"""
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+# Take one batch of units' space in a location if it still has room for it
+_locations = Location.__table__
+_STORE_UNITS = (
+    update(_locations)
+    .where(_locations.c.location_id == bindparam('b_location_id'))
+    .where(_locations.c.is_occupied == False)
+    .where(_locations.c.used_volume + bindparam('b_volume') <= _locations.c.volume + TOLERANCE)
+    .where(or_(_locations.c.max_weight == None,
+               _locations.c.used_weight + bindparam('b_weight') <= _locations.c.max_weight + TOLERANCE))
+    .where(or_(_locations.c.max_units == None,
+               _locations.c.unit_count + bindparam('b_units') <= _locations.c.max_units))
+    .values(
+        used_volume=_locations.c.used_volume + bindparam('b_volume'),
+        used_weight=_locations.c.used_weight + bindparam('b_weight'),
+        unit_count=_locations.c.unit_count + bindparam('b_units'),
+        version=_locations.c.version + 1,
+        is_occupied=or_(
+            _locations.c.used_volume + bindparam('b_volume') >= _locations.c.volume - TOLERANCE,
+            and_(_locations.c.max_weight != None,
+                 _locations.c.used_weight + bindparam('b_weight') >= _locations.c.max_weight - TOLERANCE),
+            and_(_locations.c.max_units != None,
+                 _locations.c.unit_count + bindparam('b_units') >= _locations.c.max_units)
+        )
+    )
+)
+
+class UnitLoad(str, Enum):
+    """How a unit query loads the unit's product and location"""
+    LAZY = "lazy"            # Load relationships on first access
+    JOINED = "joined"        # Join product and location into the same query
+    SELECTIN = "selectin"    # Load relationships with one extra IN query per batch
+    STATUS_ONLY = "status"   # Load only unit_id and status, everything else on access
+
+def unit_load_options(load: UnitLoad) -> list:
+    """Loader options for a unit query"""
+    if load == UnitLoad.JOINED:
+        return [joinedload(Unit.product), joinedload(Unit.location)]
+    if load == UnitLoad.SELECTIN:
+        return [selectinload(Unit.product), selectinload(Unit.location)]
+    options = [lazyload(Unit.product), lazyload(Unit.location)]
+    if load == UnitLoad.STATUS_ONLY:
+        options.append(load_only(Unit.unit_id, Unit.status))
+    return options
+
 class UnitManager:
-    def __init__(self, db: Session):
+    def __init__(self, db: Session, index: Optional[FreeLocationIndex] = None,
+                 max_attempts: int = 5, backoff: float = 0.01):
+        """Initialize with database session and free location index.
+
+        Moves and status changes that lose a race with another session on a
+        unit or location version are retried up to max_attempts times.
+        """
         self.db = db
+        self.index = index if index is not None else FreeLocationIndex()
+        self.stock = StockManager(db)
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+
+    def create_unit(self, unit: Unit, location: Optional[Location] = None,
+                    verify_product: bool = True,
+                    product: Optional[Product] = None) -> Unit:
+        """Create a new unit.
 
-    def create_unit(self, unit: Unit, location: Optional[Location] = None) -> Unit:
-        """Create a new unit"""
+        Callers that already loaded the product can pass it, or pass
+        verify_product=False when no location is given, to skip the lookup.
+        """
         # Verify product exists
-        product = self.db.query(Product).filter(Product.product_id == unit.product_id).first()
-        if not product:
-            raise ValueError("Product not found")
+        if product is None and (verify_product or location):
+            product = (
+                self.db.query(Product)
+                .filter(Product.product_id == unit.product_id)
+                .first()
+            )
+            if not product:
+                raise ValueError("Product not found")
 
         if location:
-            if not location.is_available():
+            if not location.store(product):
                 raise ValueError("Location is not available")
             unit.location_id = location.location_id
-            location.occupy()
 
         self.db.add(unit)
-        self.db.commit()
-        self.db.refresh(unit)
+        self.stock.adjust(unit.product_id, None, unit.status or UnitStatus.AVAILABLE)
+        commit(self.db)
+        refresh(self.db, unit)
+        if location:
+            self.index.sync(location)
         return unit
 
-    def get_unit(self, unit_id: str) -> Optional[Unit]:
+    def create_units_bulk(self, units: List[Unit]) -> List[Unit]:
+        """Insert many units and take their space in their locations in one transaction"""
+        self.create_unit_rows([
+            {
+                'unit_id': unit.unit_id,
+                'product_id': unit.product_id,
+                'location_id': unit.location_id,
+                'status': unit.status or UnitStatus.AVAILABLE
+            }
+            for unit in units
+        ])
+        return units
+
+    def create_unit_rows(self, rows: List[Dict]):
+        """Insert unit rows with unit_id, product_id, location_id and status keys.
+
+        Like create_units_bulk without building Unit objects. Every row's
+        product must exist and every location must have room for its units,
+        otherwise nothing is inserted.
+        """
+        if not rows:
+            return
+
+        product_ids = list({row['product_id'] for row in rows})
+        products = {}
+        for chunk in _chunks(product_ids):
+            products.update(
+                (product.product_id, product) for product in
+                self.db.query(Product.product_id, Product.weight, Product.volume)
+                .filter(Product.product_id.in_(chunk))
+            )
+        if len(products) != len(product_ids):
+            raise ValueError("Product not found")
+
+        # Space taken per location as [volume, weight, units]
+        usage = {}
+        for row in rows:
+            if row['location_id']:
+                product = products[row['product_id']]
+                used = usage.setdefault(row['location_id'], [0.0, 0.0, 0])
+                used[0] += product.volume
+                used[1] += product.weight
+                used[2] += 1
+
+        try:
+            if usage:
+                stored = self.db.execute(_STORE_UNITS, [
+                    {'b_location_id': location_id, 'b_volume': volume,
+                     'b_weight': weight, 'b_units': count}
+                    for location_id, (volume, weight, count) in usage.items()
+                ]).rowcount
+                if stored != len(usage):
+                    raise ValueError("Location is not available")
+
+            self.db.execute(insert(Unit.__table__), rows)
+            added = Counter((row['product_id'], row['status']) for row in rows)
+            self.stock.add_units(added)
+            for status in {status for _, status in added}:
+                record_bulk_status_changes(
+                    self.db, 'unit',
+                    [row['unit_id'] for row in rows if row['status'] == status],
+                    None, status
+                )
+            commit(self.db)
+        except Exception:
+            rollback(self.db)
+            raise
+
+        # An unloaded index is rebuilt from the database on first use anyway
+        if not self.index.is_loaded:
+            return
+        for chunk in _chunks(list(usage)):
+            for location in (
+                self.db.query(Location)
+                .filter(Location.location_id.in_(chunk))
+                .populate_existing()
+            ):
+                self.index.sync(location)
+
+    def get_unit(self, unit_id: str, load: UnitLoad = UnitLoad.LAZY) -> Optional[Unit]:
         """Get unit by ID"""
-        return self.db.query(Unit).filter(Unit.unit_id == unit_id).first()
+        return (
+            self.db.query(Unit)
+            .options(*unit_load_options(load))
+            .filter(Unit.unit_id == unit_id)
+            .first()
+        )
 
     def update_unit_location(self, unit_id: str, location_id: str) -> bool:
-        """Update unit location"""
+        """Update unit location.
+
+        Raises StaleDataConflict if the unit or either location keeps
+        changing in other sessions until retries run out.
+        """
+        return retry_on_conflict(self.db, lambda: self._update_unit_location(unit_id, location_id),
+                                 self.max_attempts, self.backoff)
+
+    def _update_unit_location(self, unit_id: str, location_id: str) -> bool:
+        """Move a unit between locations in one attempt"""
         unit = self.get_unit(unit_id)
         if not unit:
             return False
 
         try:
             # Release old location if exists
+            old_location = None
             if unit.location_id:
                 old_location = (
                     self.db.query(Location)
@@ -48,73 +225,115 @@ class UnitManager:
                     .first()
                 )
                 if old_location:
-                    old_location.vacate()
+                    old_location.release(unit.product)
 
-            # Occupy new location
+            # Store in new location
             new_location = (
                 self.db.query(Location)
                 .filter(Location.location_id == location_id)
                 .first()
             )
-            if not new_location or not new_location.is_available():
+            if not new_location or not new_location.store(unit.product):
                 raise ValueError("New location not available")
 
             unit.location_id = location_id
-            new_location.occupy()
             
-            self.db.commit()
+            commit(self.db)
+            if old_location:
+                self.index.sync(old_location)
+            self.index.sync(new_location)
             return True
             
+        except StaleDataConflict:
+            raise
         except Exception as e:
-            self.db.rollback()
+            rollback(self.db)
             logger.error(f"Error updating unit location: {str(e)}")
             return False
 
     def update_unit_status(self, unit_id: str, status: UnitStatus) -> bool:
-        """Update unit status"""
+        """Update unit status, raising StaleDataConflict if retries run out"""
+        return retry_on_conflict(self.db, lambda: self._update_unit_status(unit_id, status),
+                                 self.max_attempts, self.backoff)
+
+    def _update_unit_status(self, unit_id: str, status: UnitStatus) -> bool:
+        """Change a unit's status in one attempt"""
         unit = self.get_unit(unit_id)
         if not unit:
             return False
 
         try:
+            old_status = unit.status
             unit.status = status
-            self.db.commit()
+            self.stock.adjust(unit.product_id, old_status, status)
+            commit(self.db)
             return True
+        except StaleDataConflict:
+            raise
         except Exception as e:
-            self.db.rollback()
+            rollback(self.db)
             logger.error(f"Error updating unit status: {str(e)}")
             return False
 
-    def list_units(self, 
-                  product_id: Optional[str] = None, 
-                  status: Optional[UnitStatus] = None) -> List[Unit]:
-        """List units with optional filters"""
-        query = self.db.query(Unit)
-        
+    def _units_query(self,
+                     product_id: Optional[str] = None,
+                     status: Optional[UnitStatus] = None,
+                     load: UnitLoad = UnitLoad.LAZY) -> Query:
+        """Build a unit query with optional filters and loading strategy"""
+        query = self.db.query(Unit).options(*unit_load_options(load))
+
         if product_id:
             query = query.filter(Unit.product_id == product_id)
         if status:
             query = query.filter(Unit.status == status)
-            
-        return query.all()
 
-    def get_available_units(self, product_id: str) -> List[Unit]:
+        return query
+
+    def list_units(self, 
+                  product_id: Optional[str] = None, 
+                  status: Optional[UnitStatus] = None,
+                  load: UnitLoad = UnitLoad.LAZY) -> List[Unit]:
+        """List units with optional filters"""
+        return self._units_query(product_id, status, load).all()
+
+    def iter_units(self,
+                   product_id: Optional[str] = None,
+                   status: Optional[UnitStatus] = None,
+                   batch_size: int = DEFAULT_BATCH_SIZE,
+                   load: UnitLoad = UnitLoad.LAZY) -> Iterator[Unit]:
+        """Stream units with optional filters in bounded batches"""
+        query = self._units_query(product_id, status, load)
+        return iter_keyset(query, Unit.unit_id, batch_size)
+
+    def page_units(self,
+                   product_id: Optional[str] = None,
+                   status: Optional[UnitStatus] = None,
+                   limit: int = DEFAULT_PAGE_SIZE,
+                   cursor: Optional[str] = None,
+                   load: UnitLoad = UnitLoad.LAZY) -> Tuple[List[Unit], Optional[str]]:
+        """Get one page of units and the cursor for the next page"""
+        query = self._units_query(product_id, status, load)
+        return page_keyset(query, Unit.unit_id, limit, cursor)
+
+    def get_available_units(self, product_id: str,
+                            load: UnitLoad = UnitLoad.LAZY) -> List[Unit]:
         """Get available units for a product"""
-        return (
-            self.db.query(Unit)
-            .filter(Unit.product_id == product_id)
-            .filter(Unit.status == UnitStatus.AVAILABLE)
-            .all()
-        )
+        return self._units_query(product_id, UnitStatus.AVAILABLE, load).all()
 
     def remove_unit(self, unit_id: str) -> bool:
-        """Remove a unit from inventory"""
+        """Remove a unit from inventory, raising StaleDataConflict if retries run out"""
+        return retry_on_conflict(self.db, lambda: self._remove_unit(unit_id),
+                                 self.max_attempts, self.backoff)
+
+    def _remove_unit(self, unit_id: str) -> bool:
+        """Delete a unit and release its space in one attempt"""
         unit = self.get_unit(unit_id)
         if not unit:
             return False
 
         try:
             # Release location if occupied
+            location = None
             if unit.location_id:
                 location = (
                     self.db.query(Location)
@@ -122,13 +341,18 @@ class UnitManager:
                     .first()
                 )
                 if location:
-                    location.vacate()
+                    location.release(unit.product)
 
             self.db.delete(unit)
-            self.db.commit()
+            self.stock.adjust(unit.product_id, unit.status, None)
+            commit(self.db)
+            if location:
+                self.index.sync(location)
             return True
             
+        except StaleDataConflict:
+            raise
         except Exception as e:
-            self.db.rollback()
+            rollback(self.db)
             logger.error(f"Error removing unit: {str(e)}")
             return False 
\ No newline at end of file
@@ -0,0 +1,157 @@
+from threading import Lock
+from typing import Dict, List, Optional
+from ..models.location import Location
+from ..models.product import Product
+from .location_index import TOLERANCE, Capacity, FreeLocationIndex, Position, Shape
+from .location_manager import LocationStrategy
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - optional dependency
+    np = None
+
+class LocationMatrix:
+    """Contiguous NumPy mirror of free bin dimensions and capacity.
+
+    Each column is stored as its own contiguous array so fit tests stream
+    through memory. Rows are never removed; bins without free capacity are
+    masked out and reuse their row when space frees up. Register it on a
+    FreeLocationIndex to keep it in sync.
+    """
+
+    def __init__(self, capacity: int = 1024):
+        if np is None:
+            raise ImportError("LocationMatrix requires numpy")
+        self._lock = Lock()
+        self._ids: List[str] = []
+        self._rows: Dict[str, int] = {}
+        self._dims = np.zeros((3, capacity), dtype=np.float64)
+        self._volume = np.zeros(capacity, dtype=np.float64)
+        self._weight = np.zeros(capacity, dtype=np.float64)
+        self._units = np.zeros(capacity, dtype=np.float64)
+        self._free = np.zeros(capacity, dtype=bool)
+
+    def __len__(self) -> int:
+        return int(self._free[:len(self._ids)].sum())
+
+    def _grow(self):
+        """Double row capacity"""
+        size = len(self._ids)
+        capacity = self._dims.shape[1] * 2
+        dims = np.zeros((3, capacity), dtype=np.float64)
+        dims[:, :size] = self._dims[:, :size]
+        self._dims = dims
+        for name, dtype in (('_volume', np.float64), ('_weight', np.float64),
+                            ('_units', np.float64), ('_free', bool)):
+            column = np.zeros(capacity, dtype=dtype)
+            column[:size] = getattr(self, name)[:size]
+            setattr(self, name, column)
+
+    # FreeLocationIndex listener interface
+    def location_added(self, location_id: str, shape: Shape,
+                       position: Optional[Position], capacity: Capacity):
+        """Record a bin's free capacity, adding a row for unseen bins"""
+        with self._lock:
+            row = self._rows.get(location_id)
+            if row is None:
+                row = len(self._ids)
+                if row == self._dims.shape[1]:
+                    self._grow()
+                self._ids.append(location_id)
+                self._rows[location_id] = row
+            self._dims[:, row] = shape
+            self._volume[row], self._weight[row], self._units[row] = capacity
+            self._free[row] = True
+
+    def location_removed(self, location_id: str):
+        """Mask a bin out"""
+        with self._lock:
+            row = self._rows.get(location_id)
+            if row is not None:
+                self._free[row] = False
+
+    def index_cleared(self):
+        """Mask every bin out"""
+        with self._lock:
+            self._free[:] = False
+
+    def _slots(self, shape: Shape, weight: float, size: int):
+        """Number of units of shape and weight each row can still take"""
+        volume = shape[0] * shape[1] * shape[2]
+        fits = self._free[:size].copy()
+        for axis in range(3):
+            fits &= self._dims[axis, :size] >= shape[axis]
+        slots = np.floor((self._volume[:size] + TOLERANCE) / volume)
+        if weight > 0:
+            slots = np.minimum(slots, np.floor((self._weight[:size] + TOLERANCE) / weight))
+        slots = np.minimum(slots, self._units[:size])
+        return np.where(fits, slots, 0)
+
+    def best_fits(self, shape: Shape, count: int = 1, weight: float = 0.0) -> List[str]:
+        """Bin IDs for up to count units of shape, least remaining volume first.
+
+        Best fit keeps choosing the tightest bin until it is full, so a bin
+        ID is repeated once per unit it takes.
+        """
+        with self._lock:
+            size = len(self._ids)
+            slots = self._slots(shape, weight, size)
+            if count == 1:
+                remaining = np.where(slots >= 1, self._volume[:size], np.inf)
+                row = int(np.argmin(remaining)) if size else 0
+                return [self._ids[row]] if size and slots[row] >= 1 else []
+
+            candidates = np.flatnonzero(slots >= 1)
+            remaining = self._volume[candidates]
+            if len(candidates) > count:
+                keep = np.argpartition(remaining, count - 1)[:count]
+                candidates, remaining = candidates[keep], remaining[keep]
+            order = candidates[np.argsort(remaining, kind='stable')]
+            rows = np.repeat(order, np.minimum(slots[order], count).astype(np.int64))[:count]
+            return [self._ids[row] for row in rows]
+
+class VectorizedOptimalSpaceStrategy(LocationStrategy):
+    """OptimalSpaceStrategy evaluated in one vectorized pass over all free bins.
+
+    Uses a LocationMatrix mirror of the free location index, one per index, and
+    places batches by grouping identical products.
+    """
+    supports_index = True
+
+    def __init__(self):
+        if np is None:
+            raise ImportError("VectorizedOptimalSpaceStrategy requires numpy")
+
+    @staticmethod
+    def _matrix(index: FreeLocationIndex) -> LocationMatrix:
+        """The index's location matrix, shared by every strategy using the index"""
+        return index.mirror('location_matrix', LocationMatrix)
+
+    def find_location(self, product: Product, locations: List[Location]) -> Optional[Location]:
+        """Find location with least remaining volume from a list of locations"""
+        available = [location for location in locations if location.can_hold(product)]
+        if not available:
+            return None
+        remaining = np.array([location.remaining_volume() for location in available])
+        return available[int(np.argmin(remaining))]
+
+    def find_location_id(self, product: Product, index: FreeLocationIndex) -> Optional[str]:
+        """Find location ID with least remaining volume"""
+        matrix = self._matrix(index)
+        found = matrix.best_fits(product.shape(), weight=product.weight)
+        return found[0] if found else None
+
+    def find_location_ids(self, products: List[Product], index: FreeLocationIndex) -> List[Optional[str]]:
+        """Place a batch, one vectorized pass per distinct product shape and weight"""
+        matrix = self._matrix(index)
+        groups: Dict[tuple, List[int]] = {}
+        for position, product in enumerate(products):
+            groups.setdefault((product.shape(), product.weight), []).append(position)
+
+        assigned: List[Optional[str]] = [None] * len(products)
+        for (shape, weight), positions in groups.items():
+            location_ids = matrix.best_fits(shape, len(positions), weight)
+            for position, location_id in zip(positions, location_ids):
+                index.reserve(location_id, products[position].shape(), weight)
+                assigned[position] = location_id
+        return assigned
@@ -0,0 +1,226 @@
+from sqlalchemy import case, func, insert, select, update
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session
+from ..models.order import Order, OrderStatus
+from ..models.unit import Unit, UnitStatus
+from ..models.location import Location
+from ..models.reservation import Reservation
+from .order_manager import ReservationConflict, allocate
+from .stock_manager import StockManager
+from .outbox import record_bulk_status_changes, record_selected_status_changes
+from .pagination import DEFAULT_BATCH_SIZE
+from .transaction import back_off, commit, in_unit_of_work, rollback
+from collections import Counter
+from typing import Dict, Iterator, List, Sequence, Tuple
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Keep IN lists below SQLite's bound parameter limit
+WAVE_CHUNK_SIZE = 500
+
+def _chunks(items: Sequence, size: int = WAVE_CHUNK_SIZE) -> Iterator[Sequence]:
+    """Split a sequence into consecutive chunks"""
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+class WavePlanner:
+    """Reserve stock for batches of pending orders and build pick lists.
+
+    A wave reads pending orders, aggregates their demand per product and
+    fetches just enough available units for the whole wave in one query,
+    ordered along the pick route. Units are reserved with one ledger insert
+    and guarded status updates, and picks are grouped by location so each
+    bin is visited once per wave. Wave orders stay PROCESSING until they are
+    shipped with OrderManager.ship_orders.
+    """
+
+    def __init__(self, db: Session, max_attempts: int = 5, backoff: float = 0.01):
+        self.db = db
+        self.stock = StockManager(db)
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+
+    def release_wave(self, limit: int = DEFAULT_BATCH_SIZE) -> Dict:
+        """Reserve units for up to limit pending orders, oldest first.
+
+        Returns the wave's order IDs, the orders left pending for lack of
+        stock and the pick list grouped by location in route order.
+        """
+        attempts = 1 if in_unit_of_work(self.db) else self.max_attempts
+        for attempt in range(1, attempts + 1):
+            try:
+                return self._release_once(limit)
+
+            except (ReservationConflict, OperationalError) as e:
+                rollback(self.db)
+                if attempt == attempts:
+                    logger.error(f"Gave up releasing wave after {attempt} attempts: {str(e)}")
+                    break
+                back_off(self.backoff, attempt)
+
+            except Exception as e:
+                rollback(self.db)
+                logger.error(f"Error releasing wave: {str(e)}")
+                break
+        return {'orders': [], 'backordered': [], 'pick_list': []}
+
+    def _release_once(self, limit: int) -> Dict:
+        """Plan, claim and reserve one wave in the current transaction"""
+        orders = [(row.order_id, row.products) for row in self._pending_orders_query(limit)]
+        demand = Counter()
+        for _, products in orders:
+            demand.update(products)
+        if not demand:
+            return {'orders': [], 'backordered': [], 'pick_list': []}
+
+        candidates = self._candidate_units(demand)
+        supply = Counter(product_id for _, product_id, _, _ in candidates)
+        allocated, backordered = allocate(orders, supply)
+
+        claimed = set(self._claim_orders(allocated))
+        wave = [(order_id, products) for order_id, products in orders if order_id in claimed]
+
+        # Hand out each product's units in route order
+        units_by_product: Dict[str, List[Tuple[str, str, str]]] = {}
+        for unit_id, product_id, location_id, aisle in candidates:
+            units_by_product.setdefault(product_id, []).append((unit_id, location_id, aisle))
+        picks = []
+        for order_id, products in wave:
+            for product_id, quantity in products.items():
+                units = units_by_product[product_id]
+                for unit_id, location_id, aisle in units[:quantity]:
+                    picks.append((location_id, aisle, unit_id, product_id, order_id))
+                del units[:quantity]
+
+        route = {unit_id: position for position, (unit_id, _, _, _) in enumerate(candidates)}
+        picks.sort(key=lambda pick: route[pick[2]])
+
+        self._reserve(picks)
+        commit(self.db)
+        return {
+            'orders': [order_id for order_id, _ in wave],
+            'backordered': backordered,
+            'pick_list': self._pick_list(picks)
+        }
+
+    def _candidate_units(self, demand: Dict[str, int]) -> List[Tuple[str, str, str, str]]:
+        """Fetch up to the demanded number of available units per product.
+
+        Units are ranked within each product along the pick route, by aisle,
+        coordinates and bin, and cut off at that product's demand with a
+        window function, so a single query serves the whole wave. Returns
+        (unit_id, product_id, location_id, aisle) tuples in route order.
+        """
+        rows = []
+        for chunk in _chunks(list(demand)):
+            rows.extend(self.db.execute(
+                self._candidate_units_query({product_id: demand[product_id] for product_id in chunk})
+            ).all())
+        rows.sort(key=lambda row: (
+            # Same ordering as the window, unknown values first; known ones keep their type
+            tuple((value is not None, value) for value in (row.aisle, row.x, row.y, row.z)),
+            row.location_id or '', row.unit_id
+        ))
+        return [(row.unit_id, row.product_id, row.location_id, row.aisle) for row in rows]
+
+    def _pending_orders_query(self, limit: int):
+        """Query the (order_id, products) of up to limit pending orders in wave order"""
+        return (
+            self.db.query(Order.order_id, Order.products)
+            .filter(Order.status == OrderStatus.PENDING)
+            .order_by(Order.sequence, Order.order_id)
+            .limit(limit)
+        )
+
+    @staticmethod
+    def _candidate_units_query(demand: Dict[str, int]):
+        """Select up to demand available units per product, ranked along the pick route"""
+        route = (Location.aisle, Location.x, Location.y, Location.z, Unit.location_id, Unit.unit_id)
+        ranked = (
+            select(
+                Unit.unit_id, Unit.product_id, Unit.location_id, Location.aisle,
+                Location.x, Location.y, Location.z,
+                func.row_number().over(partition_by=Unit.product_id, order_by=route).label('rank')
+            )
+            .outerjoin(Location, Location.location_id == Unit.location_id)
+            .where(Unit.product_id.in_(list(demand)))
+            .where(Unit.status == UnitStatus.AVAILABLE)
+            .subquery()
+        )
+        wanted = case(demand, value=ranked.c.product_id, else_=0)
+        return (
+            select(ranked.c.unit_id, ranked.c.product_id, ranked.c.location_id, ranked.c.aisle,
+                   ranked.c.x, ranked.c.y, ranked.c.z)
+            .where(ranked.c.rank <= wanted)
+        )
+
+    def _claim_orders(self, order_ids: List[str]) -> List[str]:
+        """Move orders from PENDING to PROCESSING, returning the IDs this worker claimed"""
+        claimed = []
+        returning = self.db.get_bind().dialect.update_returning
+        for chunk in _chunks(order_ids):
+            if returning:
+                claimed.extend(self.db.execute(
+                    update(Order)
+                    .where(Order.order_id.in_(chunk))
+                    .where(Order.status == OrderStatus.PENDING)
+                    .values(status=OrderStatus.PROCESSING, version=Order.version + 1)
+                    .returning(Order.order_id)
+                    .execution_options(synchronize_session=False)
+                ).scalars())
+                continue
+            for order_id in chunk:
+                updated = (
+                    self.db.query(Order)
+                    .filter(Order.order_id == order_id)
+                    .filter(Order.status == OrderStatus.PENDING)
+                    .update({Order.status: OrderStatus.PROCESSING, Order.version: Order.version + 1},
+                            synchronize_session=False)
+                )
+                if updated:
+                    claimed.append(order_id)
+
+        for order_id in claimed:
+            order = self.db.identity_map.get(self.db.identity_key(Order, order_id))
+            if order is not None:
+                self.db.expire(order, ['status', 'version'])
+        record_bulk_status_changes(self.db, 'order', claimed, OrderStatus.PENDING, OrderStatus.PROCESSING)
+        return claimed
+
+    def _reserve(self, picks: List[Tuple[str, str, str, str, str]]):
+        """Record the wave's reservations and claim its units"""
+        if not picks:
+            return
+        self.db.execute(insert(Reservation), [
+            {'order_id': order_id, 'unit_id': unit_id}
+            for _, _, unit_id, _, order_id in picks
+        ])
+        claimed = 0
+        for chunk in _chunks([unit_id for _, _, unit_id, _, _ in picks]):
+            record_selected_status_changes(
+                self.db, 'unit', Unit.unit_id, UnitStatus.AVAILABLE, UnitStatus.RESERVED,
+                Unit.unit_id.in_(chunk), Unit.status == UnitStatus.AVAILABLE
+            )
+            claimed += (
+                self.db.query(Unit)
+                .filter(Unit.unit_id.in_(chunk))
+                .filter(Unit.status == UnitStatus.AVAILABLE)
+                .update({Unit.status: UnitStatus.RESERVED, Unit.version: Unit.version + 1},
+                        synchronize_session=False)
+            )
+        if claimed != len(picks):
+            raise ReservationConflict("Units picked for the wave are no longer available")
+        for product_id, count in Counter(product_id for _, _, _, product_id, _ in picks).items():
+            self.stock.adjust(product_id, UnitStatus.AVAILABLE, UnitStatus.RESERVED, count)
+
+    @staticmethod
+    def _pick_list(picks: List[Tuple[str, str, str, str, str]]) -> List[Dict]:
+        """Group picks by location, in the order the route first reaches each location"""
+        stops: Dict[str, Dict] = {}
+        for location_id, aisle, unit_id, product_id, order_id in picks:
+            stop = stops.get(location_id)
+            if stop is None:
+                stop = stops[location_id] = {'location_id': location_id, 'aisle': aisle, 'picks': []}
+            stop['picks'].append({'unit_id': unit_id, 'product_id': product_id, 'order_id': order_id})
+        return list(stops.values())
@@ -1,21 +1,118 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine, make_url
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from threading import Lock
+from typing import Dict, Optional
+import os
 
-# Create database engine
-SQLALCHEMY_DATABASE_URL = "sqlite:///./inventory.db"
-engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False})
+# Database URL, overridable through the environment
+DATABASE_URL_ENV = "INVENTORY_DATABASE_URL"
+DEFAULT_DATABASE_URL = "sqlite:///./inventory.db"
+SQLALCHEMY_DATABASE_URL = os.environ.get(DATABASE_URL_ENV, DEFAULT_DATABASE_URL)
+
+# Pragmas applied to every new SQLite connection
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'mmap_size': 268435456,  # 256 MB
+    'cache_size': -65536,    # 64 MB, negative values are KiB
+    'busy_timeout': 30000,   # milliseconds
+}
+
+def _env_int(name: str, default: int) -> int:
+    """Read an integer setting from the environment"""
+    value = os.environ.get(name)
+    return int(value) if value else default
+
+def create_db_engine(url: Optional[str] = None,
+                     pool_size: Optional[int] = None,
+                     max_overflow: Optional[int] = None,
+                     sqlite_pragmas: Optional[Dict[str, object]] = None,
+                     **kwargs) -> Engine:
+    """Create a database engine.
+
+    The URL defaults to INVENTORY_DATABASE_URL or a local SQLite file. SQLite
+    connections get SQLITE_PRAGMAS (merged with sqlite_pragmas) on connect.
+    For server databases pool_size and max_overflow default to
+    INVENTORY_DB_POOL_SIZE and INVENTORY_DB_MAX_OVERFLOW.
+    """
+    url = make_url(url or os.environ.get(DATABASE_URL_ENV, DEFAULT_DATABASE_URL))
+
+    if url.get_backend_name() != 'sqlite':
+        kwargs.setdefault('pool_pre_ping', True)
+        return create_engine(
+            url,
+            pool_size=pool_size if pool_size is not None else _env_int('INVENTORY_DB_POOL_SIZE', 5),
+            max_overflow=(max_overflow if max_overflow is not None
+                          else _env_int('INVENTORY_DB_MAX_OVERFLOW', 10)),
+            **kwargs
+        )
+
+    connect_args = kwargs.pop('connect_args', {})
+    connect_args.setdefault('check_same_thread', False)
+    engine = create_engine(url, connect_args=connect_args, **kwargs)
+    apply_sqlite_pragmas(engine, sqlite_pragmas)
+    return engine
+
+def apply_sqlite_pragmas(engine: Engine, sqlite_pragmas: Optional[Dict[str, object]] = None):
+    """Set SQLITE_PRAGMAS, merged with sqlite_pragmas, on every new connection of a SQLite engine"""
+    pragmas = dict(SQLITE_PRAGMAS)
+    pragmas.update(sqlite_pragmas or {})
+
+    @event.listens_for(engine, "connect")
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name}={value}")
+        cursor.close()
+
+_engine: Optional[Engine] = None
+_engine_lock = Lock()
+
+def get_engine() -> Engine:
+    """Get the shared engine, creating it on first use"""
+    global _engine
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                _engine = create_db_engine(SQLALCHEMY_DATABASE_URL)
+    return _engine
+
+def configure_engine(url: Optional[str] = None, **kwargs) -> Engine:
+    """Replace the shared engine, disposing the previous one"""
+    global _engine
+    with _engine_lock:
+        if _engine is not None:
+            _engine.dispose()
+        _engine = create_db_engine(url, **kwargs)
+        SessionLocal.configure(bind=_engine)
+    return _engine
+
+class _LazySessionMaker(sessionmaker):
+    """Session factory that binds to the shared engine on first use"""
+
+    def __call__(self, **local_kw):
+        if 'bind' not in local_kw and self.kw.get('bind') is None:
+            self.configure(bind=get_engine())
+        return super().__call__(**local_kw)
 
 # Create session factory
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+SessionLocal = _LazySessionMaker(autocommit=False, autoflush=False)
 
 # Create base model class
 Base = declarative_base()
 
+def __getattr__(name: str):
+    """Keep `database.engine` working without creating it at import time"""
+    if name == 'engine':
+        return get_engine()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
 def get_db():
     """Database session generator"""
     db = SessionLocal()
     try:
         yield db
     finally:
-        db.close() 
\ No newline at end of file
+        db.close()
@@ -0,0 +1,82 @@
+from sqlalchemy import Column, Float
+from sqlalchemy.orm import validates
+from typing import Dict, Tuple
+
+DIMENSION_KEYS = ('length', 'width', 'height')
+
+# Sorted dimension columns, shortest first
+SHAPE_COLUMNS = ('shortest_side', 'middle_side', 'longest_side')
+
+def validate_dimensions(dimensions: Dict[str, float]) -> Dict[str, float]:
+    """Validate a dimensions dictionary, returning only its length, width and height"""
+    if not all(k in dimensions for k in DIMENSION_KEYS):
+        raise ValueError("Dimensions must include length, width, and height")
+    if not all(isinstance(dimensions[k], (int, float)) and dimensions[k] > 0 for k in DIMENSION_KEYS):
+        raise ValueError("All dimensions must be positive numbers")
+    return {k: dimensions[k] for k in DIMENSION_KEYS}
+
+def dimension_columns(dimensions: Dict[str, float]) -> Dict[str, float]:
+    """Column values for a dimensions dictionary, including the derived columns"""
+    dimensions = validate_dimensions(dimensions)
+    shape = sorted(dimensions.values())
+    values = dict(dimensions)
+    values.update(zip(SHAPE_COLUMNS, shape))
+    values['volume'] = shape[0] * shape[1] * shape[2]
+    return values
+
+def _derived_default(name: str):
+    """Column default deriving name from length, width and height, for inserts that bypass the model"""
+    def default(context):
+        parameters = context.get_current_parameters()
+        return dimension_columns({k: parameters[k] for k in DIMENSION_KEYS})[name]
+    return default
+
+class Dimensioned:
+    """Mixin storing length, width and height as numeric columns.
+
+    The sorted sides and the volume are derived on every change, so fit
+    checks in any orientation become range predicates on indexable columns.
+    The `dimensions` dictionary is still accepted and returned.
+    """
+
+    length = Column(Float, nullable=False)
+    width = Column(Float, nullable=False)
+    height = Column(Float, nullable=False)
+    shortest_side = Column(Float, nullable=False, default=_derived_default('shortest_side'))
+    middle_side = Column(Float, nullable=False, default=_derived_default('middle_side'))
+    longest_side = Column(Float, nullable=False, default=_derived_default('longest_side'))
+    volume = Column(Float, nullable=False, default=_derived_default('volume'))
+
+    @property
+    def dimensions(self) -> Dict[str, float]:
+        """Dimensions as {'length': x, 'width': y, 'height': z}"""
+        return {'length': self.length, 'width': self.width, 'height': self.height}
+
+    @dimensions.setter
+    def dimensions(self, dimensions: Dict[str, float]):
+        for key, value in validate_dimensions(dimensions).items():
+            setattr(self, key, value)
+
+    @validates(*DIMENSION_KEYS)
+    def validate_dimension(self, key, value):
+        """Validate one dimension and refresh the derived columns once all are set"""
+        if not isinstance(value, (int, float)) or value <= 0:
+            raise ValueError("All dimensions must be positive numbers")
+        dimensions = {k: getattr(self, k) for k in DIMENSION_KEYS}
+        dimensions[key] = value
+        if None not in dimensions.values():
+            for column, derived in dimension_columns(dimensions).items():
+                if column not in DIMENSION_KEYS:
+                    setattr(self, column, derived)
+        return value
+
+    def shape(self) -> Tuple[float, float, float]:
+        """Sorted (shortest, middle, longest) sides"""
+        return (self.shortest_side, self.middle_side, self.longest_side)
+
+    @classmethod
+    def fits_shape(cls, shape: Tuple[float, float, float]):
+        """SQL criteria for rows at least as large as shape on every sorted side"""
+        return (cls.shortest_side >= shape[0],
+                cls.middle_side >= shape[1],
+                cls.longest_side >= shape[2])
@@ -1,54 +1,149 @@
-from sqlalchemy import Column, String, Boolean, JSON, Enum as SQLEnum
-from sqlalchemy.orm import validates
+from sqlalchemy import Column, String, Boolean, Float, Index, Integer, Enum as SQLEnum
 from enum import Enum
+from typing import Optional, Tuple
 from .database import Base
+from .dimensions import Dimensioned
+
+# Allowance for floating point drift when summing stored volumes and weights
+CAPACITY_TOLERANCE = 1e-9
 
 class LocationType(str, Enum):
     SMALL = "small"
     MEDIUM = "medium"
     LARGE = "large"
 
-class Location(Base):
+class Location(Dimensioned, Base):
     __tablename__ = "locations"
+    __table_args__ = (
+        # Fit lookups: open bins whose longest side can take the product's
+        Index('ix_locations_open_longest_side', 'is_occupied', 'longest_side'),
+    )
 
     location_id = Column(String, primary_key=True)
     type = Column(SQLEnum(LocationType), nullable=False)
-    dimensions = Column(JSON, nullable=False)
-    is_occupied = Column(Boolean, default=False)
-
-    @validates('dimensions')
-    def validate_dimensions(self, key, dimensions):
-        """Validate dimensions dictionary"""
-        required_keys = {'length', 'width', 'height'}
-        if not all(k in dimensions for k in required_keys):
-            raise ValueError("Dimensions must include length, width, and height")
-        if not all(isinstance(dimensions[k], (int, float)) and dimensions[k] > 0 for k in required_keys):
-            raise ValueError("All dimensions must be positive numbers")
-        return dimensions
+    is_occupied = Column(Boolean, default=False, index=True)  # Full or closed for putaway
+
+    # Capacity, volume comes from Dimensioned; None limits mean unlimited
+    max_weight = Column(Float, nullable=True)
+    max_units = Column(Integer, nullable=True)
+
+    # Contents
+    used_volume = Column(Float, nullable=False, default=0.0, server_default='0')
+    used_weight = Column(Float, nullable=False, default=0.0, server_default='0')
+    unit_count = Column(Integer, nullable=False, default=0, server_default='0')
+
+    # Warehouse coordinates, optional for locations created before they existed
+    aisle = Column(String, nullable=True)
+    x = Column(Float, nullable=True)
+    y = Column(Float, nullable=True)
+    z = Column(Float, nullable=True)
+
+    # Row version, checked and bumped by every update
+    version = Column(Integer, nullable=False, default=1, server_default='1')
+    __mapper_args__ = {'version_id_col': version}
+
+    def __init__(self, **kwargs):
+        kwargs.setdefault('is_occupied', False)
+        kwargs.setdefault('used_volume', 0.0)
+        kwargs.setdefault('used_weight', 0.0)
+        kwargs.setdefault('unit_count', 0)
+        super().__init__(**kwargs)
 
     def occupy(self) -> bool:
-        """Mark location as occupied"""
+        """Close location for putaway"""
         if not self.is_occupied:
             self.is_occupied = True
             return True
         return False
 
     def vacate(self) -> bool:
-        """Mark location as available"""
-        if self.is_occupied:
+        """Reopen location for putaway unless it is full"""
+        if self.is_occupied and not self.is_full():
             self.is_occupied = False
             return True
         return False
 
     def is_available(self) -> bool:
-        """Check if location is available"""
+        """Check if location is open for putaway"""
         return not self.is_occupied
 
+    def remaining_volume(self) -> float:
+        """Free volume left in the location"""
+        return self.volume - self.used_volume
+
+    def remaining_weight(self) -> float:
+        """Weight the location can still take"""
+        if self.max_weight is None:
+            return float('inf')
+        return self.max_weight - self.used_weight
+
+    def remaining_units(self) -> float:
+        """Number of units the location can still take"""
+        if self.max_units is None:
+            return float('inf')
+        return self.max_units - self.unit_count
+
+    def is_full(self) -> bool:
+        """Check if any capacity limit is exhausted"""
+        return (self.remaining_volume() <= CAPACITY_TOLERANCE
+                or self.remaining_weight() <= CAPACITY_TOLERANCE
+                or self.remaining_units() <= 0)
+
+    def free_capacity(self) -> Tuple[float, float, float]:
+        """Remaining (volume, weight, units)"""
+        return (self.remaining_volume(), self.remaining_weight(), self.remaining_units())
+
+    def can_hold(self, product) -> bool:
+        """Check if one unit of product fits the remaining space in some orientation"""
+        if self.is_occupied:
+            return False
+        if (product.volume > self.remaining_volume() + CAPACITY_TOLERANCE
+                or product.weight > self.remaining_weight() + CAPACITY_TOLERANCE
+                or self.remaining_units() < 1):
+            return False
+        return all(p <= l for p, l in zip(product.shape(), self.shape()))
+
+    def store(self, product) -> bool:
+        """Add one unit of product, closing the location once it is full"""
+        if not self.can_hold(product):
+            return False
+        self.used_volume += product.volume
+        self.used_weight += product.weight
+        self.unit_count += 1
+        self.is_occupied = self.is_full()
+        return True
+
+    def release(self, product) -> bool:
+        """Remove one unit of product, reopening the location"""
+        if self.unit_count <= 0:
+            return False
+        self.used_volume = max(0.0, self.used_volume - product.volume)
+        self.used_weight = max(0.0, self.used_weight - product.weight)
+        self.unit_count -= 1
+        self.is_occupied = self.is_full()
+        return True
+
+    def position(self) -> Optional[Tuple[float, float, float]]:
+        """Get (x, y, z) coordinates, or None if the location has none"""
+        if self.x is None or self.y is None or self.z is None:
+            return None
+        return (self.x, self.y, self.z)
+
     def to_dict(self):
         """Convert location to dictionary"""
         return {
             'location_id': self.location_id,
             'type': self.type.value,
             'dimensions': self.dimensions,
-            'is_occupied': self.is_occupied
+            'is_occupied': self.is_occupied,
+            'volume': self.volume,
+            'max_weight': self.max_weight,
+            'max_units': self.max_units,
+            'used_volume': self.used_volume,
+            'used_weight': self.used_weight,
+            'unit_count': self.unit_count,
+            'aisle': self.aisle,
+            'x': self.x,
+            'y': self.y,
+            'z': self.z
         } 
\ No newline at end of file
@@ -0,0 +1,227 @@
+from sqlalchemy import bindparam, func, inspect, select, text, update
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+from typing import Dict, List
+from .database import Base
+from .dimensions import DIMENSION_KEYS, SHAPE_COLUMNS, dimension_columns
+from .product import Product
+from .location import Location
+from .unit import Unit, UnitStatus
+from .order import Order, OrderStatus
+from .reservation import Reservation
+from .stock_level import StockLevel
+from .outbox import OutboxEvent
+import json
+import logging
+
+logger = logging.getLogger(__name__)
+
+def upgrade(engine: Engine):
+    """Bring an existing database up to the current schema.
+
+    Creates missing tables, columns added to existing tables and any
+    secondary indexes declared on the models, then backfills derived data.
+    Safe to run repeatedly.
+    """
+    Base.metadata.create_all(bind=engine)
+    _migrate_json_dimensions(engine)
+    _add_missing_columns(engine)
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=engine, checkfirst=True)
+    _backfill_stock_levels(engine)
+    _backfill_location_capacity(engine)
+    _backfill_order_sequence(engine)
+    logger.info("Database schema is up to date")
+
+def _add_missing_columns(engine: Engine):
+    """Add model columns missing from existing tables.
+
+    Required columns need a server default to fill existing rows.
+    """
+    inspector = inspect(engine)
+    with engine.begin() as connection:
+        for table in Base.metadata.sorted_tables:
+            existing = {column['name'] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing:
+                    continue
+                column_type = column.type.compile(dialect=engine.dialect)
+                definition = f"{column.name} {column_type}"
+                if column.server_default is not None:
+                    definition += f" DEFAULT {column.server_default.arg}"
+                if not column.nullable:
+                    if column.server_default is None:
+                        raise ValueError(f"Cannot add required column {table.name}.{column.name}")
+                    definition += " NOT NULL"
+                connection.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {definition}"))
+                logger.info(f"Added column {table.name}.{column.name}")
+
+def _migrate_json_dimensions(engine: Engine):
+    """Move JSON dimensions of products and locations into numeric columns.
+
+    Adds the columns, fills them and the derived sorted sides and volume from
+    the JSON, then drops the JSON column.
+    """
+    inspector = inspect(engine)
+    for model in (Product, Location):
+        table = model.__table__
+        existing = {column['name'] for column in inspector.get_columns(table.name)}
+        if 'dimensions' not in existing:
+            continue
+        key = table.primary_key.columns.values()[0]
+        with engine.begin() as connection:
+            for name in DIMENSION_KEYS + SHAPE_COLUMNS + ('volume',):
+                if name not in existing:
+                    # Nullable, since SQLite cannot add a required column without a default
+                    column_type = table.c[name].type.compile(dialect=engine.dialect)
+                    connection.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {name} {column_type}"))
+            rows = connection.execute(text(f"SELECT {key.name}, dimensions FROM {table.name}")).all()
+            # Locations keep a missing volume so the capacity backfill below recognises them
+            skip_volume = model is Location and 'volume' not in existing
+            values = []
+            for row_key, dimensions in rows:
+                if isinstance(dimensions, str):
+                    dimensions = json.loads(dimensions)
+                columns = dimension_columns(dimensions)
+                if skip_volume:
+                    del columns['volume']
+                values.append({'b_key': row_key, **columns})
+            if values:
+                connection.execute(
+                    update(table)
+                    .where(key == bindparam('b_key'))
+                    .values({name: bindparam(name) for name in values[0] if name != 'b_key'}),
+                    values
+                )
+            connection.execute(text(f"ALTER TABLE {table.name} DROP COLUMN dimensions"))
+        logger.info(f"Moved dimensions of {len(rows)} {table.name} rows into columns")
+
+def _backfill_stock_levels(engine: Engine):
+    """Populate stock counters for databases created before they existed"""
+    from ..managers.stock_manager import StockManager
+
+    with Session(bind=engine) as db:
+        if db.query(StockLevel).first() is None and db.query(Unit).first() is not None:
+            count = StockManager(db).rebuild()
+            logger.info(f"Backfilled stock levels for {count} products")
+
+def _backfill_location_capacity(engine: Engine):
+    """Fill capacity and contents of locations created before they were tracked"""
+    with Session(bind=engine) as db:
+        locations = db.query(Location).filter(Location.volume == None).all()
+        if not locations:
+            return
+        by_id = {location.location_id: location for location in locations}
+        for location in locations:
+            location.volume = location.length * location.width * location.height
+            location.used_volume = location.used_weight = 0.0
+            location.unit_count = 0
+
+        rows = (
+            db.query(Unit.location_id, Product, func.count(Unit.unit_id))
+            .join(Product, Product.product_id == Unit.product_id)
+            .filter(Unit.location_id != None)
+            .group_by(Unit.location_id, Product.product_id)
+        )
+        for location_id, product, count in rows:
+            location = by_id.get(location_id)
+            if location:
+                location.used_volume += product.volume * count
+                location.used_weight += product.weight * count
+                location.unit_count += count
+
+        for location in locations:
+            # Keep locations closed by hand closed, reopen ones only held shut by a unit
+            if location.unit_count or not location.is_occupied:
+                location.is_occupied = location.is_full()
+        db.commit()
+        logger.info(f"Backfilled capacity for {len(locations)} locations")
+
+def _backfill_order_sequence(engine: Engine):
+    """Number orders placed before the sequence was tracked, after any numbered ones.
+
+    Their placement order is unknown, so they follow order ID order.
+    """
+    table = Order.__table__
+    with engine.begin() as connection:
+        order_ids = connection.execute(
+            select(table.c.order_id).where(table.c.sequence == None).order_by(table.c.order_id)
+        ).scalars().all()
+        if not order_ids:
+            return
+        last = connection.execute(select(func.max(table.c.sequence))).scalar() or 0
+        connection.execute(
+            update(table)
+            .where(table.c.order_id == bindparam('b_order_id'))
+            .values(sequence=bindparam('b_sequence')),
+            [{'b_order_id': order_id, 'b_sequence': last + i} for i, order_id in enumerate(order_ids, 1)]
+        )
+    logger.info(f"Backfilled sequence for {len(order_ids)} orders")
+
+def hot_queries(db: Session) -> Dict[str, object]:
+    """Queries issued by the managers on filtered columns, keyed by name.
+
+    The statements come from the managers' own query builders, so the plans
+    checked are those of the queries that run.
+    """
+    from ..managers.location_manager import LocationManager
+    from ..managers.order_manager import OrderManager
+    from ..managers.outbox import OutboxDispatcher
+    from ..managers.stock_manager import StockManager
+    from ..managers.unit_manager import UnitManager
+    from ..managers.wave_planner import WavePlanner
+
+    orders = OrderManager(db)
+    locations = LocationManager(db)
+    waves = WavePlanner(db)
+    probe = Product(product_id='', name='', price=1.0, weight=1.0,
+                    dimensions={'length': 1, 'width': 1, 'height': 1})
+    queries = {
+        'create_order': StockManager(db)._levels_query(['']),
+        'place_orders': orders._placed_keys_query(['']),
+        'order_sequence': orders._last_sequence_query(),
+        'process_order': orders._candidate_units('', '', 1),
+        'order_units': orders._unit_counts_query(orders._order_units(''), UnitStatus.AVAILABLE),
+        'pending_order_ids': orders._pending_ids_query(1, ''),
+        'get_available_units': UnitManager(db)._units_query('P', UnitStatus.AVAILABLE),
+        'list_orders': orders._orders_query(OrderStatus.PENDING),
+        'get_order_history': orders._history_query('').order_by(Order.order_id.desc()),
+        'list_available_locations': locations._available_query(),
+        'fitting_locations': locations._available_query(probe),
+        'wave_orders': waves._pending_orders_query(1),
+        'wave_units': waves._candidate_units_query({'': 1}),
+        'outbox_consumer': OutboxDispatcher._events_query(db, 0),
+        'outbox_gaps': OutboxDispatcher._gap_events_query(db, [(1, 1)]),
+    }
+    return {name: getattr(query, 'statement', query) for name, query in queries.items()}
+
+def explain(db: Session, statement) -> List[str]:
+    """Return the SQLite query plan details for a statement"""
+    compiled = statement.compile(
+        dialect=db.get_bind().dialect,
+        compile_kwargs={'literal_binds': True}
+    )
+    rows = db.execute(text(f"EXPLAIN QUERY PLAN {compiled}")).fetchall()
+    return [row[-1] for row in rows]
+
+def _is_table_scan(step: str) -> bool:
+    """Check if a query plan step reads a whole model table without an index"""
+    words = step.split()
+    return (len(words) > 1 and words[0] == 'SCAN'
+            and words[1] in Base.metadata.tables and 'INDEX' not in step)
+
+def check_query_plans(db: Session) -> Dict[str, List[str]]:
+    """Verify every hot manager query is served by an index.
+
+    Raises ValueError naming the queries whose plan contains a full table scan.
+    Scans of subquery results are not table scans. Returns the plan of each query.
+    """
+    plans = {name: explain(db, statement) for name, statement in hot_queries(db).items()}
+    full_scans = [
+        name for name, plan in plans.items()
+        if any(_is_table_scan(step) for step in plan)
+    ]
+    if full_scans:
+        raise ValueError(f"Queries without index: {', '.join(full_scans)}")
+    return plans
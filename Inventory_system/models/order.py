@@ -1,7 +1,8 @@
-from sqlalchemy import Column, String, Float, JSON, Enum as SQLEnum, event
+from sqlalchemy import Column, String, Float, Integer, JSON, Enum as SQLEnum, Index
 from sqlalchemy.orm import validates
 from enum import Enum
 from .database import Base
+from .outbox import track_status_changes
 from typing import Dict
 
 class OrderStatus(str, Enum):
@@ -13,12 +14,24 @@ class OrderStatus(str, Enum):
 
 class Order(Base):
     __tablename__ = "orders"
+    __table_args__ = (
+        Index('ix_orders_customer_id_order_id', 'customer_id', 'order_id'),
+        Index('ix_orders_idempotency_key', 'idempotency_key', unique=True),
+        Index('ix_orders_sequence', 'sequence'),
+        Index('ix_orders_status_sequence', 'status', 'sequence', 'order_id'),
+    )
 
     order_id = Column(String, primary_key=True)
     customer_id = Column(String, nullable=False)
     products = Column(JSON, nullable=False)  # Dict[str, int] - product_id: quantity
-    status = Column(SQLEnum(OrderStatus), nullable=False, default=OrderStatus.PENDING)
+    status = Column(SQLEnum(OrderStatus), nullable=False, default=OrderStatus.PENDING, index=True)
     total_amount = Column(Float, default=0.0)
+    idempotency_key = Column(String, nullable=True)  # Client key; retried submissions are not placed twice
+    sequence = Column(Integer, nullable=True)  # Placement order, increasing; set by OrderManager
+
+    # Row version for optimistic concurrency control
+    version = Column(Integer, nullable=False, default=1, server_default='1')
+    __mapper_args__ = {'version_id_col': version}
 
     @validates('products')
     def validate_products(self, key, products):
@@ -63,26 +76,10 @@ class Order(Base):
             'customer_id': self.customer_id,
             'products': self.products,
             'status': self.status.value,
-            'total_amount': self.total_amount
+            'total_amount': self.total_amount,
+            'idempotency_key': self.idempotency_key,
+            'sequence': self.sequence
         }
 
-# Event listeners for order status changes
-@event.listens_for(Order.status, 'set')
-def order_status_change(target, value, oldvalue, initiator):
-    """Handle order status changes"""
-    if oldvalue is None:  # New order
-        return
-    
-    # Emit events based on status change
-    if value == OrderStatus.PROCESSING:
-        # Reserve units
-        pass
-    elif value == OrderStatus.SHIPPED:
-        # Update unit locations
-        pass
-    elif value == OrderStatus.DELIVERED:
-        # Update inventory
-        pass
-    elif value == OrderStatus.CANCELLED:
-        # Release reserved units
-        pass 
\ No newline at end of file
+# Record status changes in the event outbox
+track_status_changes(Order, 'order')
@@ -0,0 +1,97 @@
+from sqlalchemy import Column, DateTime, Float, Index, Integer, String, event, func, inspect
+from sqlalchemy.orm import Session
+from typing import Dict
+from .database import Base
+
+class OutboxEvent(Base):
+    """Status change written in the same transaction as the change itself"""
+    __tablename__ = "outbox_events"
+    __table_args__ = (
+        Index('ix_outbox_events_entity_type_id', 'entity_type', 'id'),
+    )
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    entity_type = Column(String, nullable=False)  # 'order' or 'unit'
+    entity_id = Column(String, nullable=False)
+    from_status = Column(String, nullable=True)   # None for new entities
+    to_status = Column(String, nullable=True)     # None for deleted entities
+    created_at = Column(DateTime, nullable=False, server_default=func.current_timestamp())
+
+    def to_dict(self):
+        """Convert event to dictionary"""
+        return {
+            'id': self.id,
+            'entity_type': self.entity_type,
+            'entity_id': self.entity_id,
+            'from_status': self.from_status,
+            'to_status': self.to_status,
+            'created_at': self.created_at
+        }
+
+class OutboxCheckpoint(Base):
+    """Last event delivered to a named consumer"""
+    __tablename__ = "outbox_checkpoints"
+
+    consumer = Column(String, primary_key=True)
+    last_event_id = Column(Integer, nullable=False, default=0)
+
+class OutboxGap(Base):
+    """Event ids a consumer's checkpoint passed before they became visible.
+
+    They belong to transactions still in flight or rolled back, and are
+    rechecked until their events show up or the gap expires.
+    """
+    __tablename__ = "outbox_gaps"
+
+    consumer = Column(String, primary_key=True)
+    first_id = Column(Integer, primary_key=True)
+    last_id = Column(Integer, nullable=False)
+    found_at = Column(Float, nullable=False)  # Unix time the gap was first seen
+
+# Mapped classes whose status changes are recorded, by entity type
+_tracked: Dict[type, str] = {}
+
+def track_status_changes(cls: type, entity_type: str):
+    """Record status changes of a mapped class made through the ORM.
+
+    Bulk UPDATEs bypass the ORM and record their own events.
+    """
+    _tracked[cls] = entity_type
+
+def _status_value(status):
+    return status.value if status is not None else None
+
+@event.listens_for(Session, 'before_flush')
+def record_status_changes(session, flush_context, instances):
+    """Add an outbox event for every tracked entity created, updated or deleted"""
+    if not _tracked:
+        return
+    events = []
+    for obj in session.new:
+        entity_type = _tracked.get(type(obj))
+        if entity_type:
+            status = obj.status
+            if status is None:
+                status = type(obj).__table__.c.status.default.arg
+            events.append((entity_type, obj, None, status))
+    for obj in session.dirty:
+        entity_type = _tracked.get(type(obj))
+        if entity_type:
+            history = inspect(obj).attrs.status.history
+            if history.added and history.deleted and history.added[0] != history.deleted[0]:
+                events.append((entity_type, obj, history.deleted[0], history.added[0]))
+    for obj in session.deleted:
+        entity_type = _tracked.get(type(obj))
+        if entity_type:
+            history = inspect(obj).attrs.status.history
+            status = history.deleted[0] if history.deleted else obj.status
+            events.append((entity_type, obj, status, None))
+
+    for entity_type, obj, from_status, to_status in events:
+        entity_id = inspect(obj).mapper.primary_key_from_instance(obj)[0]
+        session.add(OutboxEvent(
+            entity_type=entity_type,
+            entity_id=entity_id,
+            from_status=_status_value(from_status),
+            to_status=_status_value(to_status)
+        ))
@@ -1,8 +1,9 @@
-from sqlalchemy import Column, String, Float, JSON
+from sqlalchemy import Column, String, Float
 from sqlalchemy.orm import validates
 from .database import Base
+from .dimensions import Dimensioned
 
-class Product(Base):
+class Product(Dimensioned, Base):
     __tablename__ = "products"
 
     product_id = Column(String, primary_key=True)
@@ -10,7 +11,7 @@ class Product(Base):
     description = Column(String)
     price = Column(Float, nullable=False)
     weight = Column(Float, nullable=False)
-    dimensions = Column(JSON, nullable=False)  # {'length': x, 'width': y, 'height': z}
+    # length, width, height and the derived volume come from Dimensioned
 
     @validates('price', 'weight')
     def validate_positive_number(self, key, value):
@@ -19,16 +20,6 @@ class Product(Base):
             raise ValueError(f"{key} must be positive")
         return value
 
-    @validates('dimensions')
-    def validate_dimensions(self, key, dimensions):
-        """Validate dimensions dictionary"""
-        required_keys = {'length', 'width', 'height'}
-        if not all(k in dimensions for k in required_keys):
-            raise ValueError("Dimensions must include length, width, and height")
-        if not all(isinstance(dimensions[k], (int, float)) and dimensions[k] > 0 for k in required_keys):
-            raise ValueError("All dimensions must be positive numbers")
-        return dimensions
-
     def to_dict(self):
         """Convert product to dictionary"""
         return {
@@ -0,0 +1,16 @@
+from sqlalchemy import Column, String, ForeignKey
+from .database import Base
+
+class Reservation(Base):
+    """Ledger row linking an order to a unit reserved for it"""
+    __tablename__ = "reservations"
+
+    order_id = Column(String, ForeignKey("orders.order_id"), primary_key=True)
+    unit_id = Column(String, ForeignKey("units.unit_id"), primary_key=True)
+
+    def to_dict(self):
+        """Convert reservation to dictionary"""
+        return {
+            'order_id': self.order_id,
+            'unit_id': self.unit_id
+        }
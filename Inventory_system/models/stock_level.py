@@ -0,0 +1,26 @@
+from sqlalchemy import Column, String, Integer, ForeignKey
+from .database import Base
+
+class StockLevel(Base):
+    """Per-product unit counts by status, maintained alongside unit transitions"""
+    __tablename__ = "stock_levels"
+
+    product_id = Column(String, ForeignKey("products.product_id"), primary_key=True)
+    available = Column(Integer, nullable=False, default=0)
+    reserved = Column(Integer, nullable=False, default=0)
+    in_transit = Column(Integer, nullable=False, default=0)
+    delivered = Column(Integer, nullable=False, default=0)
+
+    def total(self) -> int:
+        """Total number of units for the product"""
+        return self.available + self.reserved + self.in_transit + self.delivered
+
+    def to_dict(self):
+        """Convert stock level to dictionary"""
+        return {
+            'product_id': self.product_id,
+            'available': self.available,
+            'reserved': self.reserved,
+            'in_transit': self.in_transit,
+            'delivered': self.delivered
+        }
@@ -1,7 +1,8 @@
-from sqlalchemy import Column, String, Enum as SQLEnum, ForeignKey
+from sqlalchemy import Column, String, Integer, Enum as SQLEnum, ForeignKey, Index
 from sqlalchemy.orm import relationship, validates
 from enum import Enum
 from .database import Base
+from .outbox import track_status_changes
 
 class UnitStatus(str, Enum):
     AVAILABLE = "available"
@@ -11,12 +12,19 @@ class UnitStatus(str, Enum):
 
 class Unit(Base):
     __tablename__ = "units"
+    __table_args__ = (
+        Index('ix_units_product_id_status', 'product_id', 'status'),
+    )
 
     unit_id = Column(String, primary_key=True)
     product_id = Column(String, ForeignKey("products.product_id"), nullable=False)
     location_id = Column(String, ForeignKey("locations.location_id"))
     status = Column(SQLEnum(UnitStatus), nullable=False, default=UnitStatus.AVAILABLE)
 
+    # Optimistic concurrency: ORM updates match the version they read and bump it
+    version = Column(Integer, nullable=False, default=1, server_default='1')
+    __mapper_args__ = {'version_id_col': version}
+
     # Relationships
     product = relationship("Product", lazy="joined")
     location = relationship("Location", lazy="joined")
@@ -52,4 +60,7 @@ class Unit(Base):
             'product_id': self.product_id,
             'location_id': self.location_id,
             'status': self.status.value
-        } 
\ No newline at end of file
+        }
+
+# Record status changes in the event outbox
+track_status_changes(Unit, 'unit')
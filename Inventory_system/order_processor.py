@@ -0,0 +1,66 @@
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List
+from sqlalchemy.orm import Session
+from .managers.order_manager import OrderManager
+import logging
+
+logger = logging.getLogger(__name__)
+
+class OrderProcessor:
+    """Drains pending orders with a pool of worker threads.
+
+    Each worker uses its own session. Orders and units are claimed by
+    OrderManager.process_order with conditional updates, so workers may race
+    on the same order or stock without double-booking anything.
+    """
+
+    def __init__(self, session_factory: Callable[[], Session],
+                 workers: int = 4, batch_size: int = 500):
+        if workers <= 0:
+            raise ValueError("workers must be positive")
+        self.session_factory = session_factory
+        self.workers = workers
+        self.batch_size = batch_size
+
+    def _process_chunk(self, order_ids: List[str]) -> Dict[str, int]:
+        """Process a chunk of orders on a dedicated session"""
+        results = {'processed': 0, 'failed': 0}
+        db = self.session_factory()
+        try:
+            manager = OrderManager(db)
+            for order_id in order_ids:
+                if manager.process_order(order_id):
+                    results['processed'] += 1
+                else:
+                    results['failed'] += 1
+        except Exception as e:
+            logger.error(f"Order worker stopped: {str(e)}")
+        finally:
+            db.close()
+        return results
+
+    def drain(self) -> Dict[str, int]:
+        """Make one pass over all pending orders.
+
+        Returns how many orders were processed and how many failed or were
+        claimed by someone else.
+        """
+        totals = {'processed': 0, 'failed': 0}
+        after = None
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            while True:
+                db = self.session_factory()
+                try:
+                    order_ids = OrderManager(db).pending_order_ids(self.batch_size, after)
+                finally:
+                    db.close()
+                if not order_ids:
+                    break
+                after = order_ids[-1]
+
+                # Interleave so each worker gets a similar mix of orders
+                chunks = [order_ids[i::self.workers] for i in range(self.workers)]
+                for results in pool.map(self._process_chunk, [c for c in chunks if c]):
+                    for key, count in results.items():
+                        totals[key] += count
+        return totals
@@ -0,0 +1,39 @@
+import pytest
+
+from sqlalchemy.orm import sessionmaker
+from Inventory_system.models.database import create_db_engine
+from Inventory_system.models.migrations import upgrade
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = create_db_engine(f"sqlite:///{tmp_path / 'inventory.db'}")
+    upgrade(engine)
+    yield engine
+    engine.dispose()
+
+@pytest.fixture
+def session_factory(engine):
+    return sessionmaker(bind=engine, autoflush=False)
+
+@pytest.fixture
+def db(session_factory):
+    session = session_factory()
+    yield session
+    session.close()
+
+@pytest.fixture
+def system(db):
+    """An InventorySystem with product P, a bin for it and four available units"""
+    from Inventory_system.inventory_system import InventorySystem
+    from Inventory_system.models.location import Location, LocationType
+    from Inventory_system.models.product import Product
+    from Inventory_system.models.unit import Unit
+
+    system = InventorySystem(db)
+    assert system.add_product(Product(product_id='P', name='Box', price=2.0, weight=1.0,
+                                      dimensions={'length': 1, 'width': 1, 'height': 1}))
+    assert system.add_location(Location(location_id='L', type=LocationType.SMALL,
+                                        dimensions={'length': 10, 'width': 10, 'height': 10}))
+    for i in range(4):
+        assert system.add_unit(Unit(unit_id=f"U{i}", product_id='P'))
+    return system
@@ -0,0 +1,41 @@
+import asyncio
+
+import pytest
+
+pytest.importorskip("aiosqlite")
+
+from sqlalchemy import text
+from Inventory_system.async_inventory_system import (AsyncInventorySystem, async_database_url,
+                                                     create_async_session_factory, create_tables)
+from Inventory_system.models.database import DATABASE_URL_ENV
+from Inventory_system.models.product import Product
+
+def test_async_url_follows_the_configured_database(monkeypatch, tmp_path):
+    monkeypatch.setenv(DATABASE_URL_ENV, f"sqlite:///{tmp_path / 'env.db'}")
+    assert str(async_database_url()) == f"sqlite+aiosqlite:///{tmp_path / 'env.db'}"
+    assert async_database_url("postgresql://user@host/db").drivername == 'postgresql+asyncpg'
+    assert async_database_url("sqlite+aiosqlite:///x.db").drivername == 'sqlite+aiosqlite'
+
+def test_async_sqlite_connections_get_the_sync_pragmas(monkeypatch, tmp_path, session_factory):
+    monkeypatch.setenv(DATABASE_URL_ENV, f"sqlite:///{tmp_path / 'inventory.db'}")
+
+    async def run():
+        factory = create_async_session_factory()
+        try:
+            await create_tables(factory.kw['bind'])
+            async with factory() as session:
+                pragmas = [(await session.execute(text(f"PRAGMA {name}"))).scalar()
+                           for name in ('journal_mode', 'busy_timeout')]
+            system = AsyncInventorySystem(factory)
+            added = await system.add_product(Product(product_id='P', name='Box', price=1.0, weight=1.0,
+                                                     dimensions={'length': 1, 'width': 1, 'height': 1}))
+            return pragmas, added
+        finally:
+            await factory.kw['bind'].dispose()
+
+    pragmas, added = asyncio.run(run())
+    assert pragmas == ['wal', 30000]
+    assert added
+    # Same file as the sync engine of the configured URL
+    with session_factory() as db:
+        assert db.get(Product, 'P') is not None
@@ -0,0 +1,37 @@
+import pytest
+
+pytest.importorskip("numpy")
+
+from Inventory_system.bulk_io import BulkImporter, read_chunks
+from Inventory_system.models.product import Product
+
+PRODUCTS = (
+    "product_id,name,description,price,weight,length,width,height\n"
+    "p1,Box,small,5,1,10,10,10\n"
+    "p2,Crate,,8,2,20,20,20\n"
+    "p3,Short,desc,5,1\n"
+    "\n"
+    "p4,Long,desc,5,1,10,10,10,extra\n"
+    "p5,Tube,,3,1,30,5,5\n"
+)
+
+@pytest.fixture
+def products_csv(tmp_path):
+    path = tmp_path / "products.csv"
+    path.write_text(PRODUCTS)
+    return str(path)
+
+def test_read_chunks_aligns_malformed_rows(products_csv):
+    (chunk, malformed), = read_chunks(products_csv)
+    assert all(len(column) == 5 for column in chunk.values())
+    assert malformed == [(2, "wrong column count: expected 8, found 5"),
+                         (3, "wrong column count: expected 8, found 9")]
+
+def test_import_rejects_malformed_rows(db, products_csv):
+    result = BulkImporter(db, chunk_size=2).import_file('products', products_csv)
+    assert result['read'] == 5
+    assert result['imported'] == 3
+    assert result['rejected'] == 2
+    assert result['errors'] == ["row 3: wrong column count: expected 8, found 5",
+                                "row 4: wrong column count: expected 8, found 9"]
+    assert {p.product_id for p in db.query(Product)} == {'p1', 'p2', 'p5'}
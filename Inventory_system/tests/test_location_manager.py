@@ -0,0 +1,47 @@
+from Inventory_system.inventory_system import InventorySystem
+from Inventory_system.managers.location_index import FreeLocationIndex
+from Inventory_system.managers.location_manager import LocationStrategy
+from Inventory_system.models.location import Location, LocationType
+from Inventory_system.models.product import Product
+from Inventory_system.models.unit import Unit
+
+def make_product(product_id: str, side: float, height: float = None) -> Product:
+    return Product(product_id=product_id, name=product_id, price=1.0, weight=1.0,
+                   dimensions={'length': side, 'width': side, 'height': height or side})
+
+def test_partly_filled_bin_stays_indexed_after_a_misfit(session_factory):
+    a = InventorySystem(session_factory(), location_index=FreeLocationIndex())
+    b = InventorySystem(session_factory(), location_index=FreeLocationIndex())
+    assert a.add_location(Location(location_id='L', type=LocationType.SMALL,
+                                   dimensions={'length': 10, 'width': 10, 'height': 10}))
+    for product in (make_product('FILL', 10, 6), make_product('BIG', 8), make_product('SMALL', 5)):
+        assert a.add_product(product)
+
+    # Session a loads its index while L is empty, then b fills L to 600/1000
+    assert a.location_manager.find_suitable_location(make_product('probe', 1)).location_id == 'L'
+    assert b.add_unit(Unit(unit_id='U1', product_id='FILL'))
+
+    assert not a.add_unit(Unit(unit_id='U2', product_id='BIG'))
+    assert a.add_unit(Unit(unit_id='U3', product_id='SMALL'))
+    assert a.db.get(Unit, 'U3').location_id == 'L'
+    a.db.close()
+    b.db.close()
+
+class LargestFirstStrategy(LocationStrategy):
+    """Scan-only strategy, as a custom strategy would be written"""
+
+    def find_location(self, product, locations):
+        fitting = [location for location in locations if location.can_hold(product)]
+        return max(fitting, key=lambda location: location.volume, default=None)
+
+def test_scan_only_strategy_places_units(system):
+    strategy = LargestFirstStrategy()
+    assert not strategy.supports_index
+    assert strategy.find_location_id(make_product('probe', 1), system.location_index) is None
+
+    assert system.add_location(Location(location_id='XL', type=LocationType.LARGE,
+                                        dimensions={'length': 50, 'width': 50, 'height': 50}))
+    system.set_location_strategy(strategy)
+    assert system.add_unit(Unit(unit_id='U9', product_id='P'))
+    assert system.add_units_bulk([Unit(unit_id='U10', product_id='P')]) == {'U10': 'XL'}
+    assert system.db.get(Unit, 'U9').location_id == 'XL'
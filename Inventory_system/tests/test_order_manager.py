@@ -0,0 +1,33 @@
+from Inventory_system.managers.stock_manager import StockManager
+from Inventory_system.managers.wave_planner import WavePlanner
+from Inventory_system.models.order import Order, OrderStatus
+from Inventory_system.models.reservation import Reservation
+from Inventory_system.models.unit import Unit, UnitStatus
+
+def reserved_units(db, order_id: str) -> set:
+    return {r.unit_id for r in db.query(Reservation).filter(Reservation.order_id == order_id)}
+
+def test_cancel_releases_only_its_own_reservations(system):
+    db = system.db
+    assert system.place_order(Order(order_id='A', customer_id='c', products={'P': 2}))
+    assert system.place_order(Order(order_id='B', customer_id='c', products={'P': 1}))
+    assert WavePlanner(db).release_wave()['orders'] == ['A', 'B']
+    kept = reserved_units(db, 'B')
+    assert len(reserved_units(db, 'A')) == 2 and len(kept) == 1
+
+    assert system.cancel_order('A')
+    db.expire_all()
+    assert reserved_units(db, 'A') == set()
+    assert reserved_units(db, 'B') == kept
+    statuses = {unit.unit_id: unit.status for unit in db.query(Unit)}
+    assert [unit_id for unit_id, status in statuses.items() if status == UnitStatus.RESERVED] == list(kept)
+    assert db.get(Order, 'B').status == OrderStatus.PROCESSING
+    assert StockManager(db).verify() == {}
+
+def test_repeated_key_of_a_rejected_order_reports_its_own_id(system):
+    outcomes = system.order_manager.create_orders([
+        Order(order_id='A', customer_id='c', products={'P': 9}, idempotency_key='k'),
+        Order(order_id='A2', customer_id='c', products={'P': 9}, idempotency_key='k'),
+    ], {'P': 2.0})
+    assert [(o['order_id'], o['result']) for o in outcomes] == [('A', 'rejected'), ('A2', 'rejected')]
+    assert outcomes[0]['reason'] == outcomes[1]['reason'] == "Insufficient units available"
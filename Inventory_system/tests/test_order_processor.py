@@ -0,0 +1,56 @@
+import logging
+import random
+
+from sqlalchemy import func
+from Inventory_system.managers.stock_manager import StockManager
+from Inventory_system.models.order import Order, OrderStatus
+from Inventory_system.models.product import Product
+from Inventory_system.models.reservation import Reservation
+from Inventory_system.models.unit import Unit, UnitStatus
+from Inventory_system.order_processor import OrderProcessor
+
+PRODUCTS = 3
+UNITS = 30
+ORDERS = 80
+
+def seed(db):
+    """Pending orders whose demand exceeds the stock of every product"""
+    rng = random.Random(11)
+    db.bulk_insert_mappings(Product, [
+        {'product_id': f"P{i}", 'name': f"Product {i}", 'price': 5.0, 'weight': 1.0,
+         'length': 10, 'width': 10, 'height': 10}
+        for i in range(PRODUCTS)
+    ])
+    db.bulk_insert_mappings(Unit, [
+        {'unit_id': f"U{i}", 'product_id': f"P{i % PRODUCTS}", 'status': UnitStatus.AVAILABLE}
+        for i in range(UNITS)
+    ])
+    db.bulk_insert_mappings(Order, [
+        {'order_id': f"O{i:04d}", 'customer_id': f"C{i % 7}",
+         'products': {f"P{rng.randrange(PRODUCTS)}": rng.randint(1, 3)},
+         'status': OrderStatus.PENDING, 'total_amount': 0.0, 'sequence': i + 1}
+        for i in range(ORDERS)
+    ])
+    db.commit()
+    StockManager(db).rebuild()
+
+def test_concurrent_workers_do_not_oversell(db, session_factory, caplog):
+    seed(db)
+    caplog.set_level(logging.CRITICAL)
+
+    totals = OrderProcessor(session_factory, workers=8, batch_size=20).drain()
+    assert totals['processed'] + totals['failed'] == ORDERS
+    assert totals['processed'] > 0 and totals['failed'] > 0
+
+    db.expire_all()
+    shipped = db.query(Order).filter(Order.status == OrderStatus.SHIPPED).all()
+    assert len(shipped) == totals['processed']
+    demand = sum(sum(order.products.values()) for order in shipped)
+    in_transit = db.query(Unit).filter(Unit.status == UnitStatus.IN_TRANSIT).count()
+    assert demand == in_transit <= UNITS
+
+    # Every reservation holds a distinct unit of the shipped orders
+    reserved = db.query(func.count(Reservation.unit_id), func.count(func.distinct(Reservation.unit_id))).one()
+    assert reserved[0] == reserved[1] == in_transit
+    assert db.query(Order).filter(Order.status == OrderStatus.PROCESSING).count() == 0
+    assert StockManager(db).verify() == {}
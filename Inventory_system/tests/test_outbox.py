@@ -0,0 +1,67 @@
+from sqlalchemy import text
+from Inventory_system.managers.outbox import OutboxDispatcher
+from Inventory_system.models.outbox import OutboxEvent, OutboxGap
+
+def commit_event(engine, event_id: int, entity_type: str = 'order'):
+    """Commit an event with a given id, as a transaction that allocated it earlier would"""
+    with engine.begin() as connection:
+        connection.execute(
+            text("INSERT INTO outbox_events (id, entity_type, entity_id, to_status) "
+                 "VALUES (:id, :entity_type, :entity_id, 'pending')"),
+            {'id': event_id, 'entity_type': entity_type, 'entity_id': f"E{event_id}"}
+        )
+
+def subscribe(dispatcher, consumer='consumer', entity_type=None):
+    delivered = []
+    dispatcher.subscribe(consumer, lambda events: delivered.extend(e['id'] for e in events), entity_type)
+    return delivered
+
+def test_event_committed_after_a_later_one_is_delivered(engine, session_factory):
+    dispatcher = OutboxDispatcher(session_factory)
+    delivered = subscribe(dispatcher)
+    units = subscribe(dispatcher, 'units', 'unit')
+    for event_id in (1, 2, 4, 5):
+        commit_event(engine, event_id)
+    commit_event(engine, 6, 'unit')
+
+    # Event 3 is still in flight when the checkpoint passes it
+    dispatcher.dispatch_once()
+    assert delivered == [1, 2, 4, 5, 6]
+    assert units == [6]
+    assert dispatcher.purge() == 4
+
+    commit_event(engine, 3, 'unit')
+    dispatcher.dispatch_once()
+    assert delivered == [1, 2, 4, 5, 6, 3]
+    assert units == [6, 3]
+    assert dispatcher.dispatch_once() == 0
+    with session_factory() as db:
+        assert db.query(OutboxGap).count() == 0
+
+def test_awaited_events_survive_purge(engine, session_factory):
+    dispatcher = OutboxDispatcher(session_factory)
+    delivered = subscribe(dispatcher)
+    for event_id in (1, 2, 4, 5):
+        commit_event(engine, event_id)
+    dispatcher.dispatch_once()
+
+    commit_event(engine, 3)
+    assert dispatcher.purge() == 3
+    dispatcher.dispatch_once()
+    assert delivered == [1, 2, 4, 5, 3]
+    with session_factory() as db:
+        assert [event.id for event in db.query(OutboxEvent)] == [3, 5]
+
+def test_rolled_back_gap_expires(engine, session_factory):
+    dispatcher = OutboxDispatcher(session_factory, gap_timeout=0)
+    delivered = subscribe(dispatcher)
+    for event_id in (1, 3):
+        commit_event(engine, event_id)
+    dispatcher.dispatch_once()
+    with session_factory() as db:
+        assert db.query(OutboxGap.first_id, OutboxGap.last_id).all() == [(2, 2)]
+
+    dispatcher.dispatch_once()
+    assert delivered == [1, 3]
+    with session_factory() as db:
+        assert db.query(OutboxGap).count() == 0
@@ -0,0 +1,46 @@
+import logging
+
+from sqlalchemy.exc import OperationalError
+from Inventory_system.managers.order_manager import IntakeResult
+from Inventory_system.models.order import Order
+
+def order(order_id: str, key: str = None, quantity: int = 1) -> Order:
+    return Order(order_id=order_id, customer_id='c', products={'P': quantity}, idempotency_key=key)
+
+def test_repeated_keys_are_duplicates_of_the_original(system):
+    outcomes = system.place_orders([order('A', 'k1'), order('B', 'k2'), order('A-retry', 'k1')])
+    assert [(o['order_id'], o['result']) for o in outcomes] == [
+        ('A', IntakeResult.ACCEPTED), ('B', IntakeResult.ACCEPTED), ('A', IntakeResult.DUPLICATE)
+    ]
+
+    # A retried batch places nothing twice
+    outcomes = system.place_orders([order('B-retry', 'k2'), order('C', 'k3')])
+    assert [(o['order_id'], o['result']) for o in outcomes] == [
+        ('B', IntakeResult.DUPLICATE), ('C', IntakeResult.ACCEPTED)
+    ]
+    assert sorted(o.order_id for o in system.db.query(Order)) == ['A', 'B', 'C']
+
+def test_failed_batch_is_rolled_back_and_rejected(system, monkeypatch, caplog):
+    db = system.db
+    manager = system.order_manager
+    manager.max_attempts, manager.backoff = 2, 0.001
+    attempts = []
+
+    def fail(orders, prices):
+        attempts.append(1)
+        db.add(order('partial'))
+        db.flush()
+        raise OperationalError("INSERT", {}, Exception("database is locked"))
+
+    monkeypatch.setattr(manager, '_create_orders_once', fail)
+    with caplog.at_level(logging.CRITICAL):
+        outcomes = system.place_orders([order('A', 'k1'), order('B')])
+    assert len(attempts) == 2
+    assert [(o['order_id'], o['result']) for o in outcomes] == [
+        ('A', IntakeResult.REJECTED), ('B', IntakeResult.REJECTED)
+    ]
+    assert 'database is locked' in outcomes[0]['reason']
+    assert db.query(Order).count() == 0
+
+    monkeypatch.undo()
+    assert system.place_orders([order('A', 'k1')])[0]['result'] == IntakeResult.ACCEPTED
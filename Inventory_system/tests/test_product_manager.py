@@ -0,0 +1,37 @@
+import pytest
+
+from Inventory_system.inventory_system import InventorySystem
+from Inventory_system.managers.product_cache import ProductCache
+from Inventory_system.models.product import Product
+
+def box(price: float) -> Product:
+    return Product(product_id='P', name='Box', price=price, weight=1.0,
+                   dimensions={'length': 1, 'width': 1, 'height': 1})
+
+@pytest.fixture
+def systems(session_factory):
+    cache = ProductCache()
+    a = InventorySystem(session_factory(), product_cache=cache)
+    b = InventorySystem(session_factory(), product_cache=cache)
+    assert a.add_product(box(1.0))
+    yield a, b
+    a.db.close()
+    b.db.close()
+
+def test_update_in_transaction_is_invalidated_after_commit(systems):
+    a, b = systems
+    with a.transaction():
+        assert a.update_product(box(2.0))
+        # A concurrent reader re-caches the committed row meanwhile
+        assert b.product_manager.get_product('P').price == 1.0
+    b.db.rollback()
+    assert b.product_manager.get_product('P').price == 2.0
+
+def test_update_in_rolled_back_transaction_is_invalidated(systems):
+    a, b = systems
+    with pytest.raises(RuntimeError):
+        with a.transaction():
+            assert a.update_product(box(3.0))
+            assert a.product_manager.get_product('P').price == 3.0
+            raise RuntimeError("abort")
+    assert b.product_manager.get_product('P').price == 1.0
@@ -0,0 +1,55 @@
+import logging
+
+import pytest
+from Inventory_system.managers.transaction import StaleDataConflict, commit, retry_on_conflict, unit_of_work
+from Inventory_system.models.order import Order
+
+@pytest.fixture
+def order_id(system):
+    assert system.place_order(Order(order_id='A', customer_id='c0', products={'P': 1}))
+    return 'A'
+
+def renamer(db, other, order_id, conflicts):
+    """Operation renaming the order's customer, losing the race for the first conflicts attempts"""
+    attempts = []
+
+    def rename():
+        attempts.append(1)
+        order = db.get(Order, order_id)
+        if len(attempts) <= conflicts:
+            # Another session updates the row after this one read its version
+            other.get(Order, order_id).customer_id = f"other{len(attempts)}"
+            other.commit()
+        order.customer_id = 'mine'
+        commit(db)
+        return len(attempts)
+
+    return rename, attempts
+
+def test_stale_version_is_retried(db, session_factory, order_id, caplog):
+    other = session_factory()
+    rename, attempts = renamer(db, other, order_id, conflicts=2)
+    assert retry_on_conflict(db, rename, max_attempts=3, backoff=0.001) == 3
+    db.expire_all()
+    assert db.get(Order, order_id).customer_id == 'mine'
+    assert db.get(Order, order_id).version == 4
+    other.close()
+
+def test_gives_up_after_max_attempts(db, session_factory, order_id, caplog):
+    other = session_factory()
+    rename, attempts = renamer(db, other, order_id, conflicts=10)
+    with caplog.at_level(logging.CRITICAL), pytest.raises(StaleDataConflict):
+        retry_on_conflict(db, rename, max_attempts=3, backoff=0.001)
+    assert len(attempts) == 3
+    db.expire_all()
+    assert db.get(Order, order_id).customer_id == 'other3'
+    other.close()
+
+def test_conflict_inside_unit_of_work_is_not_retried(db, session_factory, order_id, caplog):
+    other = session_factory()
+    rename, attempts = renamer(db, other, order_id, conflicts=1)
+    with caplog.at_level(logging.CRITICAL), pytest.raises(StaleDataConflict):
+        with unit_of_work(db):
+            retry_on_conflict(db, rename, max_attempts=3, backoff=0.001)
+    assert len(attempts) == 1
+    other.close()
@@ -0,0 +1,22 @@
+from Inventory_system.inventory_system import InventorySystem
+from Inventory_system.managers.wave_planner import WavePlanner
+from Inventory_system.models.location import Location, LocationType
+from Inventory_system.models.order import Order
+from Inventory_system.models.product import Product
+from Inventory_system.models.unit import Unit
+
+def test_wave_routes_through_blank_and_missing_aisles(db):
+    system = InventorySystem(db)
+    assert system.add_product(Product(product_id='P', name='Box', price=1.0, weight=1.0,
+                                      dimensions={'length': 1, 'width': 1, 'height': 1}))
+    for location_id, aisle, x in (('L1', 'B', 1.0), ('L2', '', 0.0), ('L3', None, None), ('L4', 'A', 2.0)):
+        db.add(Location(location_id=location_id, type=LocationType.SMALL, aisle=aisle, x=x, y=0.0, z=0.0,
+                        dimensions={'length': 1, 'width': 1, 'height': 1}))
+        db.add(Unit(unit_id=f"U{location_id}", product_id='P', location_id=location_id))
+    db.commit()
+    system.stock_manager.rebuild()
+
+    assert system.place_order(Order(order_id='O', customer_id='c', products={'P': 4}))
+    wave = WavePlanner(db).release_wave()
+    assert wave['orders'] == ['O']
+    assert [stop['location_id'] for stop in wave['pick_list']] == ['L3', 'L2', 'L4', 'L1']